@@ -99,6 +99,79 @@ DATABASES = {
     }
 }
 
+# Cache
+# LocMem es por proceso: con varios workers conviene REDIS_URL para que la
+# invalidación del catálogo llegue a todos.
+REDIS_URL = os.getenv("REDIS_URL")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "manque-corretajes",
+            "OPTIONS": {"MAX_ENTRIES": 5000},
+        }
+    }
+
+# Segundos que vive una respuesta cacheada del catálogo público. Los cambios
+# se invalidan por señales; el TTL solo acota lo que no pasa por ellas
+# (p.ej. una reserva que vence sola).
+CATALOGO_CACHE_TTL = int(os.getenv("CATALOGO_CACHE_TTL", "60"))
+
+# Cada cuántos segundos el índice de similares (en memoria, por proceso)
+# incorpora los cambios hechos por otros workers
+SIMILARES_REFRESCO_SEG = int(os.getenv("SIMILARES_REFRESCO_SEG", "5"))
+
+# Derivados de fotos (miniaturas): hilos del pool; con 0 se generan en el
+# mismo request (útil en tests)
+IMAGENES_WORKERS = int(os.getenv("IMAGENES_WORKERS", "2"))
+
+# Subidas por partes (ver inmobiliaria/subidas.py). Los parciales quedan
+# fuera de MEDIA_ROOT para que no se sirvan.
+SUBIDAS_DIR = Path(os.getenv("SUBIDAS_DIR", BASE_DIR / "subidas_parciales"))
+SUBIDA_TAMANO_MAX_MB = int(os.getenv("SUBIDA_TAMANO_MAX_MB", "100"))
+SUBIDA_EXPIRA_HORAS = int(os.getenv("SUBIDA_EXPIRA_HORAS", "24"))
+
+# Calendario de feriados en memoria (inmobiliaria/calendario.py): se recarga
+# al guardar un Feriado; con LocMemCache los otros procesos tardan hasta esto
+FERIADOS_CACHE_SEG = int(os.getenv("FERIADOS_CACHE_SEG", "600"))
+
+# Expirador de reservas (manage.py expirar_reservas): cada cuántos segundos
+# barre las vencidas. Las vistas ya no expiran al listar.
+EXPIRADOR_INTERVALO_SEG = int(os.getenv("EXPIRADOR_INTERVALO_SEG", "30"))
+
+# Descargas protegidas (contratos, comprobantes, documentos; ver
+# inmobiliaria/descargas.py). Django valida el permiso y el servidor web
+# transfiere el archivo:
+#   "nginx"    -> X-Accel-Redirect; requiere
+#                 location /protegido/blobs/ { internal; alias <PRIVADO_ROOT>/blobs/; }
+#                 location /protegido/ { internal; alias <MEDIA_ROOT>/; }
+#   "sendfile" -> X-Sendfile (Apache mod_xsendfile / lighttpd)
+#   ""         -> lo sirve Django (desarrollo), con soporte de Range
+# Los archivos van deduplicados (inmobiliaria/storage.py): blobs/publico/
+# (fotos) en MEDIA_ROOT, servidos directo; blobs/privado/ en PRIVADO_ROOT,
+# fuera de MEDIA_ROOT. Los privados anteriores a blobs/ siguen en MEDIA_ROOT
+# y el servidor web debe negarlos (storage.PREFIJOS_PRIVADOS):
+#                 location ~ ^/media/(contratos|pagos|propiedades/documentos|blobs/privado)/ { deny all; }
+#                 location /media/ { alias <MEDIA_ROOT>/; }
+# Al actualizar, mover MEDIA_ROOT/blobs/privado/ a PRIVADO_ROOT/blobs/privado/.
+DESCARGAS_MODO = os.getenv("DESCARGAS_MODO", "")
+DESCARGAS_PREFIJO_INTERNO = os.getenv("DESCARGAS_PREFIJO_INTERNO", "/protegido/")
+# Vigencia de los links firmados de descarga (?firma=) que entregan los
+# serializers: el frontend los abre con un <a href>, sin JWT
+DESCARGAS_FIRMA_SEG = int(os.getenv("DESCARGAS_FIRMA_SEG", "3600"))
+PRIVADO_ROOT = Path(os.getenv("PRIVADO_ROOT", BASE_DIR / "privado"))
+# Donde storage.py escribe cada archivo antes de moverlo a su blob: fuera de
+# MEDIA_ROOT (no se sirve) y en el mismo sistema de archivos que MEDIA_ROOT y
+# PRIVADO_ROOT para que el movimiento sea un rename atómico
+BLOBS_TEMP_DIR = Path(os.getenv("BLOBS_TEMP_DIR", BASE_DIR / "blobs_tmp"))
+
 # Static
 STATIC_URL = "/static/"
 STATIC_ROOT = BASE_DIR / "staticfiles"
@@ -118,7 +191,9 @@ CORS_ALLOW_HEADERS = [
     "user-agent",
     "x-csrftoken",
     "x-requested-with",
+    "upload-offset",
 ]
+CORS_EXPOSE_HEADERS = ["Upload-Offset", "Upload-Length"]
 
 
 REST_FRAMEWORK = {
@@ -14,14 +14,27 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import posixpath
+
 from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from django.http import Http404
+from django.views.static import serve
 
 from rest_framework_simplejwt.views import TokenRefreshView
+from inmobiliaria.storage import PREFIJOS_PRIVADOS
 from inmobiliaria.views import CustomTokenObtainPairView
 
+
+def servir_media_publica(request, path, document_root=None, show_indexes=False):
+    # en desarrollo: los archivos privados solo por /api/.../descargar/
+    if posixpath.normpath(path.replace("\\", "/")).lstrip("/").startswith(PREFIJOS_PRIVADOS):
+        raise Http404("El archivo no existe.")
+    return serve(request, path, document_root=document_root, show_indexes=show_indexes)
+
+
 urlpatterns = [
     path('admin/', admin.site.urls),
 
@@ -34,5 +47,5 @@ urlpatterns = [
 ]
 
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    urlpatterns += static(settings.MEDIA_URL, view=servir_media_publica, document_root=settings.MEDIA_ROOT)
 
@@ -1,8 +1,11 @@
 from django import forms
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from django.utils import timezone
 from .models import *
 from .utils import slots_disponibles_para_propiedad
+from .catalogo import refrescar_catalogo
+from .coincidencias import emparejar_propiedades
 
 def _choices_from_times(times):
     return [(t.strftime("%H:%M"), t.strftime("%H:%M")) for t in times]
@@ -27,7 +30,10 @@ class UsuarioAdmin(UserAdmin):
 
 @admin.action(description="Aprobar propiedades seleccionadas")
 def aprobar_propiedades(modeladmin, request, queryset):
-    updated = queryset.update(aprobada=True)
+    ids = list(queryset.values_list("pk", flat=True))
+    updated = queryset.update(aprobada=True, updated_at=timezone.now())
+    refrescar_catalogo(ids)
+    emparejar_propiedades(Propiedad.objects.filter(pk__in=ids))
     modeladmin.message_user(request, f"{updated} propiedades aprobadas.")
 
 @admin.action(description="Marcar notificaciones como leídas")
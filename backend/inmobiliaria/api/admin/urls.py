@@ -32,10 +32,14 @@ from .views import (
     admin_reserva_agregar_nota,
     admin_reserva_enviar_mensaje,
     admin_reserva_cambiar_estado,
+    admin_expirador_reservas,
 
     # Selectores para formularios
     admin_propiedades_disponibles,
     admin_interesados_clientes,
+
+    # Cache
+    admin_cache_catalogo,
 )
 
 urlpatterns = [
@@ -79,6 +83,7 @@ urlpatterns = [
     # RESERVAS
     # =====================
     path("reservas/", AdminReservaListView.as_view()),
+    path("reservas/expirador/", admin_expirador_reservas),
     path("reservas/<int:pk>/", admin_reserva_detalle),
     path("reservas/<int:pk>/agregar-nota/", admin_reserva_agregar_nota),
     path("reservas/<int:pk>/enviar-mensaje/", admin_reserva_enviar_mensaje),
@@ -90,4 +95,8 @@ urlpatterns = [
     path("propiedades-disponibles/", admin_propiedades_disponibles),
     path("interesados-clientes/", admin_interesados_clientes),
 
+    # =====================
+    # CACHE
+    # =====================
+    path("cache/catalogo/", admin_cache_catalogo),
 ]
@@ -1,7 +1,8 @@
-from django.db.models import Sum, Q
+from django.db.models import Count, Sum, Q
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.core.mail import send_mail
 from django.conf import settings
 from datetime import date, datetime, timedelta
@@ -16,7 +17,9 @@ from rest_framework.permissions import IsAdminUser
 
 from inmobiliaria.models import Propietario, Propiedad, SolicitudCliente, Reserva, Pago, Contrato, Interesado
 from inmobiliaria.permisssions_roles import IsAdmin
-from inmobiliaria.utils import liberar_reservas_vencidas
+from inmobiliaria.pagination import CursorOpcionalMixin, ReservaCursorPagination
+from inmobiliaria.cache import estadisticas_catalogo
+from inmobiliaria.expirador import estado_expirador
 
 
 from .serializers import *
@@ -49,6 +52,13 @@ def admin_resumen(request):
         or 0
     )
 
+    # cartera de arriendos vigentes: una fila por contrato (libro); mismo
+    # filtro que el reporte de resumen
+    cartera = Contrato.objects.filter(vigente=True, tipo="arriendo").aggregate(
+        saldo=Sum("monto_pendiente"),
+        en_mora=Count("id", filter=Q(proximo_vencimiento__lt=hoy)),
+    )
+
     data = {
         "total_propiedades": Propiedad.objects.count(),
         "total_propietarios": Propietario.objects.count(),
@@ -56,6 +66,8 @@ def admin_resumen(request):
         "reservas_activas": reservas_activas,
         "solicitudes_nuevas": solicitudes_nuevas,
         "pagos_mes": pagos_mes,
+        "saldo_pendiente": cartera["saldo"] or 0,
+        "contratos_en_mora": cartera["en_mora"],
     }
     return Response(data)
 
@@ -78,9 +90,6 @@ class AdminPropiedadListCreateView(generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated, IsAdmin]
 
     def get_queryset(self):
-        # 0) sincroniza vencidas antes de listar
-        Reserva.expirar_reservas_y_sync_estado()
-
         return (
             Propiedad.objects
             .select_related('propietario')
@@ -352,16 +361,16 @@ def _parse_iso_date(s: str):
         return None
 
 
-class AdminReservaListView(generics.ListAPIView):
+class AdminReservaListView(CursorOpcionalMixin, generics.ListAPIView):
     serializer_class = AdminReservaSerializer
     permission_classes = [permissions.IsAuthenticated, IsAdmin]
+    cursor_pagination_class = ReservaCursorPagination
 
     def get_queryset(self):
-        Reserva.expirar_reservas_y_sync_estado()
-
         qs = (
             Reserva.objects
-            .select_related("interesado", "propiedad")
+            .select_related("interesado")
+            .con_propiedad_estado()
             .order_by("-fecha")
         )
 
@@ -409,9 +418,12 @@ class AdminReservaListView(generics.ListAPIView):
 @permission_classes([IsAuthenticated, IsAdminUser])
 def admin_reserva_detalle(request, pk):
     try:
-        reserva = Reserva.objects.select_related(
-            "propiedad", "interesado", "interesado__usuario"
-        ).get(pk=pk)
+        reserva = (
+            Reserva.objects
+            .select_related("interesado", "interesado__usuario")
+            .con_propiedad_estado()
+            .get(pk=pk)
+        )
     except Reserva.DoesNotExist:
         return Response({"detail": "Reserva no encontrada."}, status=404)
 
@@ -507,7 +519,11 @@ def admin_reserva_cambiar_estado(request, pk):
             return Response({"detail": "No puedes activar una reserva ya vencida."}, status=400)
 
     reserva.estado = nuevo_estado
-    reserva.save(update_fields=["estado", "activa", "expires_at"])
+    try:
+        reserva.save(update_fields=["estado", "activa", "expires_at"])
+    except DjangoValidationError as e:
+        # p.ej. reactivar cuando la propiedad ya tiene otra reserva activa
+        return Response({"detail": " ".join(e.messages)}, status=400)
     return Response(AdminReservaSerializer(reserva).data, status=200)
 
 @api_view(["GET"])
@@ -721,12 +737,11 @@ class AdminDashboardContratoPagoView(APIView):
         contratos_vigentes = Contrato.objects.filter(vigente=True).count()
         contratos_total = Contrato.objects.count()
         pagos_total = Pago.objects.count()
-
         pagos_mes = (
             Pago.objects
             .values("fecha__year", "fecha__month")
             .order_by("-fecha__year", "-fecha__month")
-            .annotate(total=models.Sum("monto"))
+            .annotate(total=Sum("monto"))
         )
 
         return Response({
@@ -823,3 +838,24 @@ def admin_interesados_clientes(request):
         })
 
     return Response(data)
+
+
+# =====================
+# CACHE CATÁLOGO
+# =====================
+@api_view(["GET"])
+@permission_classes([IsAuthenticated, IsAdmin])
+def admin_cache_catalogo(request):
+    """
+    Contadores de la cache del catálogo público (hits, misses, versión).
+    """
+    return Response(estadisticas_catalogo(), status=status.HTTP_200_OK)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated, IsAdmin])
+def admin_expirador_reservas(request):
+    """
+    Marca del último barrido del expirador de reservas (manage.py expirar_reservas).
+    """
+    return Response(estado_expirador(settings.EXPIRADOR_INTERVALO_SEG), status=status.HTTP_200_OK)
@@ -8,9 +8,13 @@ urlpatterns = [
     path("token/refresh/", TokenRefreshView.as_view(), name="token-refresh"),
 
     path("catalogo/propiedades/", views.CatalogoPropiedadesView.as_view(), name="catalogo-propiedades"),
+    path("catalogo/facetas/", views.CatalogoFacetasView.as_view(), name="catalogo-facetas"),
 
     path("mis-contratos/", views.MisContratosView.as_view(), name="mis-contratos"),
     path("mis-pagos/", views.MisPagosView.as_view(), name="mis-pagos"),
     path("mis-reservas/", views.MisReservasView.as_view(), name="mis-reservas"),
     path("cambiar-password/", views.CambiarPasswordView.as_view()),
+
+    path("calendario/token/", views.CalendarioTokenView.as_view(), name="calendario-token"),
+    path("calendario/<str:token>.ics", views.calendario_feed, name="calendario-feed"),
 ]
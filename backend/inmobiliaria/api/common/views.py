@@ -1,4 +1,7 @@
 from django.contrib.auth import get_user_model
+from django.http import Http404, StreamingHttpResponse
+from django.urls import reverse
+from django.views.decorators.http import require_safe
 
 from rest_framework import generics, status, filters
 from rest_framework.permissions import AllowAny, IsAuthenticated
@@ -8,11 +11,27 @@ from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework_simplejwt.views import TokenObtainPairView
 
-from inmobiliaria.models import Propiedad, Contrato, Pago, Reserva, Interesado
+from inmobiliaria.models import (
+    PropiedadCatalogo, Contrato, Pago, Reserva, Interesado, TokenCalendario, generar_token_calendario,
+)
+from inmobiliaria.filters import BusquedaTextoFilter
+from inmobiliaria.cache import CatalogoCacheMixin, respuesta_cacheada
+from inmobiliaria.condicional import (
+    ListaCondicionalMixin, etag_fuerte, poner_validadores, respuesta_no_modificada, ultima_modificacion,
+)
+from inmobiliaria.ical import generar_feed, querysets_usuario, validadores
+from inmobiliaria.campos import CamposDinamicosViewMixin
+from inmobiliaria.facetas import calcular_facetas
+from inmobiliaria.pagination import (
+    CursorOpcionalMixin,
+    CatalogoCursorPagination,
+    PagoCursorPagination,
+    ReservaCursorPagination,
+)
 from inmobiliaria.validators import validar_rut, normalizar_rut, validar_telefono_cl
 from django.core.exceptions import ValidationError as DjangoValidationError
 from inmobiliaria.serializers import (
-    PropiedadConFotosSerializer,
+    PropiedadCatalogoSerializer,
     ContratoSerializer,
     PagoSerializer,
     ReservaSerializer,
@@ -112,11 +131,15 @@ class CustomTokenObtainPairView(TokenObtainPairView):
 
 
 # Catálogo propiedades
-class CatalogoPropiedadesView(generics.ListAPIView):
+class CatalogoPropiedadesView(CatalogoCacheMixin, ListaCondicionalMixin, CamposDinamicosViewMixin, CursorOpcionalMixin, generics.ListAPIView):
+    # respuesta igual para todos los visitantes => se cachea por query string
     authentication_classes = []
     permission_classes = [AllowAny]
-    serializer_class = PropiedadConFotosSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    # se lee del modelo de lectura: una tabla, sin joins ni subconsultas por fila
+    serializer_class = PropiedadCatalogoSerializer
+    # ?paginacion=cursor para scroll infinito (orden -fecha_registro, precio o -precio)
+    cursor_pagination_class = CatalogoCursorPagination
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, BusquedaTextoFilter]
 
     filterset_fields = {
         "ciudad": ["exact", "icontains"],
@@ -126,14 +149,11 @@ class CatalogoPropiedadesView(generics.ListAPIView):
         "precio": ["gte", "lte"],
     }
 
-    search_fields = ["titulo", "descripcion", "ciudad"]
     ordering_fields = ["precio", "metros2", "dormitorios", "baos", "fecha_registro"]
     ordering = ["-fecha_registro"]
 
     def get_queryset(self):
-        qs = Propiedad.objects.all()
-
-        qs = qs.filter(aprobada=True)
+        qs = PropiedadCatalogo.objects.con_estado_actual().filter(aprobada=True)
 
         ciudad = self.request.query_params.get('ciudad')
         if ciudad:
@@ -145,7 +165,7 @@ class CatalogoPropiedadesView(generics.ListAPIView):
 
         estado = self.request.query_params.get('estado')
         if estado:
-            qs = qs.filter(estado__iexact=estado)
+            qs = qs.filter(estado_actual__iexact=estado)
 
         pmin = self.request.query_params.get('precio_min')
         if pmin:
@@ -157,6 +177,30 @@ class CatalogoPropiedadesView(generics.ListAPIView):
 
         return qs
 
+    def recortar_queryset(self, qs, incluir, omitir):
+        # la tarjeta completa está en 'datos'; no se lee si alcanza con las columnas
+        if PropiedadCatalogoSerializer.solo_columnas(incluir):
+            return qs.defer("datos")
+        return qs
+
+    def get_validadores(self, queryset):
+        r = queryset.resumen_validadores()
+        etag = etag_fuerte(self.request.get_full_path(), r["total"], r["ultima"], r["vencidas"])
+        return etag, ultima_modificacion(r["ultima"], r["vencida_max"])
+
+
+
+class CatalogoFacetasView(APIView):
+    """
+    Conteos por faceta (tipo, ciudad, dormitorios, baños, precio) para los
+    filtros actuales del catálogo (mismos parámetros que PropiedadFilter).
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        return respuesta_cacheada(request, lambda: Response(calcular_facetas(request.query_params)))
+
 
 
 # Mixtas
@@ -168,20 +212,21 @@ class MisContratosView(generics.ListAPIView):
         user = self.request.user
         rol = getattr(user, "rol", "")
         if rol == "ADMIN":
-            return Contrato.objects.all().select_related("comprador_arrendatario", "propiedad")
+            return Contrato.objects.all().select_related("comprador_arrendatario", "propiedad").con_libro()
         if rol == "CLIENTE":
             return Contrato.objects.filter(
                 comprador_arrendatario__usuario=user
-            ).select_related("comprador_arrendatario", "propiedad")
+            ).select_related("comprador_arrendatario", "propiedad").con_libro()
         if rol == "PROPIETARIO":
             return Contrato.objects.filter(
                 propiedad__propietario_user=user
-            ).select_related("comprador_arrendatario", "propiedad")
+            ).select_related("comprador_arrendatario", "propiedad").con_libro()
         return Contrato.objects.none()
 
-class MisPagosView(generics.ListAPIView):
+class MisPagosView(CursorOpcionalMixin, generics.ListAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = PagoSerializer
+    cursor_pagination_class = PagoCursorPagination
     def get_queryset(self):
         user = self.request.user
         rol = getattr(user, "rol", "")
@@ -197,22 +242,23 @@ class MisPagosView(generics.ListAPIView):
             ).select_related("contrato", "contrato__comprador_arrendatario", "contrato__propiedad")
         return Pago.objects.none()
 
-class MisReservasView(generics.ListAPIView):
+class MisReservasView(CursorOpcionalMixin, generics.ListAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = ReservaSerializer
+    cursor_pagination_class = ReservaCursorPagination
     def get_queryset(self):
         user = self.request.user
         rol = getattr(user, "rol", "")
         if rol == "ADMIN":
-            return Reserva.objects.all().select_related("interesado", "propiedad")
+            return Reserva.objects.all().select_related("interesado").con_propiedad_estado()
         if rol == "CLIENTE":
             return Reserva.objects.filter(
                 interesado__usuario=user
-            ).select_related("interesado", "propiedad")
+            ).select_related("interesado").con_propiedad_estado()
         if rol == "PROPIETARIO":
             return Reserva.objects.filter(
                 propiedad__propietario_user=user
-            ).select_related("interesado", "propiedad")
+            ).select_related("interesado").con_propiedad_estado()
         return Reserva.objects.none()
     
 
@@ -243,4 +289,60 @@ class CambiarPasswordView(APIView):
         return Response(
             {"detail": "Contraseña actualizada correctamente."},
             status=status.HTTP_200_OK,
-        )
\ No newline at end of file
+        )
+
+
+# =====================
+# CALENDARIO (.ics)
+# =====================
+class CalendarioTokenView(APIView):
+    """
+    GET: URL del feed .ics del usuario (la crea la primera vez).
+    POST: genera un token nuevo; la URL anterior deja de funcionar.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def _respuesta(self, request, registro):
+        url = request.build_absolute_uri(reverse("calendario-feed", args=[registro.token]))
+        return Response({"url": url}, status=status.HTTP_200_OK)
+
+    def get(self, request):
+        registro, _ = TokenCalendario.objects.get_or_create(usuario=request.user)
+        return self._respuesta(request, registro)
+
+    def post(self, request):
+        registro, _ = TokenCalendario.objects.update_or_create(
+            usuario=request.user, defaults={"token": generar_token_calendario()}
+        )
+        return self._respuesta(request, registro)
+
+
+@require_safe
+def calendario_feed(request, token):
+    """
+    Feed iCalendar de visitas y vencimientos de cuotas, sin JWT: el token
+    de la URL identifica al usuario. Responde 304 si el cliente ya tiene
+    la versión actual.
+    """
+    registro = (
+        TokenCalendario.objects.select_related("usuario")
+        .filter(token=token, usuario__is_active=True)
+        .first()
+    )
+    if registro is None:
+        raise Http404("Calendario no encontrado.")
+
+    visitas, cuotas = querysets_usuario(registro.usuario)
+    etag, last_modified = validadores(visitas, cuotas)
+    no_modificada = respuesta_no_modificada(request, etag, last_modified)
+    if no_modificada is not None:
+        return no_modificada
+
+    response = StreamingHttpResponse(
+        generar_feed(visitas, cuotas, "Manque Corretajes"),
+        content_type="text/calendar; charset=utf-8",
+    )
+    response["Content-Disposition"] = 'inline; filename="manque-corretajes.ics"'
+    poner_validadores(response, etag, last_modified)
+    response["Cache-Control"] = "private, no-cache"
+    return response
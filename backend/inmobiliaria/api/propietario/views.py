@@ -2,6 +2,8 @@ from rest_framework import generics
 from rest_framework.permissions import IsAuthenticated
 
 from inmobiliaria.models import Propiedad, Propietario, Reserva, Contrato, Pago
+from inmobiliaria.pagination import CursorOpcionalMixin, PagoCursorPagination, ReservaCursorPagination
+from inmobiliaria.campos import CamposDinamicosViewMixin
 from .serializers import PropietarioPerfilSerializer
 
 from inmobiliaria.serializers import (
@@ -41,7 +43,7 @@ def _get_propietario_for_user(user):
     return propietario
 
 
-class MisPropiedadesPropietarioView(generics.ListAPIView):
+class MisPropiedadesPropietarioView(CamposDinamicosViewMixin, generics.ListAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = PropiedadConFotosSerializer
 
@@ -50,12 +52,19 @@ class MisPropiedadesPropietarioView(generics.ListAPIView):
         propietario = _get_propietario_for_user(user)
         if not propietario:
             return Propiedad.objects.none()
-        return Propiedad.objects.filter(propietario=propietario).order_by("-fecha_registro")
+        return (
+            Propiedad.objects
+            .con_estado_calculado()
+            .con_fotos()
+            .filter(propietario=propietario)
+            .order_by("-fecha_registro")
+        )
 
 
-class MisReservasPropietarioView(generics.ListAPIView):
+class MisReservasPropietarioView(CursorOpcionalMixin, generics.ListAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = ReservaSerializer
+    cursor_pagination_class = ReservaCursorPagination
 
     def get_queryset(self):
         user = self.request.user
@@ -65,7 +74,8 @@ class MisReservasPropietarioView(generics.ListAPIView):
         return (
             Reserva.objects
             .filter(propiedad__propietario=propietario)
-            .select_related("interesado", "propiedad")
+            .select_related("interesado")
+            .con_propiedad_estado()
             .order_by("-fecha")
         )
 
@@ -83,13 +93,15 @@ class MisContratosPropietarioView(generics.ListAPIView):
             Contrato.objects
             .filter(propiedad__propietario=propietario)
             .select_related("comprador_arrendatario", "propiedad")
+            .con_libro()
             .order_by("-fecha_firma")
         )
 
 
-class MisPagosPropietarioView(generics.ListAPIView):
+class MisPagosPropietarioView(CursorOpcionalMixin, generics.ListAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = PagoSerializer
+    cursor_pagination_class = PagoCursorPagination
 
     def get_queryset(self):
         user = self.request.user
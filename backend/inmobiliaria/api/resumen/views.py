@@ -1,7 +1,7 @@
 from datetime import date, timedelta, datetime, time
 
 from django.utils import timezone
-from django.db.models import Sum, Count, OuterRef, Exists, Min, Value, CharField
+from django.db.models import Sum, Count, OuterRef, Exists, Min, Q, Value, CharField
 from django.db.models.functions import TruncDay, TruncWeek, TruncMonth, Concat
 
 from rest_framework.views import APIView
@@ -47,6 +47,8 @@ def _dt_range(desde: date, hasta: date):
 def build_deudores(*, hasta: date, propiedad_id=None):
     hoy = timezone.localdate()
 
+    # la deuda sale de las cuotas mismas: proximo_vencimiento del contrato es
+    # un resumen derivado y puede ir atrasado respecto de ellas
     qs = (
         CuotaContrato.objects
         .select_related("contrato", "contrato__propiedad", "contrato__comprador_arrendatario")
@@ -206,6 +208,12 @@ class ReporteResumenAPIView(APIView):
         prox_count = prox.count()
         prox_total = _as_float(prox.aggregate(t=Sum("monto"))["t"])
 
+        # Cartera: una fila por contrato (libro)
+        cartera = contratos_qs.filter(vigente=True, tipo="arriendo").aggregate(
+            saldo=Sum("monto_pendiente"),
+            en_mora=Count("id", filter=Q(proximo_vencimiento__lt=hoy)),
+        )
+
         # ------------------------
         # Top propiedades por ingresos en periodo
         # ------------------------
@@ -294,6 +302,8 @@ class ReporteResumenAPIView(APIView):
                 "vencidas_total": mora_total,
                 "proximas_7d_count": prox_count,
                 "proximas_7d_total": prox_total,
+                "contratos_en_mora": cartera["en_mora"],
+                "saldo_pendiente_total": _as_float(cartera["saldo"]),
             },
             "top_propiedades": top_propiedades_out,
             "serie_ingresos": serie_out,
@@ -0,0 +1,139 @@
+import hashlib
+from datetime import datetime, timezone as dt_timezone
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import parse_http_date_safe
+from rest_framework.response import Response
+
+from .condicional import poner_validadores, respuesta_no_modificada
+
+# Al invalidar no se borran claves: se sube la versión y las respuestas
+# anteriores quedan huérfanas hasta que venzan.
+CATALOGO_VERSION_KEY = "catalogo:version"
+CATALOGO_HITS_KEY = "catalogo:hits"
+CATALOGO_MISSES_KEY = "catalogo:misses"
+CATALOGO_INVALIDACIONES_KEY = "catalogo:invalidaciones"
+
+
+def _incr(clave, delta=1):
+    try:
+        return cache.incr(clave, delta)
+    except ValueError:
+        # no existe todavía (o fue desalojada)
+        cache.add(clave, 0, timeout=None)
+        return cache.incr(clave, delta)
+
+
+def catalogo_version() -> int:
+    version = cache.get(CATALOGO_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOGO_VERSION_KEY, 1, timeout=None)
+        version = cache.get(CATALOGO_VERSION_KEY, 1)
+    return version
+
+
+def _invalidar_ahora():
+    if cache.get(CATALOGO_VERSION_KEY) is None:
+        cache.add(CATALOGO_VERSION_KEY, 1, timeout=None)
+    _incr(CATALOGO_VERSION_KEY)
+    _incr(CATALOGO_INVALIDACIONES_KEY)
+
+
+def invalidar_catalogo():
+    """
+    Invalida las respuestas cacheadas del catálogo cuando la transacción
+    actual confirme (así no se recachea el estado viejo antes del commit).
+    """
+    transaction.on_commit(_invalidar_ahora)
+
+
+def clave_catalogo(request) -> str:
+    """
+    Clave por host + ruta + query params normalizados (orden de parámetros y
+    valores vacíos no cambian la clave).
+    """
+    params = sorted(
+        (k, v)
+        for k in request.query_params
+        for v in request.query_params.getlist(k)
+        if v != ""
+    )
+    base = f"{request.scheme}://{request.get_host()}{request.path}?{urlencode(params)}"
+    digest = hashlib.md5(base.encode("utf-8")).hexdigest()
+    return f"catalogo:v{catalogo_version()}:{digest}"
+
+
+def registrar_hit():
+    _incr(CATALOGO_HITS_KEY)
+
+
+def registrar_miss():
+    _incr(CATALOGO_MISSES_KEY)
+
+
+def estadisticas_catalogo() -> dict:
+    valores = cache.get_many([CATALOGO_HITS_KEY, CATALOGO_MISSES_KEY, CATALOGO_INVALIDACIONES_KEY])
+    hits = valores.get(CATALOGO_HITS_KEY, 0)
+    misses = valores.get(CATALOGO_MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        "backend": settings.CACHES["default"]["BACKEND"].rsplit(".", 1)[-1],
+        "ttl": settings.CATALOGO_CACHE_TTL,
+        "version": catalogo_version(),
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / total, 4) if total else None,
+        "invalidaciones": valores.get(CATALOGO_INVALIDACIONES_KEY, 0),
+    }
+
+
+def _respuesta_desde_cache(request, entrada):
+    etag = entrada["etag"]
+    if etag is None:
+        return Response(entrada["data"])
+
+    ts = parse_http_date_safe(entrada["last_modified"] or "")
+    last_modified = datetime.fromtimestamp(ts, tz=dt_timezone.utc) if ts else None
+    no_modificada = respuesta_no_modificada(request, etag, last_modified)
+    if no_modificada is not None:
+        return no_modificada
+    return poner_validadores(Response(entrada["data"]), etag, last_modified)
+
+
+def respuesta_cacheada(request, calcular):
+    """
+    Devuelve la respuesta cacheada para esta URL del catálogo o la calcula
+    con calcular() y la guarda si fue 200 (junto con su ETag/Last-Modified,
+    así un HIT también puede responder 304). Agrega el header X-Cache.
+    """
+    clave = clave_catalogo(request)
+    entrada = cache.get(clave)
+    if entrada is not None:
+        registrar_hit()
+        response = _respuesta_desde_cache(request, entrada)
+        response["X-Cache"] = "HIT"
+        return response
+
+    registrar_miss()
+    response = calcular()
+    if response.status_code == 200:
+        cache.set(clave, {
+            "data": response.data,
+            "etag": response.get("ETag"),
+            "last_modified": response.get("Last-Modified"),
+        }, timeout=settings.CATALOGO_CACHE_TTL)
+    response["X-Cache"] = "MISS"
+    return response
+
+
+class CatalogoCacheMixin:
+    """
+    Cachea la respuesta de list() de una vista pública (sin autenticación),
+    cuya salida depende solo de la URL.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return respuesta_cacheada(request, lambda: super(CatalogoCacheMixin, self).list(request, *args, **kwargs))
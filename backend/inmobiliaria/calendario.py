@@ -0,0 +1,79 @@
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+# Calendario de feriados en memoria del proceso. Guardar / borrar un Feriado
+# sube la versión en la cache compartida y cada worker recarga al ver el
+# cambio; con LocMemCache (sin Redis) el máximo de FERIADOS_CACHE_SEG acota
+# lo que tarda en enterarse otro proceso.
+FERIADOS_VERSION_KEY = "feriados:version"
+
+_feriados = None  # (versión, cargado en, frozenset de fechas)
+_lock = threading.Lock()
+
+
+def _version():
+    version = cache.get(FERIADOS_VERSION_KEY)
+    if version is None:
+        cache.add(FERIADOS_VERSION_KEY, 1, timeout=None)
+        version = cache.get(FERIADOS_VERSION_KEY, 1)
+    return version
+
+
+def feriados() -> frozenset:
+    """
+    Fechas feriadas. Sin consultas mientras la versión no cambie.
+    """
+    from .models import Feriado
+
+    global _feriados
+    version = _version()
+    with _lock:
+        if (
+            _feriados is None
+            or _feriados[0] != version
+            or time.monotonic() - _feriados[1] >= settings.FERIADOS_CACHE_SEG
+        ):
+            fechas = frozenset(Feriado.objects.values_list("fecha", flat=True))
+            _feriados = (version, time.monotonic(), fechas)
+        return _feriados[2]
+
+
+def _invalidar_ahora():
+    global _feriados
+    with _lock:
+        _feriados = None
+    try:
+        cache.incr(FERIADOS_VERSION_KEY)
+    except ValueError:
+        cache.add(FERIADOS_VERSION_KEY, 1, timeout=None)
+
+
+def invalidar_feriados():
+    transaction.on_commit(_invalidar_ahora)
+
+
+def es_feriado(fecha) -> bool:
+    return fecha in feriados()
+
+
+def es_habil(fecha, festivos=None) -> bool:
+    # Lunes(0) a Viernes(4) y no feriados
+    festivos = feriados() if festivos is None else festivos
+    return fecha.weekday() <= 4 and fecha not in festivos
+
+
+def dias_habiles(inicio, fin):
+    """
+    Días hábiles de inicio a fin (inclusive), con una sola lectura del calendario.
+    """
+    festivos = feriados()
+    fecha = inicio
+    while fecha <= fin:
+        if es_habil(fecha, festivos):
+            yield fecha
+        fecha += timedelta(days=1)
@@ -0,0 +1,90 @@
+from rest_framework.permissions import SAFE_METHODS
+
+# ?fields=id,titulo,precio  -> solo esos campos
+# ?omit=descripcion,fotos   -> todos menos esos
+PARAM_CAMPOS = "fields"
+PARAM_OMITIR = "omit"
+
+
+def _lista(valor):
+    return {c.strip() for c in (valor or "").split(",") if c.strip()}
+
+
+def campos_solicitados(request):
+    """
+    Retorna (incluir, omitir): 'incluir' es None si no se pidió ?fields=.
+    Solo aplica a lecturas.
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return None, set()
+    params = request.query_params
+    incluir = _lista(params.get(PARAM_CAMPOS)) or None
+    return incluir, _lista(params.get(PARAM_OMITIR))
+
+
+def seleccionar(nombres, incluir, omitir):
+    return [n for n in nombres if (incluir is None or n in incluir) and n not in omitir]
+
+
+class CamposDinamicosMixin:
+    """
+    Serializer que recorta sus campos según context["campos"] = (incluir, omitir).
+    El contexto lo pone CamposDinamicosViewMixin; serializers anidados no se
+    recortan.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        incluir, omitir = self.context.get("campos") or (None, set())
+        if incluir is None and not omitir:
+            return
+        conservar = set(seleccionar(self.fields, incluir, omitir))
+        for nombre in list(self.fields):
+            if nombre not in conservar:
+                self.fields.pop(nombre)
+
+
+class CamposDinamicosViewMixin:
+    """
+    Lleva ?fields= / ?omit= al serializer y al queryset: las columnas que
+    ningún campo pedido usa se difieren (.only()) y, si no se pide ningún
+    campo que use una precarga, se quita el prefetch.
+
+    El serializer puede declarar:
+      - campos_dependencias: {campo: (columnas del modelo que lee)}
+      - campos_prefetch: campos que usan los prefetch del queryset
+    """
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["campos"] = campos_solicitados(self.request)
+        return context
+
+    def filter_queryset(self, queryset):
+        # en filter_queryset (no get_queryset) para que corra después de los
+        # prefetch/annotate que agrega la vista
+        qs = super().filter_queryset(queryset)
+        incluir, omitir = campos_solicitados(self.request)
+        if incluir is None and not omitir:
+            return qs
+        return self.recortar_queryset(qs, incluir, omitir)
+
+    def recortar_queryset(self, qs, incluir, omitir):
+        serializer_class = self.get_serializer_class()
+        elegidos = set(seleccionar(serializer_class().fields, incluir, omitir))
+
+        dependencias = getattr(serializer_class, "campos_dependencias", {})
+        columnas = set()
+        for nombre in elegidos:
+            columnas.update(dependencias.get(nombre, (nombre,)))
+
+        modelo = qs.model
+        solo = [
+            f.name for f in modelo._meta.concrete_fields
+            if f.primary_key or f.name in columnas
+        ]
+        qs = qs.only(*solo)
+
+        if not elegidos & set(getattr(serializer_class, "campos_prefetch", ())):
+            qs = qs.prefetch_related(None)
+        return qs
@@ -0,0 +1,89 @@
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from .cache import invalidar_catalogo
+
+TAMANO_LOTE = 500
+
+
+def _filas(ids, now):
+    from .models import Propiedad, PropiedadCatalogo, Reserva
+    from .serializers import PropiedadConFotosSerializer
+
+    reserva_hasta = (
+        Reserva.objects
+        .filter(propiedad_id=OuterRef("pk"), activa=True, expires_at__gt=now)
+        .order_by("-expires_at")
+        .values("expires_at")[:1]
+    )
+    qs = (
+        Propiedad.objects
+        .filter(pk__in=ids)
+        .con_estado_calculado(now)
+        .con_fotos()
+        .annotate(_reservada_hasta=Subquery(reserva_hasta))
+    )
+    for p in qs:
+        datos = dict(PropiedadConFotosSerializer(p).data)
+        estado = datos.pop("estado")
+        yield PropiedadCatalogo(
+            propiedad_id=p.pk,
+            aprobada=p.aprobada,
+            titulo=p.titulo,
+            ciudad=p.ciudad,
+            tipo=p.tipo,
+            dormitorios=p.dormitorios,
+            baos=p.baos,
+            metros2=p.metros2,
+            precio=p.precio,
+            fecha_registro=p.fecha_registro,
+            updated_at=p.updated_at,
+            estado=estado,
+            reservada_hasta=p._reservada_hasta if estado == "reservada" else None,
+            foto_principal=datos.get("foto_principal") or "",
+            fotos_count=len(datos.get("fotos") or []),
+            datos=datos,
+        )
+
+
+def actualizar_catalogo(ids) -> int:
+    """
+    Recalcula las filas de PropiedadCatalogo de esas propiedades (las que ya
+    no existen solo se borran).
+    """
+    from .models import PropiedadCatalogo
+
+    ids = sorted({i for i in ids if i})
+    total = 0
+    for i in range(0, len(ids), TAMANO_LOTE):
+        lote = ids[i:i + TAMANO_LOTE]
+        filas = list(_filas(lote, timezone.now()))
+        with transaction.atomic():
+            PropiedadCatalogo.objects.filter(propiedad_id__in=lote).delete()
+            PropiedadCatalogo.objects.bulk_create(filas)
+        total += len(filas)
+    return total
+
+
+def refrescar_catalogo(ids) -> None:
+    """
+    Programa la actualización del modelo de lectura al confirmar la
+    transacción actual, y luego invalida la cache de respuestas.
+    """
+    ids = {i for i in ids if i}
+    if not ids:
+        return
+    transaction.on_commit(lambda: actualizar_catalogo(ids))
+    invalidar_catalogo()
+
+
+def reconstruir_catalogo(batch_size=TAMANO_LOTE) -> int:
+    from .models import Propiedad, PropiedadCatalogo
+
+    ids = list(Propiedad.objects.order_by("pk").values_list("pk", flat=True))
+    total = 0
+    for i in range(0, len(ids), batch_size):
+        total += actualizar_catalogo(ids[i:i + batch_size])
+    PropiedadCatalogo.objects.exclude(propiedad_id__in=Propiedad.objects.values("pk")).delete()
+    return total
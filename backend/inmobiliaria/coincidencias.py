@@ -0,0 +1,137 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F, Q
+
+from .search import normalizar_texto
+
+TAMANO_LOTE = 500
+
+TITULO_NOTIFICACION = "Nueva propiedad para tu búsqueda"
+
+
+def _calza(solicitud, precio) -> bool:
+    return (
+        (solicitud.presupuesto_min is None or solicitud.presupuesto_min <= precio)
+        and (solicitud.presupuesto_max is None or solicitud.presupuesto_max >= precio)
+    )
+
+
+def solicitudes_candidatas(tipo, ciudad_clave, precio_min, precio_max):
+    """
+    Solicitudes abiertas de ese tipo y ciudad cuyo presupuesto se cruza con
+    [precio_min, precio_max]. Usa el índice (tipo_propiedad, ciudad_clave,
+    estado, presupuesto_min).
+    """
+    from .models import SolicitudCliente
+
+    return (
+        SolicitudCliente.objects
+        .filter(
+            tipo_propiedad=tipo,
+            ciudad_clave=ciudad_clave,
+            estado__in=SolicitudCliente.ESTADOS_ABIERTOS,
+        )
+        .filter(Q(presupuesto_min__isnull=True) | Q(presupuesto_min__lte=precio_max))
+        .filter(Q(presupuesto_max__isnull=True) | Q(presupuesto_max__gte=precio_min))
+        .annotate(_usuario_id=F("interesado__usuario"))
+        .order_by()
+    )
+
+
+def emparejar_propiedades(propiedades) -> int:
+    """
+    Cruza propiedades aprobadas y disponibles con las solicitudes abiertas:
+    una consulta por grupo (tipo, ciudad), sin recorrer todas las
+    solicitudes. Los pares nuevos se guardan como SolicitudCoincidencia y se
+    notifica al cliente, todo con bulk_create; solo se notifican los pares que
+    este llamado insertó. Retorna cuántos pares nuevos hubo.
+    """
+    from .models import Notificacion, SolicitudCoincidencia
+
+    grupos = defaultdict(list)
+    for p in propiedades:
+        if p.aprobada and p.estado == "disponible":
+            grupos[(p.tipo, normalizar_texto(p.ciudad or "").strip())].append(p)
+
+    total = 0
+    for (tipo, ciudad_clave), props in grupos.items():
+        precios = [p.precio for p in props]
+        solicitudes = list(solicitudes_candidatas(tipo, ciudad_clave, min(precios), max(precios)))
+        if not solicitudes:
+            continue
+
+        existentes = set(
+            SolicitudCoincidencia.objects
+            .filter(propiedad__in=[p.pk for p in props])
+            .values_list("solicitud_id", "propiedad_id")
+        )
+
+        nuevas, pares = [], {}
+        for p in props:
+            for s in solicitudes:
+                if (s.pk, p.pk) in existentes or not _calza(s, p.precio):
+                    continue
+                nuevas.append(SolicitudCoincidencia(solicitud_id=s.pk, propiedad_id=p.pk))
+                pares[(s.pk, p.pk)] = (s, p)
+        if not nuevas:
+            continue
+
+        with transaction.atomic():
+            SolicitudCoincidencia.objects.bulk_create(nuevas, ignore_conflicts=True, batch_size=TAMANO_LOTE)
+            # ignore_conflicts no dice cuáles entraron: las de este proceso son
+            # las filas con el created_at que bulk_create (auto_now_add) dejó en
+            # cada objeto; un par que otro proceso insertó entremedio ya se notificó
+            escritas = {(c.solicitud_id, c.propiedad_id, c.created_at) for c in nuevas}
+            creadas = [
+                pares[(s_id, p_id)]
+                for s_id, p_id, creado in SolicitudCoincidencia.objects.filter(
+                    propiedad__in=[p.pk for p in props],
+                    created_at__gte=min(c.created_at for c in nuevas),
+                ).values_list("solicitud_id", "propiedad_id", "created_at")
+                if (s_id, p_id, creado) in escritas
+            ]
+            Notificacion.objects.bulk_create(
+                [
+                    Notificacion(
+                        usuario_id=s._usuario_id,
+                        titulo=TITULO_NOTIFICACION,
+                        mensaje=(
+                            f"La propiedad '{p.titulo}' en {p.ciudad} coincide con tu solicitud "
+                            f"de {s.get_tipo_operacion_display().lower()}."
+                        ),
+                        tipo="SISTEMA",
+                    )
+                    for s, p in creadas
+                    if s._usuario_id
+                ],
+                batch_size=TAMANO_LOTE,
+            )
+        total += len(creadas)
+    return total
+
+
+def emparejar_todo(batch_size=TAMANO_LOTE) -> tuple[int, int]:
+    """
+    Re-cruce completo (tarea nocturna): recorre las propiedades publicadas por
+    lotes. Los pares ya registrados no se vuelven a notificar.
+    Retorna (propiedades revisadas, coincidencias nuevas).
+    """
+    from .models import Propiedad
+
+    qs = (
+        Propiedad.objects
+        .filter(aprobada=True, estado="disponible")
+        .only("pk", "titulo", "ciudad", "tipo", "precio", "aprobada", "estado")
+        .order_by("pk")
+    )
+    revisadas = nuevas = 0
+    ultimo = 0
+    while True:
+        lote = list(qs.filter(pk__gt=ultimo)[:batch_size])
+        if not lote:
+            break
+        ultimo = lote[-1].pk
+        revisadas += len(lote)
+        nuevas += emparejar_propiedades(lote)
+    return revisadas, nuevas
@@ -0,0 +1,61 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+def etag_fuerte(*partes) -> str:
+    """
+    ETag fuerte a partir de los valores que determinan la respuesta.
+    """
+    digest = hashlib.sha1("|".join(str(p) for p in partes).encode("utf-8")).hexdigest()
+    return f'"{digest}"'
+
+
+def _timestamp(fecha):
+    return int(fecha.timestamp()) if fecha else None
+
+
+def ultima_modificacion(*fechas):
+    fechas = [f for f in fechas if f]
+    return max(fechas) if fechas else None
+
+
+def poner_validadores(response, etag, last_modified=None):
+    response["ETag"] = etag
+    if last_modified:
+        response["Last-Modified"] = http_date(_timestamp(last_modified))
+    # el cliente puede guardar la respuesta, pero debe revalidar siempre
+    response["Cache-Control"] = "no-cache"
+    return response
+
+
+def respuesta_no_modificada(request, etag, last_modified=None):
+    """
+    304 si If-None-Match / If-Modified-Since coinciden; si no, None.
+    Se llama antes de cargar y serializar el recurso.
+    """
+    response = get_conditional_response(request, etag=etag, last_modified=_timestamp(last_modified))
+    if response is None:
+        return None
+    return poner_validadores(response, etag, last_modified)
+
+
+class ListaCondicionalMixin:
+    """
+    list() con ETag / Last-Modified: la vista define get_validadores(queryset)
+    -> (etag, last_modified), calculado con una consulta liviana; si el
+    cliente ya tiene esa versión se responde 304 sin paginar ni serializar.
+    """
+
+    def list(self, request, *args, **kwargs):
+        assert hasattr(self, "get_validadores"), (
+            f"'{self.__class__.__name__}' usa ListaCondicionalMixin y debe definir "
+            "get_validadores(queryset) -> (etag, last_modified)."
+        )
+        etag, last_modified = self.get_validadores(self.filter_queryset(self.get_queryset()))
+        no_modificada = respuesta_no_modificada(request, etag, last_modified)
+        if no_modificada is not None:
+            return no_modificada
+        response = super().list(request, *args, **kwargs)
+        return poner_validadores(response, etag, last_modified)
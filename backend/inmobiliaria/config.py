@@ -10,6 +10,9 @@ VENTANA_FUTURA_MAX_DIAS = 30
 
 MAX_VISITAS_ACTIVAS_POR_INTERESADO = 3
 
+# Propiedades por consulta de disponibilidad (?propiedades=1,2,...)
+MAX_PROPIEDADES_DISPONIBILIDAD = 100
+
 # Estado de la visita
 ESTADOS_ACTIVOS = ("agendada", "confirmada")
 
@@ -19,3 +22,19 @@ MAX_DAYS_PAGE = 31
 
 # Minutos mínimos antes de la reservación (0 = solo bloquear pasado)
 LEAD_MINUTES = 0
+
+# Facetas del catálogo: el último tramo es "o más"
+FACETA_DORMITORIOS = (0, 1, 2, 3, 4)
+FACETA_BANOS = (0, 1, 2, 3)
+
+# Límites inferiores (CLP) de los rangos de precio de la faceta
+FACETA_RANGOS_PRECIO = (0, 500_000, 1_000_000, 50_000_000, 100_000_000, 200_000_000, 400_000_000)
+
+# Propiedades similares: cantidad por defecto y máxima (?k=)
+SIMILARES_K = 6
+SIMILARES_K_MAX = 24
+
+# Derivados de PropiedadFoto: lado mayor máximo en px (no se agranda)
+TAMANOS_FOTO = {"small": 320, "medium": 800, "large": 1600}
+CALIDAD_JPEG = 82
+CALIDAD_WEBP = 80
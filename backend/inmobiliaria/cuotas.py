@@ -0,0 +1,107 @@
+import calendar
+from datetime import date
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import libro
+
+# Generación de cuotas de arriendo: una cuota por mes desde el mes siguiente
+# a la firma, con vencimiento el dia_vencimiento() del contrato (recortado al
+# último día en meses cortos). Se calculan las fechas que faltan y se
+# insertan en bloque; la restricción única (contrato, vencimiento) cubre dos
+# procesos generando a la vez.
+
+HORIZONTE_MESES = 6
+TAMANO_LOTE = 500
+
+
+def vencimientos(contrato, hasta) -> list:
+    """
+    Fechas de vencimiento desde el mes siguiente a la firma hasta el mes de
+    `hasta` inclusive.
+    """
+    dia = contrato.dia_vencimiento()
+    desde = contrato.fecha_firma.year * 12 + contrato.fecha_firma.month  # mes siguiente (base 0)
+    fin = hasta.year * 12 + hasta.month - 1
+    fechas = []
+    for indice in range(desde, fin + 1):
+        anio, mes = divmod(indice, 12)
+        mes += 1
+        fechas.append(date(anio, mes, min(dia, calendar.monthrange(anio, mes)[1])))
+    return fechas
+
+
+def generar(contratos, hasta, now=None) -> int:
+    """
+    Crea las cuotas que faltan hasta `hasta` para los contratos de arriendo
+    vigentes: una consulta por las existentes y un bulk_create. Retorna
+    cuántas cuotas se crearon (sin las que otro proceso insertó entremedio).
+    """
+    from .models import CuotaContrato
+
+    contratos = [c for c in contratos if c.tipo == "arriendo" and c.vigente]
+    esperadas = {c.pk: (c, vencimientos(c, hasta)) for c in contratos}
+    fechas = [f for _, fs in esperadas.values() for f in fs]
+    if not fechas:
+        return 0
+
+    existentes = set(
+        CuotaContrato.objects
+        .filter(contrato_id__in=esperadas, vencimiento__gte=min(fechas), vencimiento__lte=max(fechas))
+        .values_list("contrato_id", "vencimiento")
+    )
+
+    # bulk_create no pasa por save(); auto_now igual pone updated_at (pre_save)
+    now = now or timezone.now()
+    nuevas = [
+        CuotaContrato(contrato_id=pk, vencimiento=f, monto=c.precio_pactado, pagada=False, updated_at=now)
+        for pk, (c, fs) in esperadas.items()
+        for f in fs
+        if (pk, f) not in existentes
+    ]
+    if not nuevas:
+        return 0
+    with transaction.atomic():
+        CuotaContrato.objects.bulk_create(nuevas, batch_size=TAMANO_LOTE, ignore_conflicts=True)
+        # ignore_conflicts no dice cuáles entraron: las de este proceso son
+        # las filas con el updated_at que bulk_create (auto_now) dejó en cada
+        # objeto; las que insertó otro proceso entremedio tienen el suyo
+        escritas = {(c.contrato_id, c.vencimiento, c.updated_at) for c in nuevas}
+        creadas = sum(
+            fila in escritas
+            for fila in CuotaContrato.objects.filter(
+                contrato_id__in={c.contrato_id for c in nuevas},
+                vencimiento__gte=min(c.vencimiento for c in nuevas),
+                vencimiento__lte=max(c.vencimiento for c in nuevas),
+            ).values_list("contrato_id", "vencimiento", "updated_at")
+        )
+        # bulk_create no dispara post_save: libro a mano
+        libro.recalcular({c.contrato_id for c in nuevas})
+    return creadas
+
+
+def extender_horizonte(hasta, batch_size=TAMANO_LOTE) -> dict:
+    """
+    generar() para todos los contratos de arriendo vigentes, por lotes de
+    batch_size (keyset por pk). Retorna estadísticas para el comando.
+    """
+    from .models import Contrato
+
+    qs = (
+        Contrato.objects
+        .filter(tipo="arriendo", vigente=True)
+        .only("id", "tipo", "vigente", "fecha_firma", "precio_pactado")
+        .order_by("pk")
+    )
+    stats = {"contratos": 0, "cuotas": 0, "lotes": 0}
+    ultimo = 0
+    while True:
+        lote = list(qs.filter(pk__gt=ultimo)[:batch_size])
+        if not lote:
+            break
+        stats["cuotas"] += generar(lote, hasta)
+        stats["contratos"] += len(lote)
+        stats["lotes"] += 1
+        ultimo = lote[-1].pk
+    return stats
@@ -0,0 +1,170 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core import signing
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.http import content_disposition_header
+from rest_framework.decorators import action
+from rest_framework.reverse import reverse
+
+TAMANO_BLOQUE = 64 * 1024
+
+RANGO_REGEX = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# Links firmados: el frontend abre las descargas con un <a href> (sin header
+# Authorization), así que la URL lleva ?firma= con (basename, pk, campo)
+# firmado y con fecha; vale DESCARGAS_FIRMA_SEG segundos
+PARAM_FIRMA = "firma"
+SAL_FIRMA = "inmobiliaria.descargas"
+
+
+def _rango(header, tamano):
+    """
+    (inicio, fin) inclusive de un header Range de un solo tramo; None si no
+    aplica (sin header, varios tramos o sintaxis que no se entiende: se
+    responde el archivo completo) y ValueError si está fuera del archivo.
+    """
+    m = RANGO_REGEX.match((header or "").strip())
+    if not m or (not m.group(1) and not m.group(2)):
+        return None
+    inicio, fin = m.groups()
+    if not inicio:
+        # "bytes=-500": los últimos 500
+        largo = int(fin)
+        if largo == 0:
+            raise ValueError
+        return max(tamano - largo, 0), tamano - 1
+    inicio = int(inicio)
+    fin = min(int(fin), tamano - 1) if fin else tamano - 1
+    if inicio >= tamano or fin < inicio:
+        raise ValueError
+    return inicio, fin
+
+
+def _tramo(archivo, inicio, largo):
+    try:
+        archivo.seek(inicio)
+        while largo > 0:
+            bloque = archivo.read(min(TAMANO_BLOQUE, largo))
+            if not bloque:
+                break
+            largo -= len(bloque)
+            yield bloque
+    finally:
+        archivo.close()
+
+
+def _respuesta_django(request, campo, tipo):
+    tamano = campo.size
+    try:
+        rango = _rango(request.headers.get("Range"), tamano)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{tamano}"
+        return response
+
+    archivo = campo.storage.open(campo.name, "rb")
+    if rango is None:
+        # completo: FileResponse usa wsgi.file_wrapper (sendfile en gunicorn)
+        response = FileResponse(archivo, content_type=tipo)
+    else:
+        inicio, fin = rango
+        response = StreamingHttpResponse(_tramo(archivo, inicio, fin - inicio + 1), status=206, content_type=tipo)
+        response["Content-Range"] = f"bytes {inicio}-{fin}/{tamano}"
+        response["Content-Length"] = str(fin - inicio + 1)
+    response["Accept-Ranges"] = "bytes"
+    return response
+
+
+def servir_archivo(request, campo, adjunto=False):
+    """
+    Respuesta para un FileField ya autorizado. Según DESCARGAS_MODO:
+      - "nginx":    X-Accel-Redirect a DESCARGAS_PREFIJO_INTERNO + nombre
+      - "sendfile": X-Sendfile con la ruta en disco (Apache / lighttpd)
+      - "":         Django sirve el archivo (con soporte de Range)
+    En los dos primeros el proxy transfiere los bytes, no el worker.
+    """
+    if not campo:
+        raise Http404("El archivo no existe.")
+
+    nombre = os.path.basename(campo.name)
+    tipo = mimetypes.guess_type(nombre)[0] or "application/octet-stream"
+    modo = settings.DESCARGAS_MODO
+
+    if modo == "nginx":
+        response = HttpResponse(content_type=tipo)
+        response["X-Accel-Redirect"] = settings.DESCARGAS_PREFIJO_INTERNO + quote(campo.name)
+    elif modo == "sendfile":
+        response = HttpResponse(content_type=tipo)
+        response["X-Sendfile"] = campo.path
+    else:
+        if not campo.storage.exists(campo.name):
+            raise Http404("El archivo no existe.")
+        response = _respuesta_django(request, campo, tipo)
+
+    response["Content-Disposition"] = content_disposition_header(adjunto, nombre)
+    response["Cache-Control"] = "private, no-cache"
+    response["X-Content-Type-Options"] = "nosniff"
+    return response
+
+
+def firmar(basename, pk, campo) -> str:
+    return signing.dumps([basename, int(pk), campo], salt=SAL_FIRMA, compress=True)
+
+
+def firma_valida(firma, basename, pk, campo) -> bool:
+    try:
+        datos = signing.loads(firma, salt=SAL_FIRMA, max_age=settings.DESCARGAS_FIRMA_SEG)
+    except signing.BadSignature:
+        # incluye SignatureExpired
+        return False
+    return datos == [basename, int(pk), campo]
+
+
+def url_descarga(request, basename, obj, campo="archivo"):
+    """
+    URL firmada de {basename}-descargar para obj (la del viewset con
+    DescargaArchivoMixin); None si no tiene archivo. Los serializers no
+    exponen la URL de /media/ de archivos privados: quien recibe este link
+    ya pasó el filtro por rol de la vista que lo serializó.
+    """
+    if not getattr(obj, campo, None):
+        return None
+    url = reverse(f"{basename}-descargar", args=[obj.pk], request=request)
+    return f"{url}?{PARAM_FIRMA}={firmar(basename, obj.pk, campo)}"
+
+
+class DescargaArchivoMixin:
+    """
+    Agrega GET {id}/descargar/ al viewset. Con ?firma= válida (url_descarga)
+    no se pide autenticación; sin firma, get_object() aplica el mismo filtro
+    por rol que el resto de la vista. ?adjunto=1 fuerza la descarga.
+    """
+    campo_archivo = "archivo"
+
+    def descarga_firmada(self) -> bool:
+        firma = self.request.query_params.get(PARAM_FIRMA)
+        pk = self.kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        return (
+            self.action == "descargar" and bool(firma) and str(pk).isdigit()
+            and firma_valida(firma, self.basename, pk, self.campo_archivo)
+        )
+
+    def check_permissions(self, request):
+        # la firma reemplaza a permission_classes (y a get_permissions() de la vista)
+        if self.descarga_firmada():
+            return
+        super().check_permissions(request)
+
+    @action(detail=True, methods=["get"], url_path="descargar")
+    def descargar(self, request, pk=None):
+        if self.descarga_firmada():
+            obj = get_object_or_404(self.get_serializer_class().Meta.model, pk=pk)
+        else:
+            obj = self.get_object()
+        adjunto = request.query_params.get("adjunto") in ("1", "true", "True")
+        return servir_archivo(request, getattr(obj, self.campo_archivo), adjunto=adjunto)
@@ -0,0 +1,128 @@
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import calendario
+from .config import (
+    INTERVALO_MANANA,
+    INTERVALO_PERMITIDOS,
+    INTERVALO_TARDE,
+    LEAD_MINUTES,
+    VENTANA_FUTURA_MAX_DIAS,
+)
+
+# Índice de horarios de visita: un entero por (propiedad, fecha) con un bit
+# por slot de INTERVALO_PERMITIDOS. "Qué propiedades tienen un slot libre el
+# martes en la tarde" es un AND de bits sobre una sola consulta.
+
+BIT_SLOT = {hora: 1 << i for i, hora in enumerate(INTERVALO_PERMITIDOS)}
+TODOS = (1 << len(INTERVALO_PERMITIDOS)) - 1
+
+
+def mascara(horas) -> int:
+    m = 0
+    for hora in horas:
+        m |= BIT_SLOT.get(hora, 0)
+    return m
+
+
+def horas(m) -> list:
+    return [hora for hora, bit in BIT_SLOT.items() if m & bit]
+
+
+FRANJAS = {
+    "manana": mascara(INTERVALO_MANANA),
+    "tarde": mascara(INTERVALO_TARDE),
+    "todo": TODOS,
+}
+
+
+def bloqueados(fecha, ahora=None) -> int:
+    """
+    Slots no agendables ese día para cualquier propiedad: todo el día si es
+    fin de semana, feriado (calendario.py) o pasado, o si queda fuera de la
+    ventana de VENTANA_FUTURA_MAX_DIAS; los que ya pasaron si es hoy.
+    """
+    if not calendario.es_habil(fecha):
+        return TODOS
+    ahora = timezone.localtime(ahora)
+    if fecha > ahora.date() + timedelta(days=VENTANA_FUTURA_MAX_DIAS):
+        return TODOS
+    if fecha > ahora.date():
+        return 0
+    if fecha < ahora.date():
+        return TODOS
+    corte = ahora + timedelta(minutes=LEAD_MINUTES)
+    return mascara(
+        h for h in INTERVALO_PERMITIDOS
+        if timezone.make_aware(datetime.combine(fecha, h), ahora.tzinfo) < corte
+    )
+
+
+def recalcular(pares) -> None:
+    """
+    Reconstruye la máscara de cada (propiedad_id, fecha) desde sus visitas:
+    una lectura y un upsert por par.
+
+    Dos visitas agendadas a la vez en la misma propiedad y día calculan la
+    máscara cada una con su foto de los datos; sin lock, la última en
+    escribir borraría el bit de la otra. Por eso cada par se recalcula con
+    la fila de la propiedad bloqueada (los recálculos de una propiedad van
+    de a uno) y las visitas se leen con select_for_update, que ve las ya
+    confirmadas aunque la transacción haya empezado antes.
+    """
+    from .models import DisponibilidadVisita, Propiedad, Visita
+
+    # en orden: dos recálculos con varios pares toman los locks igual
+    for propiedad_id, fecha in sorted({(p, f) for p, f in pares if p and f}):
+        with transaction.atomic():
+            list(Propiedad.objects.select_for_update().filter(pk=propiedad_id).values_list("pk", flat=True))
+            ocupados = mascara(
+                Visita.objects.select_for_update()
+                .filter(propiedad_id=propiedad_id, fecha=fecha)
+                .values_list("hora", flat=True)
+            )
+            if ocupados:
+                DisponibilidadVisita.objects.bulk_create(
+                    [DisponibilidadVisita(propiedad_id=propiedad_id, fecha=fecha, ocupados=ocupados)],
+                    update_conflicts=True,
+                    unique_fields=["fecha", "propiedad"],
+                    update_fields=["ocupados"],
+                )
+            else:
+                DisponibilidadVisita.objects.filter(propiedad_id=propiedad_id, fecha=fecha).delete()
+
+
+def libres_por_propiedad(ids, fecha, franja=TODOS, ahora=None) -> dict:
+    """
+    {propiedad_id: máscara de slots libres dentro de 'franja'} para las
+    propiedades de 'ids' con al menos uno libre ese día. Sin fila en el
+    índice = día libre, así que antes se descartan los ids que no son
+    propiedades aprobadas y aún visitables (no arrendadas ni vendidas).
+    """
+    from .models import DisponibilidadVisita, Propiedad
+
+    disponible = franja & ~bloqueados(fecha, ahora)
+    if not disponible:
+        return {}
+    visitables = set(
+        Propiedad.objects
+        .filter(id__in=ids, estado_aprobacion="aprobada")
+        .exclude(estado__in=("arrendada", "vendida"))
+        .values_list("id", flat=True)
+    )
+    ids = [pk for pk in ids if pk in visitables]
+    if not ids:
+        return {}
+    ocupados = dict(
+        DisponibilidadVisita.objects
+        .filter(fecha=fecha, propiedad_id__in=ids)
+        .values_list("propiedad_id", "ocupados")
+    )
+    libres = {}
+    for pk in ids:
+        m = disponible & ~ocupados.get(pk, 0)
+        if m:
+            libres[pk] = m
+    return libres
@@ -0,0 +1,110 @@
+from django.db.models import F
+from django.utils import timezone
+
+# Estado de Propiedad (disponible / reservada / arrendada / vendida): todas
+# las escrituras pasan por acá. La regla es la de con_estado_calculado():
+# contrato vigente > reserva vigente > disponible; arrendada/vendida no se
+# vuelven a abrir solas.
+
+ESTADOS_FINALES = ("arrendada", "vendida")
+TAMANO_LOTE = 1000
+
+# evento -> (estados de origen, estado destino). Firmar un contrato manda
+# sobre el estado final anterior (p.ej. se vende una propiedad que estuvo
+# arrendada): vender / arrendar parten también de arrendada / vendida.
+TRANSICIONES = {
+    "reservar": (("disponible",), "reservada"),
+    "vender": (("disponible", "reservada", "arrendada"), "vendida"),
+    "arrendar": (("disponible", "reservada", "vendida"), "arrendada"),
+}
+
+
+def aplicar(evento, ids, now=None) -> int:
+    """
+    Transición directa cuando quien llama ya validó el destino (p.ej. la
+    reserva recién creada): un UPDATE para todos los ids. Retorna cuántas
+    propiedades cambiaron.
+    """
+    from .catalogo import refrescar_catalogo
+    from .models import Propiedad
+
+    origenes, destino = TRANSICIONES[evento]
+    ids = {i for i in ids if i}
+    if not ids:
+        return 0
+
+    cambiadas = (
+        Propiedad.objects
+        .filter(id__in=ids, estado__in=origenes)
+        .update(estado=destino, updated_at=now or timezone.now())
+    )
+    if cambiadas:
+        # .update() no dispara señales
+        refrescar_catalogo(ids)
+    return cambiadas
+
+
+def pendientes(ids, now=None) -> dict:
+    """
+    {id: estado que corresponde} de las propiedades cuyo estado guardado no
+    coincide con contratos y reservas. Un SELECT por lote de TAMANO_LOTE.
+    """
+    from .models import Propiedad
+
+    ids = sorted({i for i in ids if i})
+    cambios = {}
+    for i in range(0, len(ids), TAMANO_LOTE):
+        cambios.update(
+            Propiedad.objects
+            .filter(id__in=ids[i:i + TAMANO_LOTE])
+            .exclude(estado__in=ESTADOS_FINALES)
+            .con_estado_calculado(now)
+            .exclude(estado=F("estado_calculado"))
+            .values_list("id", "estado_calculado")
+        )
+    return cambios
+
+
+def sincronizar(ids, now=None) -> dict:
+    """
+    Recalcula y guarda el estado: pendientes() y a lo más un UPDATE por
+    estado destino, sin importar cuántos ids. Retorna {id: estado nuevo}
+    de las que cambiaron.
+    """
+    from .catalogo import refrescar_catalogo
+    from .models import Propiedad
+
+    now = now or timezone.now()
+    cambios = pendientes(ids, now)
+
+    por_destino = {}
+    for pk, destino in cambios.items():
+        por_destino.setdefault(destino, []).append(pk)
+    for destino, pks in por_destino.items():
+        for i in range(0, len(pks), TAMANO_LOTE):
+            Propiedad.objects.filter(id__in=pks[i:i + TAMANO_LOTE]).exclude(estado__in=ESTADOS_FINALES).update(
+                estado=destino, updated_at=now
+            )
+
+    if cambios:
+        # .update() no dispara señales
+        refrescar_catalogo(cambios)
+    return cambios
+
+
+def estado_actual(propiedad) -> str:
+    """
+    Estado a mostrar de una propiedad suelta (sin anotar): una consulta con
+    la misma regla.
+    """
+    from .models import Propiedad
+
+    if propiedad.estado in ESTADOS_FINALES:
+        return propiedad.estado
+    return (
+        Propiedad.objects
+        .filter(pk=propiedad.pk)
+        .con_estado_calculado()
+        .values_list("estado_calculado", flat=True)
+        .first()
+    ) or propiedad.estado
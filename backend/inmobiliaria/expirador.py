@@ -0,0 +1,140 @@
+import logging
+import time
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import estados
+
+logger = logging.getLogger(__name__)
+
+MARCA_RESERVAS = "reservas"
+TAMANO_LOTE = 1000
+
+
+def _notificaciones(filas):
+    from .models import Notificacion
+
+    for fila in filas:
+        titulo = fila["propiedad__titulo"]
+        if fila["propiedad__propietario_user_id"]:
+            yield Notificacion(
+                usuario_id=fila["propiedad__propietario_user_id"], tipo="RESERVA",
+                titulo="Reserva vencida", mensaje=f"La reserva de '{titulo}' venció y fue liberada.",
+            )
+        if fila["interesado__usuario_id"]:
+            yield Notificacion(
+                usuario_id=fila["interesado__usuario_id"], tipo="RESERVA",
+                titulo="Tu reserva venció", mensaje=f"Venció la reserva de '{titulo}'.",
+            )
+
+
+def expirar_vencidas(ahora=None, batch_size=TAMANO_LOTE, dry_run=False) -> dict:
+    """
+    Desactiva las reservas activas vencidas por lotes (un UPDATE por lote,
+    recorriendo por pk), crea las notificaciones con bulk_create y al final
+    libera las propiedades en una sola pasada. Con dry_run no escribe nada.
+    Retorna contadores y tiempos.
+    """
+    from .models import Notificacion, Reserva
+
+    ahora = ahora or timezone.now()
+    inicio = time.monotonic()
+    stats = {"reservas": 0, "notificaciones": 0, "propiedades": 0, "lotes": 0}
+    propiedades = set()
+    ultimo = 0
+
+    while True:
+        with transaction.atomic():
+            # bloquea el lote: una cancelación concurrente espera a este UPDATE
+            pks = list(
+                Reserva.objects.select_for_update()
+                .filter(activa=True, expires_at__isnull=False, expires_at__lte=ahora, pk__gt=ultimo)
+                .order_by("pk")
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not pks:
+                break
+            ultimo = pks[-1]
+            filas = list(
+                Reserva.objects.filter(pk__in=pks).values(
+                    "propiedad_id", "propiedad__titulo",
+                    "propiedad__propietario_user_id", "interesado__usuario_id",
+                )
+            )
+
+            if not dry_run:
+                Reserva.objects.filter(pk__in=pks).expirar()
+
+            notificaciones = list(_notificaciones(filas))
+            if not dry_run:
+                Notificacion.objects.bulk_create(notificaciones, batch_size=batch_size)
+
+        stats["lotes"] += 1
+        stats["reservas"] += len(filas)
+        stats["notificaciones"] += len(notificaciones)
+        propiedades.update(f["propiedad_id"] for f in filas)
+
+    if dry_run:
+        # las reservas vencidas ya no cuentan como vigentes: el cálculo es el mismo
+        stats["propiedades"] = len(estados.pendientes(propiedades, now=ahora))
+    else:
+        with transaction.atomic():
+            stats["propiedades"] = len(estados.sincronizar(propiedades, now=ahora))
+    stats["segundos"] = round(time.monotonic() - inicio, 3)
+    return stats
+
+
+def barrer_reservas(ahora=None) -> int:
+    """
+    Expira las reservas vencidas (por el índice de expires_at), libera las
+    propiedades que quedaron en "reservada" y registra la marca de agua.
+    Retorna cuántas reservas se expiraron.
+    """
+    from .models import MarcaBarrido
+
+    ahora = ahora or timezone.now()
+    inicio = time.monotonic()
+    expiradas = expirar_vencidas(ahora)["reservas"]
+    duracion_ms = int((time.monotonic() - inicio) * 1000)
+    with transaction.atomic():
+
+        actualizadas = MarcaBarrido.objects.filter(nombre=MARCA_RESERVAS).update(
+            ultimo_barrido=ahora,
+            procesadas=expiradas,
+            total_procesadas=F("total_procesadas") + expiradas,
+            duracion_ms=duracion_ms,
+        )
+        if not actualizadas:
+            MarcaBarrido.objects.create(
+                nombre=MARCA_RESERVAS,
+                ultimo_barrido=ahora,
+                procesadas=expiradas,
+                total_procesadas=expiradas,
+                duracion_ms=duracion_ms,
+            )
+    if expiradas:
+        logger.info("Expirador: %s reservas expiradas en %s ms", expiradas, duracion_ms)
+    return expiradas
+
+
+def estado_expirador(intervalo) -> dict:
+    """
+    Última pasada del expirador; 'atrasado' si no corre hace más de tres
+    intervalos (el proceso se cayó o no está levantado).
+    """
+    from .models import MarcaBarrido
+
+    marca = MarcaBarrido.objects.filter(nombre=MARCA_RESERVAS).first()
+    if marca is None or marca.ultimo_barrido is None:
+        return {"ultimo_barrido": None, "procesadas": 0, "total_procesadas": 0, "duracion_ms": 0, "atrasado": True}
+
+    atraso = (timezone.now() - marca.ultimo_barrido).total_seconds()
+    return {
+        "ultimo_barrido": marca.ultimo_barrido,
+        "procesadas": marca.procesadas,
+        "total_procesadas": marca.total_procesadas,
+        "duracion_ms": marca.duracion_ms,
+        "atrasado": atraso > 3 * intervalo,
+    }
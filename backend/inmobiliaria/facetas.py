@@ -0,0 +1,140 @@
+from collections import Counter
+
+from django.db.models import Case, Count, IntegerField, Q, Value, When
+from django.db.models.functions import Least
+from rest_framework.exceptions import ValidationError
+
+from .config import FACETA_BANOS, FACETA_DORMITORIOS, FACETA_RANGOS_PRECIO
+from .filters import PropiedadFilter
+from .models import Propiedad
+from .search import consulta_busqueda, normalizar_texto
+
+# faceta -> filtros de PropiedadFilter que la restringen. Al contar una
+# faceta se ignoran sus propios filtros (si no, solo saldría el valor elegido).
+FACETAS = {
+    "tipo": ("tipo",),
+    "ciudad": ("ciudad",),
+    "dormitorios": ("dormitorios_min",),
+    "banos": ("banos_min",),
+    "precio": ("precio_min", "precio_max"),
+}
+
+
+def _q_filtro(filtro, valor):
+    return Q(**{f"{filtro.field_name}__{filtro.lookup_expr}": valor})
+
+
+def _tramo(campo, limites):
+    # índice del tramo al que pertenece el valor (el último es abierto)
+    whens = [When(**{f"{campo}__lt": limite}, then=Value(i - 1)) for i, limite in enumerate(limites) if i > 0]
+    return Case(*whens, default=Value(len(limites) - 1), output_field=IntegerField())
+
+
+def _activo(valor):
+    return valor not in (None, "")
+
+
+def calcular_facetas(params) -> dict:
+    """
+    Conteos por tipo, ciudad, dormitorios, baños y rango de precio para el
+    catálogo filtrado con PropiedadFilter (+ ?search=).
+
+    Hace una sola consulta agrupada: los filtros que no son de faceta van al
+    WHERE; los de faceta se agregan como banderas (1/0) al GROUP BY, y en
+    Python cada faceta suma las filas que cumplen todas las demás banderas.
+    """
+    fs = PropiedadFilter(data=params, queryset=Propiedad.objects.none())
+    if not fs.is_valid():
+        raise ValidationError(fs.errors)
+
+    condiciones = {
+        nombre: _q_filtro(fs.filters[nombre], valor)
+        for nombre, valor in fs.form.cleaned_data.items()
+        if _activo(valor)
+    }
+    de_faceta = {n for nombres in FACETAS.values() for n in nombres}
+
+    qs = Propiedad.objects.filter(aprobada=True)
+    for nombre, q in condiciones.items():
+        if nombre not in de_faceta:
+            qs = qs.filter(q)
+
+    texto = (params.get("search") or "").strip()
+    if texto:
+        consulta = consulta_busqueda(texto)
+        qs = qs.filter(consulta[0]) if consulta else qs.none()
+
+    banderas = {}
+    for faceta, nombres in FACETAS.items():
+        q = Q()
+        for n in nombres:
+            if n in condiciones:
+                q &= condiciones[n]
+        if q:
+            banderas[f"f_{faceta}"] = Case(When(q, then=Value(1)), default=Value(0), output_field=IntegerField())
+
+    filas = (
+        qs.annotate(
+            g_dormitorios=Least("dormitorios", Value(FACETA_DORMITORIOS[-1])),
+            g_banos=Least("baos", Value(FACETA_BANOS[-1])),
+            g_precio=_tramo("precio", FACETA_RANGOS_PRECIO),
+            **banderas,
+        )
+        .values("tipo", "ciudad", "g_dormitorios", "g_banos", "g_precio", *banderas)
+        .annotate(n=Count("id"))
+        .order_by()
+    )
+
+    conteos = {faceta: Counter() for faceta in FACETAS}
+    nombres_ciudad = {}
+    total = 0
+
+    for fila in filas:
+        cumple = {f: fila.get(f"f_{f}", 1) == 1 for f in FACETAS}
+        ciudad = normalizar_texto(fila["ciudad"].strip())
+        nombres_ciudad.setdefault(ciudad, fila["ciudad"].strip())
+        claves = {
+            "tipo": fila["tipo"],
+            "ciudad": ciudad,
+            "dormitorios": fila["g_dormitorios"],
+            "banos": fila["g_banos"],
+            "precio": fila["g_precio"],
+        }
+        for faceta in FACETAS:
+            if all(ok for f, ok in cumple.items() if f != faceta):
+                conteos[faceta][claves[faceta]] += fila["n"]
+        if all(cumple.values()):
+            total += fila["n"]
+
+    return {
+        "total": total,
+        "tipo": [
+            {"valor": valor, "etiqueta": etiqueta, "total": conteos["tipo"][valor]}
+            for valor, etiqueta in Propiedad.TIPO_CHOICES
+        ],
+        "ciudad": [
+            {"valor": nombres_ciudad[c], "total": n}
+            for c, n in sorted(conteos["ciudad"].items(), key=lambda x: (-x[1], x[0]))
+        ],
+        "dormitorios": _faceta_minimo(FACETA_DORMITORIOS, conteos["dormitorios"]),
+        "banos": _faceta_minimo(FACETA_BANOS, conteos["banos"]),
+        "precio": [
+            {
+                "desde": desde,
+                "hasta": FACETA_RANGOS_PRECIO[i + 1] if i + 1 < len(FACETA_RANGOS_PRECIO) else None,
+                "total": conteos["precio"][i],
+            }
+            for i, desde in enumerate(FACETA_RANGOS_PRECIO)
+        ],
+    }
+
+
+def _faceta_minimo(valores, conteo):
+    # 'min' es lo que se manda como dormitorios_min / banos_min (>=): el
+    # total de cada opción acumula su grupo y todos los mayores
+    acumulado = 0
+    opciones = []
+    for v in reversed(valores):
+        acumulado += conteo[v]
+        opciones.append({"valor": f"{v}+", "min": v, "total": acumulado})
+    return opciones[::-1]
@@ -1,11 +1,15 @@
 import django_filters as df
+from django.db.models import Q, F
+from rest_framework.filters import BaseFilterBackend
+
 from .models import Propiedad
+from .search import consulta_busqueda
 
 class PropiedadFilter(df.FilterSet):
     precio_min = df.NumberFilter(field_name="precio", lookup_expr="gte")
     precio_max = df.NumberFilter(field_name="precio", lookup_expr="lte")
     dormitorios_min = df.NumberFilter(field_name="dormitorios", lookup_expr="gte")
-    banos_min = df.NumberFilter(field_name="banos", lookup_expr="gte")  
+    banos_min = df.NumberFilter(field_name="baos", lookup_expr="gte")
     ciudad = df.CharFilter(field_name="ciudad", lookup_expr="icontains")
     tipo = df.CharFilter(field_name="tipo", lookup_expr="iexact")       
     estado = df.CharFilter(field_name="estado", lookup_expr="iexact")   
@@ -15,4 +19,36 @@ class PropiedadFilter(df.FilterSet):
 
     class Meta:
         model = Propiedad
-        fields = ["tipo", "estado", "ciudad", "orientacion"]
\ No newline at end of file
+        fields = ["tipo", "estado", "ciudad", "orientacion"]
+
+
+class BusquedaTextoFilter(BaseFilterBackend):
+    """
+    Reemplazo de SearchFilter para propiedades: usa el índice invertido
+    (PropiedadTermino) con prefijos y sin tildes, y ordena por relevancia
+    cuando no se pide otro orden.
+
+    La vista puede definir 'busqueda_campos_extra' para buscar además con
+    icontains en otros campos (ej: datos del propietario para el admin).
+    """
+    search_param = "search"
+    ordering_param = "ordering"
+
+    def filter_queryset(self, request, queryset, view):
+        texto = (request.query_params.get(self.search_param) or "").strip()
+        if not texto:
+            return queryset
+
+        consulta = consulta_busqueda(texto)
+
+        cond = consulta[0] if consulta else Q(pk__in=[])
+        for campo in getattr(view, "busqueda_campos_extra", []):
+            cond |= Q(**{f"{campo}__icontains": texto})
+        queryset = queryset.filter(cond)
+
+        if consulta:
+            queryset = queryset.annotate(relevancia=consulta[1])
+            if not request.query_params.get(self.ordering_param):
+                queryset = queryset.order_by(F("relevancia").desc(nulls_last=True), "-fecha_registro")
+
+        return queryset
@@ -0,0 +1,145 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .condicional import etag_fuerte, ultima_modificacion
+
+# Feeds iCalendar (RFC 5545) de visitas y vencimientos de cuotas. Se generan
+# en streaming: las filas salen con iterator() y cada VEVENT se escribe
+# apenas se lee, sin armar el calendario completo en memoria.
+
+PRODID = "-//Manque Corretajes//Calendario//ES"
+DOMINIO_UID = "manque-corretajes"
+DIAS_ATRAS = 30
+DURACION_VISITA = timedelta(hours=1)
+TAMANO_LOTE = 500
+
+
+def _escapar(texto) -> str:
+    return (
+        str(texto or "")
+        .replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def _plegar(linea) -> str:
+    # líneas de máximo 75 octetos; la continuación empieza con un espacio
+    datos = linea.encode("utf-8")
+    if len(datos) <= 75:
+        return linea + "\r\n"
+    partes = []
+    while datos:
+        corte = min(len(datos), 75 if not partes else 74)
+        # no cortar un carácter UTF-8 a la mitad
+        while corte < len(datos) and (datos[corte] & 0xC0) == 0x80:
+            corte -= 1
+        partes.append(datos[:corte].decode("utf-8"))
+        datos = datos[corte:]
+    return "\r\n ".join(partes) + "\r\n"
+
+
+def _utc(dt) -> str:
+    return dt.astimezone(dt_timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def _evento(uid, dtstamp, inicio, fin, resumen, descripcion="", lugar="", cancelado=False) -> str:
+    lineas = ["BEGIN:VEVENT", f"UID:{uid}@{DOMINIO_UID}", f"DTSTAMP:{_utc(dtstamp)}"]
+    if isinstance(inicio, datetime):
+        lineas += [f"DTSTART:{_utc(inicio)}", f"DTEND:{_utc(fin)}"]
+    else:
+        lineas += [f"DTSTART;VALUE=DATE:{inicio:%Y%m%d}", f"DTEND;VALUE=DATE:{fin:%Y%m%d}"]
+    lineas.append(f"SUMMARY:{_escapar(resumen)}")
+    if descripcion:
+        lineas.append(f"DESCRIPTION:{_escapar(descripcion)}")
+    if lugar:
+        lineas.append(f"LOCATION:{_escapar(lugar)}")
+    if cancelado:
+        lineas.append("STATUS:CANCELLED")
+    lineas.append("END:VEVENT")
+    return "".join(_plegar(l) for l in lineas)
+
+
+def querysets_usuario(usuario):
+    """
+    (visitas, cuotas) que ve el usuario según su rol: el propietario las de
+    sus propiedades, el cliente las suyas y el admin todas. Desde DIAS_ATRAS
+    días atrás; solo cuotas impagas de contratos vigentes.
+    """
+    from .models import CuotaContrato, Visita
+
+    desde = timezone.localdate() - timedelta(days=DIAS_ATRAS)
+    visitas = Visita.objects.filter(fecha__gte=desde)
+    cuotas = CuotaContrato.objects.filter(vencimiento__gte=desde, pagada=False, contrato__vigente=True)
+
+    rol = getattr(usuario, "rol", "")
+    if rol == "ADMIN":
+        pass
+    elif rol == "PROPIETARIO":
+        visitas = visitas.filter(propiedad__propietario_user=usuario)
+        cuotas = cuotas.filter(contrato__propiedad__propietario_user=usuario)
+    elif rol == "CLIENTE":
+        visitas = visitas.filter(interesado__usuario=usuario)
+        cuotas = cuotas.filter(contrato__comprador_arrendatario__usuario=usuario)
+    else:
+        return visitas.none(), cuotas.none()
+    return visitas, cuotas
+
+
+def validadores(visitas, cuotas):
+    """
+    (etag, last_modified) con dos agregados: cantidad y último updated_at
+    de cada conjunto (la cantidad cubre los borrados).
+    """
+    v = visitas.aggregate(n=Count("pk"), ultima=Max("updated_at"))
+    c = cuotas.aggregate(n=Count("pk"), ultima=Max("updated_at"))
+    etag = etag_fuerte("ics", timezone.localdate(), v["n"], v["ultima"], c["n"], c["ultima"])
+    return etag, ultima_modificacion(v["ultima"], c["ultima"])
+
+
+def generar_feed(visitas, cuotas, nombre):
+    """
+    Generador de líneas del VCALENDAR para StreamingHttpResponse.
+    """
+    ahora = timezone.now()
+    yield "".join(_plegar(l) for l in (
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{PRODID}",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{_escapar(nombre)}",
+        f"X-WR-TIMEZONE:{timezone.get_current_timezone_name()}",
+        "REFRESH-INTERVAL;VALUE=DURATION:PT1H",
+    ))
+
+    filas = (
+        visitas.order_by("fecha", "hora")
+        .values_list("pk", "fecha", "hora", "estado", "updated_at",
+                     "propiedad__titulo", "propiedad__direccion", "propiedad__ciudad")
+        .iterator(chunk_size=TAMANO_LOTE)
+    )
+    for pk, fecha, hora, estado, updated_at, titulo, direccion, ciudad in filas:
+        inicio = timezone.make_aware(datetime.combine(fecha, hora))
+        yield _evento(
+            f"visita-{pk}", updated_at or ahora, inicio, inicio + DURACION_VISITA,
+            f"Visita: {titulo}", descripcion=f"Estado: {estado}",
+            lugar=", ".join(x for x in (direccion, ciudad) if x), cancelado=(estado == "cancelada"),
+        )
+
+    filas = (
+        cuotas.order_by("vencimiento")
+        .values_list("pk", "vencimiento", "monto", "updated_at", "contrato_id", "contrato__propiedad__titulo")
+        .iterator(chunk_size=TAMANO_LOTE)
+    )
+    for pk, vencimiento, monto, updated_at, contrato_id, titulo in filas:
+        yield _evento(
+            f"cuota-{pk}", updated_at or ahora, vencimiento, vencimiento + timedelta(days=1),
+            f"Vence cuota: {titulo}", descripcion=f"Contrato #{contrato_id} - Monto: ${monto:,.0f}",
+        )
+
+    yield _plegar("END:VCALENDAR")
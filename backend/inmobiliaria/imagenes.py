@@ -0,0 +1,124 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+from .config import CALIDAD_JPEG, CALIDAD_WEBP, TAMANOS_FOTO
+
+logger = logging.getLogger(__name__)
+
+CARPETA_DERIVADOS = "propiedades/fotos/derivados"
+
+_pool = None
+_lock_pool = threading.Lock()
+
+
+def _ejecutor():
+    global _pool
+    with _lock_pool:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=max(1, settings.IMAGENES_WORKERS), thread_name_prefix="derivados"
+            )
+        return _pool
+
+
+def _codificar(img, formato, calidad):
+    buffer = BytesIO()
+    # sin exif=...: Pillow no copia los metadatos (GPS, cámara, etc.)
+    if formato == "jpeg":
+        img.save(buffer, "JPEG", quality=calidad, optimize=True, progressive=True)
+    else:
+        img.save(buffer, "WEBP", quality=calidad, method=4)
+    return buffer.getvalue()
+
+
+def borrar_derivados(derivados):
+    for tamano in (derivados or {}).get("tamanos", {}).values():
+        for clave in ("jpeg", "webp"):
+            nombre = tamano.get(clave)
+            if nombre:
+                default_storage.delete(nombre)
+
+
+def generar_derivados(foto) -> dict:
+    """
+    Genera small/medium/large en JPEG y WebP a partir del original (con la
+    rotación EXIF aplicada y sin metadatos). Retorna el dict que se guarda en
+    PropiedadFoto.derivados: rutas en el storage + ancho/alto.
+    """
+    base = os.path.splitext(os.path.basename(foto.foto.name))[0]
+    with foto.foto.open("rb") as f:
+        original = Image.open(f)
+        original = ImageOps.exif_transpose(original)
+        if original.mode not in ("RGB", "L"):
+            original = original.convert("RGB")
+        original.load()
+
+    tamanos = {}
+    for nombre, lado in TAMANOS_FOTO.items():
+        img = original.copy()
+        img.thumbnail((lado, lado), Image.LANCZOS)
+        rutas = {}
+        for formato, ext, calidad in (("jpeg", "jpg", CALIDAD_JPEG), ("webp", "webp", CALIDAD_WEBP)):
+            ruta = f"{CARPETA_DERIVADOS}/{foto.pk}/{base}_{nombre}.{ext}"
+            default_storage.delete(ruta)
+            rutas[formato] = default_storage.save(ruta, ContentFile(_codificar(img, formato, calidad)))
+        tamanos[nombre] = {**rutas, "ancho": img.width, "alto": img.height}
+    return {"origen": foto.foto.name, "tamanos": tamanos}
+
+
+def procesar_foto(foto_id) -> bool:
+    """
+    Genera y guarda los derivados de una foto. Corre en el pool (o en el
+    comando de backfill); la tarjeta del catálogo se refresca al terminar.
+    """
+    from .catalogo import refrescar_catalogo
+    from .models import Propiedad, PropiedadFoto
+
+    try:
+        foto = PropiedadFoto.objects.filter(pk=foto_id).first()
+        if foto is None or not foto.foto:
+            return False
+        anteriores = foto.derivados
+        derivados = generar_derivados(foto)
+
+        # update() y no save(): no vuelve a disparar la señal de la foto;
+        # si mientras tanto cambió el archivo, no se pisa
+        actualizadas = (
+            PropiedadFoto.objects
+            .filter(pk=foto_id, foto=derivados["origen"])
+            .update(derivados=derivados)
+        )
+        if not actualizadas:
+            borrar_derivados(derivados)
+            return False
+        if anteriores and anteriores.get("origen") != derivados["origen"]:
+            borrar_derivados(anteriores)
+
+        Propiedad.objects.filter(pk=foto.propiedad_id).tocar()
+        refrescar_catalogo([foto.propiedad_id])
+        return True
+    except Exception:
+        logger.exception("Error generando derivados de la foto %s", foto_id)
+        return False
+    finally:
+        if threading.current_thread() is not threading.main_thread():
+            close_old_connections()
+
+
+def encolar_derivados(foto_id) -> None:
+    """
+    Programa la generación al confirmar la transacción, fuera del request.
+    """
+    if settings.IMAGENES_WORKERS <= 0:
+        transaction.on_commit(lambda: procesar_foto(foto_id))
+    else:
+        transaction.on_commit(lambda: _ejecutor().submit(procesar_foto, foto_id))
@@ -0,0 +1,97 @@
+from django.db import models
+from django.db.models.functions import Coalesce
+
+# Libro de cada contrato: total pagado, monto y cantidad de cuotas
+# pendientes, próximo vencimiento y última cuota pagada, guardados en la
+# fila de Contrato. Cada escritura de Pago / CuotaContrato (señales en
+# signals.py, también borrados por queryset y en cascada) recalcula su
+# contrato con un UPDATE, desde sus propias filas y no sumando deltas: un
+# reintento no descuadra nada. El comando conciliar_libro compara y repara
+# en bloque.
+
+CAMPOS = (
+    "total_pagado",
+    "monto_pendiente",
+    "cuotas_pendientes",
+    "proximo_vencimiento",
+    "proxima_cuota",
+    "ultima_cuota_pagada",
+)
+TAMANO_LOTE = 500
+
+
+def expresiones(Pago, CuotaContrato) -> dict:
+    """
+    {campo: subconsulta correlacionada con el contrato (OuterRef("pk"))}.
+    Recibe los modelos para poder usarse también desde migraciones.
+    """
+    monto = models.DecimalField(max_digits=14, decimal_places=2)
+
+    def _agregado(qs, agregado, output_field):
+        return Coalesce(
+            models.Subquery(qs.order_by().values("contrato_id").annotate(t=agregado).values("t")[:1]),
+            models.Value(0),
+            output_field=output_field,
+        )
+
+    pagos = Pago.objects.filter(contrato_id=models.OuterRef("pk"))
+    pendientes = CuotaContrato.objects.filter(contrato_id=models.OuterRef("pk"), pagada=False)
+    proxima = pendientes.order_by("vencimiento", "id")
+    ultima = CuotaContrato.objects.filter(contrato_id=models.OuterRef("pk"), pagada=True).order_by("-vencimiento", "-id")
+
+    return {
+        "total_pagado": _agregado(pagos, models.Sum("monto"), monto),
+        "monto_pendiente": _agregado(pendientes, models.Sum("monto"), monto),
+        "cuotas_pendientes": _agregado(pendientes, models.Count("pk"), models.IntegerField()),
+        "proximo_vencimiento": models.Subquery(proxima.values("vencimiento")[:1]),
+        "proxima_cuota": models.Subquery(proxima.values("id")[:1]),
+        "ultima_cuota_pagada": models.Subquery(ultima.values("id")[:1]),
+    }
+
+
+def recalcular(ids) -> int:
+    """
+    Recalcula el libro de los contratos dados: un UPDATE por lote de
+    TAMANO_LOTE. Retorna cuántos contratos se actualizaron.
+    """
+    from .models import Contrato, CuotaContrato, Pago
+
+    ids = sorted({i for i in ids if i})
+    valores = expresiones(Pago, CuotaContrato)
+    actualizados = 0
+    for i in range(0, len(ids), TAMANO_LOTE):
+        actualizados += Contrato.objects.filter(pk__in=ids[i:i + TAMANO_LOTE]).update(**valores)
+    return actualizados
+
+
+def descuadrados(batch_size=TAMANO_LOTE):
+    """
+    Recorre todos los contratos por lotes (keyset por pk) y genera
+    (id, {campo: (guardado, calculado)}) de los que no cuadran.
+    """
+    from .models import Contrato, CuotaContrato, Pago
+
+    calculados = {f"_libro_{campo}": expr for campo, expr in expresiones(Pago, CuotaContrato).items()}
+    columnas = [Contrato._meta.get_field(c).attname for c in CAMPOS]
+    ultimo = 0
+    while True:
+        filas = list(
+            Contrato.objects
+            .filter(pk__gt=ultimo)
+            .order_by("pk")
+            .annotate(**calculados)
+            .values_list("pk", *columnas, *calculados)[:batch_size]
+        )
+        if not filas:
+            return
+        for fila in filas:
+            guardados, nuevos = fila[1:1 + len(CAMPOS)], fila[1 + len(CAMPOS):]
+            diferencias = {
+                campo: (g, n)
+                for campo, g, n in zip(CAMPOS, guardados, nuevos)
+                if g != n
+            }
+            if diferencias:
+                yield fila[0], diferencias
+        ultimo = filas[-1][0]
+
@@ -0,0 +1,108 @@
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from inmobiliaria.models import Propiedad, Propietario
+from inmobiliaria.search import buscar, reindexar
+
+CIUDADES = ["Talca", "Curicó", "Linares", "Constitución", "Cauquenes", "Molina", "San Javier", "Parral"]
+TIPOS = ["casa", "departamento", "parcela", "oficina", "bodega", "terreno"]
+PALABRAS = [
+    "amplia", "luminosa", "jardín", "quincho", "piscina", "estacionamiento", "bodega",
+    "terraza", "céntrica", "tranquila", "remodelada", "cocina", "americana", "vista",
+    "cordillera", "calefacción", "leña", "patio", "árboles", "frutales", "riego",
+    "cerca", "colegios", "supermercado", "locomoción", "condominio", "seguridad",
+]
+CONSULTAS = ["piscina", "Curicó", "curico", "casa jardin", "terraza vista cordillera", "calef"]
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Compara la búsqueda por índice invertido con icontains sobre un catálogo sintético (se descarta al terminar)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--n", type=int, default=100_000, help="Cantidad de propiedades sintéticas")
+        parser.add_argument("--repeticiones", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        random.seed(options["seed"])
+        try:
+            with transaction.atomic():
+                self._poblar(options["n"])
+                self._medir(options["repeticiones"])
+                raise Rollback
+        except Rollback:
+            self.stdout.write("Datos sintéticos descartados.")
+
+    def _poblar(self, n):
+        propietario = Propietario.objects.create(
+            primer_nombre="Bench", segundo_nombre="", primer_apellido="Bench", segundo_apellido="",
+            rut="99999999-9", telefono="+56900000000", email="bench@manque.local",
+        )
+
+        t0 = time.perf_counter()
+        lote = []
+        for i in range(n):
+            ciudad = random.choice(CIUDADES)
+            tipo = random.choice(TIPOS)
+            lote.append(Propiedad(
+                propietario=propietario,
+                titulo=f"{tipo.title()} {' '.join(random.sample(PALABRAS, 2))} en {ciudad}",
+                descripcion=" ".join(random.choices(PALABRAS, k=30)),
+                direccion=f"Calle {i}",
+                ciudad=ciudad,
+                tipo=tipo,
+                precio=Decimal(random.randint(30, 500) * 1_000_000),
+                aprobada=True,
+                estado_aprobacion="aprobada",
+            ))
+            if len(lote) >= 5000:
+                Propiedad.objects.bulk_create(lote)
+                lote = []
+        if lote:
+            Propiedad.objects.bulk_create(lote)
+        t1 = time.perf_counter()
+
+        reindexar(Propiedad.objects.filter(propietario=propietario), batch_size=2000)
+        t2 = time.perf_counter()
+
+        self.stdout.write(f"Poblado: {n} propiedades en {t1 - t0:.1f}s, índice en {t2 - t1:.1f}s")
+
+    def _icontains(self, qs, texto):
+        # Equivalente a SearchFilter sobre titulo/descripcion/ciudad
+        for termino in texto.split():
+            qs = qs.filter(
+                Q(titulo__icontains=termino) | Q(descripcion__icontains=termino) | Q(ciudad__icontains=termino)
+            )
+        return qs.order_by("-fecha_registro")
+
+    def _indice(self, qs, texto):
+        return buscar(qs, texto).order_by("-relevancia", "-fecha_registro")
+
+    def _tiempo(self, qs, repeticiones):
+        mejor = None
+        for _ in range(repeticiones):
+            t0 = time.perf_counter()
+            total = qs.count()
+            list(qs.values_list("id", flat=True)[:20])
+            dt = time.perf_counter() - t0
+            mejor = dt if mejor is None else min(mejor, dt)
+        return total, mejor * 1000
+
+    def _medir(self, repeticiones):
+        base = Propiedad.objects.filter(aprobada=True)
+        self.stdout.write(f"{'consulta':<28}{'icontains':>22}{'índice':>22}")
+        for texto in CONSULTAS:
+            n1, ms1 = self._tiempo(self._icontains(base, texto), repeticiones)
+            n2, ms2 = self._tiempo(self._indice(base, texto), repeticiones)
+            self.stdout.write(
+                f"{texto:<28}{f'{ms1:8.1f} ms ({n1})':>22}{f'{ms2:8.1f} ms ({n2})':>22}"
+            )
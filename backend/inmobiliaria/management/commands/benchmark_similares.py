@@ -0,0 +1,70 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from inmobiliaria.similares import IndiceSimilares
+
+CIUDADES = ["Talca", "Curicó", "Linares", "Constitución", "Cauquenes", "Molina", "San Javier", "Parral"]
+TIPOS = ["casa", "departamento", "parcela", "oficina", "bodega", "terreno"]
+
+
+def _fila(i):
+    arriendo = random.random() < 0.4
+    return {
+        "id": i,
+        "precio": random.randint(250, 2_000) * 1_000 if arriendo else random.randint(30, 500) * 1_000_000,
+        "metros2": random.randint(30, 400),
+        "dormitorios": random.randint(0, 6),
+        "baos": random.randint(0, 4),
+        "tipo": random.choice(TIPOS),
+        "ciudad": random.choice(CIUDADES),
+    }
+
+
+def _percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+class Command(BaseCommand):
+    help = "Mide construcción, consultas top-k y cambios incrementales del índice de similares (datos sintéticos en memoria)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tamanos", type=int, nargs="+", default=[10_000, 100_000])
+        parser.add_argument("--consultas", type=int, default=500)
+        parser.add_argument("--k", type=int, default=6)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        random.seed(options["seed"])
+        self.stdout.write(
+            f"{'propiedades':>12}{'construcción':>16}{'p50 top-k':>14}{'p95 top-k':>14}{'alta/cambio':>14}"
+        )
+        for n in options["tamanos"]:
+            filas = [_fila(i) for i in range(1, n + 1)]
+
+            indice = IndiceSimilares()
+            t0 = time.perf_counter()
+            indice.cargar(filas)
+            construccion = (time.perf_counter() - t0) * 1000
+
+            tiempos = []
+            for _ in range(options["consultas"]):
+                fila = random.choice(filas)
+                t0 = time.perf_counter()
+                indice.vecinos(fila, k=options["k"], excluir=fila["id"])
+                tiempos.append((time.perf_counter() - t0) * 1000)
+
+            cambios = []
+            for j in range(options["consultas"]):
+                fila = _fila(random.randint(1, n + options["consultas"]))
+                t0 = time.perf_counter()
+                indice.poner(fila)
+                cambios.append((time.perf_counter() - t0) * 1000)
+
+            self.stdout.write(
+                f"{n:>12}{f'{construccion:.0f} ms':>16}"
+                f"{f'{_percentil(tiempos, 0.5):.2f} ms':>14}{f'{_percentil(tiempos, 0.95):.2f} ms':>14}"
+                f"{f'{_percentil(cambios, 0.5):.3f} ms':>14}"
+            )
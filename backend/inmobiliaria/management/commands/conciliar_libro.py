@@ -0,0 +1,40 @@
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from inmobiliaria.libro import TAMANO_LOTE, descuadrados, recalcular
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el libro de cada contrato (total pagado, pendiente, próxima y última cuota) "
+        "con sus pagos y cuotas; con --reparar recalcula los que no cuadran"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reparar", action="store_true")
+        parser.add_argument("--batch-size", type=int, default=TAMANO_LOTE)
+        parser.add_argument("--detalle", action="store_true", help="Muestra cada contrato descuadrado")
+
+    def handle(self, *args, **options):
+        por_campo = Counter()
+        ids = []
+        for pk, diferencias in descuadrados(batch_size=max(1, options["batch_size"])):
+            ids.append(pk)
+            por_campo.update(diferencias.keys())
+            if options["detalle"]:
+                detalle = ", ".join(f"{campo}: {g} -> {n}" for campo, (g, n) in diferencias.items())
+                self.stdout.write(f"  contrato {pk}: {detalle}")
+
+        for campo, n in sorted(por_campo.items()):
+            self.stdout.write(f"  {campo}: {n}")
+
+        if not ids:
+            self.stdout.write(self.style.SUCCESS("El libro cuadra en todos los contratos."))
+            return
+        if not options["reparar"]:
+            self.stdout.write(self.style.WARNING(f"{len(ids)} contratos descuadrados (usa --reparar)."))
+            return
+
+        recalcular(ids)
+        self.stdout.write(self.style.SUCCESS(f"{len(ids)} contratos recalculados."))
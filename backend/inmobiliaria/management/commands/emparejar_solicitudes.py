@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+from inmobiliaria.coincidencias import emparejar_todo
+
+
+class Command(BaseCommand):
+    help = "Cruza todas las propiedades publicadas con las solicitudes abiertas (pensado para correr cada noche)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        t0 = time.perf_counter()
+        revisadas, nuevas = emparejar_todo(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"{revisadas} propiedades revisadas, {nuevas} coincidencias nuevas "
+            f"({time.perf_counter() - t0:.1f}s)."
+        ))
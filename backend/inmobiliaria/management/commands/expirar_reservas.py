@@ -0,0 +1,59 @@
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from inmobiliaria.expirador import barrer_reservas
+
+
+class Command(BaseCommand):
+    help = (
+        "Proceso en segundo plano que expira las reservas vencidas cada --intervalo "
+        "segundos y deja la marca del último barrido (usar --una-vez desde cron)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--intervalo", type=int, default=None,
+            help="Segundos entre barridos (por defecto EXPIRADOR_INTERVALO_SEG)",
+        )
+        parser.add_argument("--una-vez", action="store_true", help="Barre una vez y termina")
+
+    def handle(self, *args, **options):
+        if options["una_vez"]:
+            expiradas = barrer_reservas()
+            self.stdout.write(self.style.SUCCESS(f"{expiradas} reservas expiradas."))
+            return
+
+        intervalo = max(1, options["intervalo"] or settings.EXPIRADOR_INTERVALO_SEG)
+        self._detener = False
+        signal.signal(signal.SIGTERM, self._parar)
+        signal.signal(signal.SIGINT, self._parar)
+        self.stdout.write(f"Expirador de reservas cada {intervalo}s (Ctrl+C para salir)")
+
+        while not self._detener:
+            inicio = time.monotonic()
+            # conexión larga: se descarta si la BD la cerró entre barridos
+            close_old_connections()
+            try:
+                expiradas = barrer_reservas()
+                if expiradas:
+                    self.stdout.write(f"{expiradas} reservas expiradas.")
+            except Exception as e:
+                # un error puntual (BD caída, lock) no detiene el proceso
+                self.stderr.write(f"Error en el barrido: {e}")
+            self._esperar(intervalo - (time.monotonic() - inicio))
+
+        close_old_connections()
+        self.stdout.write(self.style.SUCCESS("Expirador detenido."))
+
+    def _parar(self, *args):
+        self._detener = True
+
+    def _esperar(self, segundos):
+        # en pasos cortos para responder rápido a SIGTERM
+        fin = time.monotonic() + max(0, segundos)
+        while not self._detener and time.monotonic() < fin:
+            time.sleep(max(0, min(1, fin - time.monotonic())))
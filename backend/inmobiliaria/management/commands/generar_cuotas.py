@@ -0,0 +1,23 @@
+from datetime import date
+
+from dateutil.relativedelta import relativedelta
+from django.core.management.base import BaseCommand
+
+from inmobiliaria.cuotas import HORIZONTE_MESES, TAMANO_LOTE, extender_horizonte
+
+
+class Command(BaseCommand):
+    # el detalle del contrato ya no genera cuotas al leer: programar a diario
+    # (cron / scheduler de la plataforma; ver README)
+    help = "Crea las cuotas que faltan de los contratos de arriendo vigentes hasta el horizonte (programar a diario)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--meses", type=int, default=HORIZONTE_MESES, help="Meses hacia adelante desde hoy")
+        parser.add_argument("--batch-size", type=int, default=TAMANO_LOTE)
+
+    def handle(self, *args, **options):
+        hasta = date.today() + relativedelta(months=max(0, options["meses"]))
+        stats = extender_horizonte(hasta, batch_size=max(1, options["batch_size"]))
+
+        self.stdout.write(f"{stats['contratos']} contratos revisados en {stats['lotes']} lotes (hasta {hasta:%Y-%m})")
+        self.stdout.write(self.style.SUCCESS(f"{stats['cuotas']} cuotas creadas."))
@@ -0,0 +1,33 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from inmobiliaria.imagenes import procesar_foto
+from inmobiliaria.models import PropiedadFoto
+
+
+class Command(BaseCommand):
+    help = "Genera los derivados (small/medium/large, JPEG + WebP) de las fotos existentes en paralelo"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--todas", action="store_true", help="Regenera también las que ya tienen derivados")
+
+    def handle(self, *args, **options):
+        filas = PropiedadFoto.objects.exclude(foto="").order_by("pk").values_list("pk", "foto", "derivados")
+        # sin derivados o generados para un archivo anterior
+        ids = [
+            pk for pk, foto, derivados in filas
+            if options["todas"] or (derivados or {}).get("origen") != foto
+        ]
+
+        t0 = time.perf_counter()
+        # Pillow suelta el GIL al redimensionar / codificar: los hilos sí escalan
+        with ThreadPoolExecutor(max_workers=max(1, options["workers"])) as pool:
+            resultados = list(pool.map(procesar_foto, ids))
+        ok = sum(resultados)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{ok} de {len(ids)} fotos procesadas ({time.perf_counter() - t0:.1f}s)."
+        ))
@@ -1,35 +1,23 @@
 from django.core.management.base import BaseCommand
-from django.utils import timezone
-from inmobiliaria.models import Reserva, Contrato, Notificacion
 
-def _notificar(usuario, titulo, mensaje, tipo="SISTEMA"):
-    if usuario:
-        Notificacion.objects.create(usuario=usuario, titulo=titulo[:120], mensaje=mensaje, tipo=tipo)
+from inmobiliaria.expirador import TAMANO_LOTE, expirar_vencidas
 
-class Command(BaseCommand):
-    help = "Libera propiedades con reservas vencidas"
-
-    def handle(self, *args, **kwargs):
-        ahora = timezone.now()
-        vencidas = Reserva.objects.filter(activa=True, expires_at__lt=ahora)
-
-        count = 0
-        for r in vencidas:
-            r.activa = False
-            r.save(update_fields=["activa"])
-
-            tiene_otra = Reserva.objects.filter(propiedad=r.propiedad, activa=True).exists()
-            contrato_vigente = Contrato.objects.filter(propiedad=r.propiedad, vigente=True).exists()
-            if not tiene_otra and not contrato_vigente:
-                r.propiedad.estado = "disponible"
-                r.propiedad.save(update_fields=["estado"])
 
-            # Notificar propietario y cliente
-            propietario_user = getattr(r.propiedad, "propietario_user", None)
-            cliente_user = getattr(r.interesado, "usuario", None)
-            _notificar(propietario_user, "Reserva vencida", f"La reserva de '{r.propiedad.titulo}' venció y fue liberada.", tipo="RESERVA")
-            _notificar(cliente_user, "Tu reserva venció", f"Venció la reserva de '{r.propiedad.titulo}'.", tipo="RESERVA")
-
-            count += 1
-
-        self.stdout.write(self.style.SUCCESS(f"{count} reservas vencidas liberadas."))
\ No newline at end of file
+class Command(BaseCommand):
+    help = "Libera propiedades con reservas vencidas (por lotes) y notifica a propietario y cliente"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=TAMANO_LOTE)
+        parser.add_argument("--dry-run", action="store_true", help="Solo cuenta, no modifica nada")
+
+    def handle(self, *args, **options):
+        stats = expirar_vencidas(batch_size=max(1, options["batch_size"]), dry_run=options["dry_run"])
+
+        prefijo = "[dry-run] " if options["dry_run"] else ""
+        por_seg = stats["reservas"] / stats["segundos"] if stats["segundos"] else 0
+        self.stdout.write(
+            f"{prefijo}{stats['lotes']} lotes, {stats['notificaciones']} notificaciones, "
+            f"{stats['propiedades']} propiedades liberadas en {stats['segundos']:.2f}s "
+            f"({por_seg:.0f} reservas/s)"
+        )
+        self.stdout.write(self.style.SUCCESS(f"{prefijo}{stats['reservas']} reservas vencidas liberadas."))
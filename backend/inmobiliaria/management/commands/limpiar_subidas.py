@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from inmobiliaria.subidas import limpiar_subidas
+
+
+class Command(BaseCommand):
+    help = "Borra subidas por partes abandonadas y sus archivos parciales"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--horas", type=int, default=None,
+            help="Horas sin actividad para considerarla abandonada (por defecto SUBIDA_EXPIRA_HORAS)",
+        )
+
+    def handle(self, *args, **options):
+        registros, archivos = limpiar_subidas(horas=options["horas"])
+        self.stdout.write(self.style.SUCCESS(
+            f"{registros} subidas y {archivos} archivos parciales eliminados."
+        ))
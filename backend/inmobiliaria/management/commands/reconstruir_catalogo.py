@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+from inmobiliaria.catalogo import reconstruir_catalogo
+from inmobiliaria.cache import invalidar_catalogo
+
+
+class Command(BaseCommand):
+    help = "Reconstruye el modelo de lectura del catálogo (PropiedadCatalogo) por lotes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        t0 = time.perf_counter()
+        total = reconstruir_catalogo(batch_size=options["batch_size"])
+        invalidar_catalogo()
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} propiedades en el catálogo ({time.perf_counter() - t0:.1f}s)."
+        ))
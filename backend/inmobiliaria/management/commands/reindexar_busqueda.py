@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from inmobiliaria.models import Propiedad
+from inmobiliaria.search import reindexar
+
+
+class Command(BaseCommand):
+    help = "Reconstruye el índice de búsqueda del catálogo (PropiedadTermino)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        total = reindexar(Propiedad.objects.all(), batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"{total} propiedades indexadas."))
@@ -0,0 +1,138 @@
+import hashlib
+import os
+import time
+from collections import Counter, defaultdict
+
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from inmobiliaria.models import Blob
+from inmobiliaria.signals import ARCHIVOS_DEDUPLICADOS
+from inmobiliaria.storage import CARPETA_BLOBS, almacenamiento_de, almacenamiento_privado, almacenamiento_publico
+
+
+def _mb(n):
+    return f"{(n or 0) / (1024 * 1024):.2f} MB"
+
+
+def _sha256(storage, nombre):
+    digest = hashlib.sha256()
+    with storage.open(nombre, "rb") as f:
+        for bloque in f.chunks():
+            digest.update(bloque)
+    return digest.hexdigest()
+
+
+class Command(BaseCommand):
+    help = (
+        "Muestra el ahorro de la deduplicación de archivos y cuánto se ahorraría "
+        "con los archivos anteriores; con --aplicar los pasa a blobs y corrige contadores"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--aplicar", action="store_true")
+
+    def _campos(self):
+        for modelo, campos in ARCHIVOS_DEDUPLICADOS.items():
+            for nombre_campo in campos:
+                yield modelo, modelo._meta.get_field(nombre_campo)
+
+    def handle(self, *args, **options):
+        referencias = Counter()
+        anteriores = []  # (modelo, campo, pk, nombre) fuera de blobs/
+
+        for modelo, campo in self._campos():
+            filas = modelo.objects.exclude(**{campo.name: ""}).exclude(**{f"{campo.name}__isnull": True})
+            for pk, nombre in filas.values_list("pk", campo.name).iterator():
+                if campo.storage.es_blob(nombre):
+                    referencias[nombre] += 1
+                else:
+                    anteriores.append((modelo, campo, pk, nombre))
+
+        self._reporte_blobs(referencias, options["aplicar"])
+        self._reporte_anteriores(anteriores)
+        if options["aplicar"] and anteriores:
+            self._migrar(anteriores)
+
+    def _reporte_blobs(self, referencias, aplicar):
+        resumen = Blob.objects.aggregate(blobs=Count("pk"), fisico=Sum("tamano"))
+        logico = sum(
+            tamano * referencias[nombre]
+            for nombre, tamano in Blob.objects.values_list("nombre", "tamano").iterator()
+        )
+        self.stdout.write("Blobs (contenido único)")
+        self.stdout.write(f"  archivos únicos:    {resumen['blobs']}")
+        self.stdout.write(f"  referencias:        {sum(referencias.values())}")
+        self.stdout.write(f"  tamaño sin dedup:   {_mb(logico)}")
+        self.stdout.write(f"  tamaño en disco:    {_mb(resumen['fisico'])}")
+        self.stdout.write(f"  ahorro:             {_mb(logico - (resumen['fisico'] or 0))}")
+
+        # contadores que no cuadran con las filas (p.ej. un rollback a medias)
+        distintos = [
+            (nombre, guardado, referencias[nombre])
+            for nombre, guardado in Blob.objects.values_list("nombre", "referencias").iterator()
+            if guardado != referencias[nombre]
+        ]
+        self.stdout.write(f"  contadores a corregir: {len(distintos)}")
+
+        # blobs en disco sin fila (subida dentro de una transacción revertida);
+        # los de la última hora se ignoran por si la subida sigue en curso
+        registrados = set(Blob.objects.values_list("nombre", flat=True))
+        huerfanos = [(st, n) for st, n in self._blobs_en_disco() if n not in registrados]
+        self.stdout.write(f"  blobs huérfanos en disco: {len(huerfanos)}")
+
+        if aplicar:
+            for nombre, _, real in distintos:
+                Blob.objects.filter(nombre=nombre).update(referencias=real)
+                if real == 0:
+                    # delete() del storage borra la fila y el archivo al quedar en 0
+                    almacenamiento_de(nombre).delete(nombre)
+            for storage, nombre in huerfanos:
+                os.remove(storage.path(nombre))
+
+    def _blobs_en_disco(self):
+        # blobs/publico/ en MEDIA_ROOT y blobs/privado/ en PRIVADO_ROOT
+        limite = time.time() - 3600
+        for storage in (almacenamiento_publico(), almacenamiento_privado()):
+            raiz = storage.path(f"{CARPETA_BLOBS}/{storage.prefijo}")
+            for carpeta, _, archivos in os.walk(raiz):
+                for archivo in archivos:
+                    ruta = os.path.join(carpeta, archivo)
+                    if os.path.getmtime(ruta) < limite:
+                        yield storage, os.path.relpath(ruta, storage.location).replace(os.sep, "/")
+
+    def _reporte_anteriores(self, anteriores):
+        grupos = defaultdict(list)
+        faltantes = 0
+        for modelo, campo, pk, nombre in anteriores:
+            if not campo.storage.exists(nombre):
+                faltantes += 1
+                continue
+            grupos[_sha256(campo.storage, nombre)].append(campo.storage.size(nombre))
+
+        total = sum(sum(tamanos) for tamanos in grupos.values())
+        duplicado = sum(sum(tamanos[1:]) for tamanos in grupos.values())
+        self.stdout.write("Archivos anteriores (fuera de blobs/)")
+        self.stdout.write(f"  archivos:           {sum(len(t) for t in grupos.values())} ({faltantes} no están en disco)")
+        self.stdout.write(f"  tamaño:             {_mb(total)}")
+        self.stdout.write(f"  ahorro posible:     {_mb(duplicado)}")
+
+    def _migrar(self, anteriores):
+        migrados = 0
+        a_borrar = set()
+        for modelo, campo, pk, nombre in anteriores:
+            if not campo.storage.exists(nombre):
+                continue
+            with transaction.atomic():
+                with campo.storage.open(nombre, "rb") as f:
+                    nuevo = campo.storage.save(nombre, File(f))
+                # update(): sin señales, el archivo anterior se borra abajo
+                modelo.objects.filter(pk=pk).update(**{campo.name: nuevo})
+            a_borrar.add((campo.storage, nombre))
+            migrados += 1
+
+        for storage, nombre in a_borrar:
+            storage.delete(nombre)
+        self.stdout.write(self.style.SUCCESS(f"{migrados} archivos pasados a blobs."))
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from inmobiliaria.search import terminos_de
+
+
+def indexar_existentes(apps, schema_editor):
+    Propiedad = apps.get_model('inmobiliaria', 'Propiedad')
+    PropiedadTermino = apps.get_model('inmobiliaria', 'PropiedadTermino')
+    filas = []
+    for p in Propiedad.objects.all().only('id', 'titulo', 'descripcion', 'ciudad').iterator():
+        for termino, peso in terminos_de(p.titulo, p.descripcion, p.ciudad).items():
+            filas.append(PropiedadTermino(propiedad_id=p.id, termino=termino, peso=peso))
+    PropiedadTermino.objects.bulk_create(filas, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inmobiliaria', '0027_cuotacontrato_comprobante'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PropiedadTermino',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('termino', models.CharField(max_length=64)),
+                ('peso', models.PositiveSmallIntegerField(default=1)),
+                ('propiedad', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terminos_busqueda', to='inmobiliaria.propiedad')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['termino', 'propiedad'], name='inmobiliari_termino_d424d5_idx')],
+                'constraints': [models.UniqueConstraint(fields=('propiedad', 'termino'), name='uniq_termino_propiedad')],
+            },
+        ),
+        migrations.RunPython(indexar_existentes, migrations.RunPython.noop),
+    ]
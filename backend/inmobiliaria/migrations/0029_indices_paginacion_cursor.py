@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inmobiliaria', '0028_propiedadtermino'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(fields=['usuario', 'created_at', 'id'], name='inmobiliari_usuario_947dfc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pago',
+            index=models.Index(fields=['fecha', 'id'], name='inmobiliari_fecha_2e9e1f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='propiedad',
+            index=models.Index(fields=['aprobada', 'fecha_registro', 'id'], name='inmobiliari_aprobad_42a66a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='propiedad',
+            index=models.Index(fields=['aprobada', 'precio', 'id'], name='inmobiliari_aprobad_f3ff70_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:38
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inmobiliaria', '0029_indices_paginacion_cursor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PropiedadCatalogo',
+            fields=[
+                ('propiedad', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='catalogo', serialize=False, to='inmobiliaria.propiedad')),
+                ('aprobada', models.BooleanField(default=False)),
+                ('titulo', models.CharField(max_length=200)),
+                ('ciudad', models.CharField(max_length=120)),
+                ('tipo', models.CharField(max_length=20)),
+                ('dormitorios', models.IntegerField(default=0)),
+                ('baos', models.IntegerField(default=0)),
+                ('metros2', models.DecimalField(decimal_places=2, default=0, max_digits=8)),
+                ('precio', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('fecha_registro', models.DateTimeField()),
+                ('estado', models.CharField(max_length=12)),
+                ('reservada_hasta', models.DateTimeField(blank=True, null=True)),
+                ('foto_principal', models.CharField(blank=True, default='', max_length=500)),
+                ('fotos_count', models.PositiveIntegerField(default=0)),
+                ('datos', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('actualizado_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['aprobada', 'fecha_registro', 'propiedad'], name='inmobiliari_aprobad_a36f83_idx'), models.Index(fields=['aprobada', 'precio', 'propiedad'], name='inmobiliari_aprobad_c29b7f_idx'), models.Index(fields=['aprobada', 'ciudad'], name='inmobiliari_aprobad_00e7ae_idx'), models.Index(fields=['aprobada', 'tipo'], name='inmobiliari_aprobad_8c708c_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:39
+
+from django.db import migrations, models
+
+
+def inicializar_updated_at(apps, schema_editor):
+    # sin historial de cambios: se parte desde la fecha de registro
+    Propiedad = apps.get_model("inmobiliaria", "Propiedad")
+    PropiedadCatalogo = apps.get_model("inmobiliaria", "PropiedadCatalogo")
+    Propiedad.objects.update(updated_at=models.F("fecha_registro"))
+    PropiedadCatalogo.objects.update(updated_at=models.F("fecha_registro"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inmobiliaria', '0030_propiedadcatalogo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='propiedad',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='propiedadcatalogo',
+            name='updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(inicializar_updated_at, migrations.RunPython.noop),
+    ]
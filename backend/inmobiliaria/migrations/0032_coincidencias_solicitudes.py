@@ -0,0 +1,58 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from inmobiliaria.search import normalizar_texto
+
+
+def poblar_ciudad_clave(apps, schema_editor):
+    SolicitudCliente = apps.get_model("inmobiliaria", "SolicitudCliente")
+    solicitudes = list(SolicitudCliente.objects.only("pk", "ciudad"))
+    for s in solicitudes:
+        s.ciudad_clave = normalizar_texto(s.ciudad or "").strip()
+    SolicitudCliente.objects.bulk_update(solicitudes, ["ciudad_clave"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inmobiliaria', '0031_updated_at_propiedad'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SolicitudCoincidencia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='solicitudcliente',
+            name='ciudad_clave',
+            field=models.CharField(blank=True, default='', editable=False, max_length=120),
+        ),
+        migrations.RunPython(poblar_ciudad_clave, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='solicitudcliente',
+            index=models.Index(fields=['tipo_propiedad', 'ciudad_clave', 'estado', 'presupuesto_min'], name='inmobiliari_tipo_pr_937eb2_idx'),
+        ),
+        migrations.AddField(
+            model_name='solicitudcoincidencia',
+            name='propiedad',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='coincidencias_solicitudes', to='inmobiliaria.propiedad'),
+        ),
+        migrations.AddField(
+            model_name='solicitudcoincidencia',
+            name='solicitud',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='coincidencias', to='inmobiliaria.solicitudcliente'),
+        ),
+        migrations.AddConstraint(
+            model_name='solicitudcoincidencia',
+            constraint=models.UniqueConstraint(fields=('solicitud', 'propiedad'), name='uniq_coincidencia_solicitud_propiedad'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inmobiliaria', '0032_coincidencias_solicitudes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='propiedadfoto',
+            name='derivados',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
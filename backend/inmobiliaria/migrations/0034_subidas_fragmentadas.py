@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:50
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inmobiliaria', '0033_derivados_fotos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubidaFragmentada',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('destino', models.CharField(choices=[('contrato_documento', 'Documento de contrato'), ('propiedad_documento', 'Documento de propiedad')], max_length=30)),
+                ('objeto_id', models.PositiveIntegerField()),
+                ('tipo', models.CharField(default='otro', max_length=30)),
+                ('nombre', models.CharField(blank=True, max_length=120)),
+                ('nombre_archivo', models.CharField(max_length=255)),
+                ('tamano_total', models.PositiveBigIntegerField()),
+                ('offset', models.PositiveBigIntegerField(default=0)),
+                ('estado', models.CharField(choices=[('en_curso', 'En curso'), ('completa', 'Completa')], default='en_curso', max_length=12)),
+                ('documento_id', models.PositiveIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='subidas', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['estado', 'updated_at'], name='inmobiliari_estado_ea711b_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:52
+
+import inmobiliaria.models
+import inmobiliaria.storage
+import inmobiliaria.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inmobiliaria', '0034_subidas_fragmentadas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Blob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=255, unique=True)),
+                ('digest', models.CharField(db_index=True, max_length=64)),
+                ('tamano', models.PositiveBigIntegerField()),
+                ('referencias', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='contratodocumento',
+            name='archivo',
+            field=models.FileField(storage=inmobiliaria.storage.almacenamiento_privado, upload_to='contratos/documentos/'),
+        ),
+        migrations.AlterField(
+            model_name='cuotacontrato',
+            name='comprobante',
+            field=models.FileField(blank=True, null=True, storage=inmobiliaria.storage.almacenamiento_privado, upload_to=inmobiliaria.models.upload_comprobante_cuota),
+        ),
+        migrations.AlterField(
+            model_name='pago',
+            name='comprobante',
+            field=models.FileField(blank=True, null=True, storage=inmobiliaria.storage.almacenamiento_privado, upload_to='pagos/', verbose_name='Comprobante / boleta'),
+        ),
+        migrations.AlterField(
+            model_name='propiedaddocumento',
+            name='archivo',
+            field=models.FileField(storage=inmobiliaria.storage.almacenamiento_privado, upload_to='propiedades/documentos/'),
+        ),
+        migrations.AlterField(
+            model_name='propiedadfoto',
+            name='foto',
+            field=models.ImageField(storage=inmobiliaria.storage.almacenamiento_publico, upload_to='propiedades/fotos/', validators=[inmobiliaria.validators.validar_imagen]),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inmobiliaria', '0035_blobs_deduplicados'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MarcaBarrido',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=50, unique=True)),
+                ('ultimo_barrido', models.DateTimeField(blank=True, null=True)),
+                ('procesadas', models.PositiveIntegerField(default=0)),
+                ('total_procesadas', models.PositiveBigIntegerField(default=0)),
+                ('duracion_ms', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:58
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def desactivar_duplicadas(apps, schema_editor):
+    """
+    Antes del índice único: expira las activas vencidas y, si una propiedad
+    aún tiene varias activas, deja solo la más reciente.
+    """
+    Reserva = apps.get_model("inmobiliaria", "Reserva")
+    ahora = timezone.now()
+    Reserva.objects.filter(activa=True, expires_at__lte=ahora, estado__in=["pendiente", "confirmada"]).update(
+        activa=False, estado="expirada"
+    )
+    Reserva.objects.filter(activa=True, expires_at__lte=ahora).update(activa=False)
+
+    vistas = set()
+    sobrantes = []
+    for pk, propiedad_id in (
+        Reserva.objects.filter(activa=True).order_by("propiedad_id", "-fecha", "-pk").values_list("pk", "propiedad_id")
+    ):
+        if propiedad_id in vistas:
+            sobrantes.append(pk)
+        vistas.add(propiedad_id)
+    Reserva.objects.filter(pk__in=sobrantes).update(activa=False, estado="cancelada")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inmobiliaria', '0036_marca_barrido'),
+    ]
+
+    operations = [
+        migrations.RunPython(desactivar_duplicadas, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='reserva',
+            name='propiedad_activa',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(activa=True, then=models.F('propiedad')), default=None), output_field=models.BigIntegerField(null=True)),
+        ),
+        migrations.AddConstraint(
+            model_name='reserva',
+            constraint=models.UniqueConstraint(fields=('propiedad_activa',), name='reserva_unica_activa_por_propiedad'),
+        ),
+    ]
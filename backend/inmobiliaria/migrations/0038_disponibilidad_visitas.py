@@ -0,0 +1,45 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from inmobiliaria.disponibilidad import BIT_SLOT
+
+
+def poblar_disponibilidad(apps, schema_editor):
+    Visita = apps.get_model("inmobiliaria", "Visita")
+    DisponibilidadVisita = apps.get_model("inmobiliaria", "DisponibilidadVisita")
+    mascaras = {}
+    for propiedad_id, fecha, hora in Visita.objects.values_list("propiedad_id", "fecha", "hora").iterator():
+        clave = (propiedad_id, fecha)
+        mascaras[clave] = mascaras.get(clave, 0) | BIT_SLOT.get(hora, 0)
+    DisponibilidadVisita.objects.bulk_create(
+        [
+            DisponibilidadVisita(propiedad_id=propiedad_id, fecha=fecha, ocupados=m)
+            for (propiedad_id, fecha), m in mascaras.items() if m
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inmobiliaria', '0037_reserva_unica_activa'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DisponibilidadVisita',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('ocupados', models.PositiveSmallIntegerField(default=0)),
+                ('propiedad', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='disponibilidad_visitas', to='inmobiliaria.propiedad')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'propiedad'), name='uniq_disponibilidad_fecha_propiedad')],
+            },
+        ),
+        migrations.RunPython(poblar_disponibilidad, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:05
+
+import django.db.models.deletion
+import inmobiliaria.models
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def inicializar_updated_at(apps, schema_editor):
+    # sin historial: se parte desde ahora (los feeds se regeneran una vez)
+    ahora = timezone.now()
+    apps.get_model("inmobiliaria", "Visita").objects.update(updated_at=ahora)
+    apps.get_model("inmobiliaria", "CuotaContrato").objects.update(updated_at=ahora)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inmobiliaria', '0038_disponibilidad_visitas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cuotacontrato',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='visita',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='TokenCalendario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(default=inmobiliaria.models.generar_token_calendario, max_length=64, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('usuario', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='token_calendario', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(inicializar_updated_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from inmobiliaria.libro import expresiones
+
+
+def poblar_libro(apps, schema_editor):
+    Contrato = apps.get_model("inmobiliaria", "Contrato")
+    Pago = apps.get_model("inmobiliaria", "Pago")
+    CuotaContrato = apps.get_model("inmobiliaria", "CuotaContrato")
+    Contrato.objects.update(**expresiones(Pago, CuotaContrato))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inmobiliaria', '0039_feeds_calendario'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contrato',
+            name='cuotas_pendientes',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='contrato',
+            name='monto_pendiente',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='contrato',
+            name='proxima_cuota',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='inmobiliaria.cuotacontrato'),
+        ),
+        migrations.AddField(
+            model_name='contrato',
+            name='proximo_vencimiento',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='contrato',
+            name='total_pagado',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='contrato',
+            name='ultima_cuota_pagada',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='inmobiliaria.cuotacontrato'),
+        ),
+        migrations.AddIndex(
+            model_name='contrato',
+            index=models.Index(fields=['vigente', 'proximo_vencimiento'], name='inmobiliari_vigente_d04a70_idx'),
+        ),
+        migrations.RunPython(poblar_libro, migrations.RunPython.noop),
+    ]
@@ -1,14 +1,20 @@
-from django.db import models
+import secrets
+import uuid
+
+from django.db import IntegrityError, models
 from django.utils import timezone
 from django.core.validators import MinValueValidator
 
 from datetime import time, date
-from dateutil.relativedelta import relativedelta
 from .validators import * 
 from .config import *
 
 from django.contrib.auth.models import AbstractUser
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.files.storage import default_storage
+from .storage import almacenamiento_privado, almacenamiento_publico
+from . import cuotas, estados, libro
 
 
 
@@ -111,6 +117,70 @@ class Direccion_propietario(models.Model):
     def __str__(self):
         return f"{self.calle_o_pasaje},{self.numero},{self.comuna.nombre_comuna}"
 
+class PropiedadQuerySet(models.QuerySet):
+    def con_estado_calculado(self, now=None):
+        """
+        Anota 'estado_calculado' con la misma regla que calcular_estado_propiedad,
+        resuelta en SQL (Exists/Subquery) para no consultar por cada fila.
+        """
+        now = now or timezone.now()
+
+        contrato_vigente = (
+            Contrato.objects
+            .filter(propiedad_id=models.OuterRef("pk"), vigente=True)
+            .order_by("-fecha_firma", "-id")
+            .values("tipo")[:1]
+        )
+        reserva_vigente = Reserva.objects.filter(
+            propiedad_id=models.OuterRef("pk"),
+            activa=True,
+            expires_at__gt=now,
+        )
+
+        return self.annotate(
+            _tipo_contrato_vigente=models.Subquery(contrato_vigente),
+            _tiene_reserva_vigente=models.Exists(reserva_vigente),
+        ).annotate(
+            estado_calculado=models.Case(
+                models.When(estado__in=("arrendada", "vendida"), then=models.F("estado")),
+                models.When(_tipo_contrato_vigente="venta", then=models.Value("vendida")),
+                models.When(_tipo_contrato_vigente__isnull=False, then=models.Value("arrendada")),
+                models.When(_tiene_reserva_vigente=True, then=models.Value("reservada")),
+                default=models.Value("disponible"),
+                output_field=models.CharField(max_length=12),
+            )
+        )
+
+    def tocar(self, now=None):
+        """
+        Marca las propiedades como modificadas (updated_at) sin pasar por save().
+        """
+        return self.update(updated_at=now or timezone.now())
+
+    def con_reserva_vencida(self, now=None):
+        """
+        Anota 'reserva_vencida_en': vencimiento de la última reserva activa que
+        ya venció. El estado calculado cambia en ese instante aunque nada se
+        haya escrito, así que cuenta como modificación.
+        """
+        now = now or timezone.now()
+        vencida = (
+            Reserva.objects
+            .filter(propiedad_id=models.OuterRef("pk"), activa=True, expires_at__lte=now)
+            .order_by("-expires_at")
+            .values("expires_at")[:1]
+        )
+        return self.annotate(reserva_vencida_en=models.Subquery(vencida))
+
+    def con_fotos(self):
+        """
+        Precarga las fotos ordenadas: una sola consulta para toda la página.
+        """
+        return self.prefetch_related(
+            models.Prefetch("fotos", queryset=PropiedadFoto.objects.order_by("orden", "id"))
+        )
+
+
 class Propiedad(models.Model):
     TIPO_CHOICES = [
         ('casa', 'Casa'),
@@ -159,11 +229,15 @@ class Propiedad(models.Model):
                                  validators=[MinValueValidator(0)])
     estado = models.CharField(max_length=12, choices=ESTADO_CHOICES, default='disponible')
     fecha_registro = models.DateTimeField(auto_now_add=True)
+    # se actualiza en save() y también al cambiar fotos, reservas o contratos
+    # (ver signals.py); sirve de validador para ETag / Last-Modified
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     propietario_user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="propiedades_subidas",null=True, blank=True)
     estado_aprobacion = models.CharField(max_length=20, choices=ESTADO_APROBACION, default='pendiente')
     observacion_admin = models.TextField(blank=True, null=True)
     codigo = models.CharField(max_length=20, unique=True, null=True, blank=True, db_index=True)
 
+    objects = PropiedadQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Propiedad'
@@ -173,6 +247,9 @@ class Propiedad(models.Model):
             models.Index(fields=['ciudad']),
             models.Index(fields=['precio']),      
             models.Index(fields=['aprobada']),    
+            # paginación por cursor del catálogo
+            models.Index(fields=['aprobada', 'fecha_registro', 'id']),
+            models.Index(fields=['aprobada', 'precio', 'id']),
         ]
 
     def save(self, *args, **kwargs):
@@ -188,6 +265,10 @@ class Propiedad(models.Model):
             except Propiedad.DoesNotExist:
                 pass
 
+        # con update_fields, auto_now solo se guarda si va en la lista
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = set(kwargs["update_fields"]) | {"updated_at"}
+
         super().save(*args, **kwargs)
 
         # Generar código SOLO al crear (así nunca haces doble save en updates)
@@ -234,15 +315,108 @@ class Propiedad(models.Model):
                 pass
 
     
+    @property
+    def registro_foto_principal(self):
+        # Con con_fotos() se resuelve desde la precarga, sin consultar
+        if "fotos" in getattr(self, "_prefetched_objects_cache", {}):
+            return next((f for f in self.fotos.all() if f.principal), None)
+        return self.fotos.filter(principal=True).first()
+
     @property
     def foto_principal(self):
-        fp = self.fotos.filter(principal=True).first()
+        fp = self.registro_foto_principal
         return fp.foto.url if fp and fp.foto else None
     
     def __str__(self):
         return f"{self.orientacion} - {self.titulo} - {self.propietario.primer_nombre}"
 
 
+# Índice invertido para la búsqueda del catálogo (ver search.py)
+class PropiedadTermino(models.Model):
+    propiedad = models.ForeignKey(Propiedad, on_delete=models.CASCADE, related_name="terminos_busqueda")
+    termino = models.CharField(max_length=64)
+    peso = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["propiedad", "termino"], name="uniq_termino_propiedad")
+        ]
+        indexes = [models.Index(fields=["termino", "propiedad"])]
+
+    def __str__(self):
+        return f"{self.termino} ({self.propiedad_id})"
+
+
+class PropiedadCatalogoQuerySet(models.QuerySet):
+    def con_estado_actual(self, now=None):
+        """
+        Anota 'estado_actual': el estado guardado, salvo una reserva que ya
+        venció (eso no pasa por ninguna escritura, así que se corrige al leer).
+        """
+        now = now or timezone.now()
+        return self.annotate(
+            estado_actual=models.Case(
+                models.When(estado="reservada", reservada_hasta__lte=now, then=models.Value("disponible")),
+                default=models.F("estado"),
+                output_field=models.CharField(),
+            )
+        )
+
+    def resumen_validadores(self, now=None):
+        """
+        Total, último updated_at y reservas vencidas sin sincronizar del
+        conjunto filtrado: alcanza para saber si una página cambió.
+        """
+        now = now or timezone.now()
+        vencidas = models.Q(reservada_hasta__lte=now)
+        return self.order_by().aggregate(
+            total=models.Count("pk"),
+            ultima=models.Max("updated_at"),
+            vencidas=models.Count("pk", filter=vencidas),
+            vencida_max=models.Max("reservada_hasta", filter=vencidas),
+        )
+
+
+# Modelo de lectura del catálogo público (ver catalogo.py): una fila plana por
+# propiedad con lo que muestra la tarjeta, mantenida desde signals.py.
+class PropiedadCatalogo(models.Model):
+    propiedad = models.OneToOneField(Propiedad, on_delete=models.CASCADE, primary_key=True, related_name="catalogo")
+    aprobada = models.BooleanField(default=False)
+    titulo = models.CharField(max_length=200)
+    ciudad = models.CharField(max_length=120)
+    tipo = models.CharField(max_length=20)
+    dormitorios = models.IntegerField(default=0)
+    baos = models.IntegerField(default=0)
+    metros2 = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+    precio = models.DecimalField(max_digits=12, decimal_places=2)
+    fecha_registro = models.DateTimeField()
+    updated_at = models.DateTimeField(null=True, blank=True)
+
+    # estado calculado (contrato / reserva) al sincronizar
+    estado = models.CharField(max_length=12)
+    reservada_hasta = models.DateTimeField(null=True, blank=True)
+
+    foto_principal = models.CharField(max_length=500, blank=True, default="")
+    fotos_count = models.PositiveIntegerField(default=0)
+    # tarjeta serializada (PropiedadConFotosSerializer sin 'estado')
+    datos = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+
+    actualizado_at = models.DateTimeField(auto_now=True)
+
+    objects = PropiedadCatalogoQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["aprobada", "fecha_registro", "propiedad"]),
+            models.Index(fields=["aprobada", "precio", "propiedad"]),
+            models.Index(fields=["aprobada", "ciudad"]),
+            models.Index(fields=["aprobada", "tipo"]),
+        ]
+
+    def __str__(self):
+        return f"Catálogo {self.propiedad_id} - {self.titulo}"
+
+
 
 # Tabla interesados:
 class Interesado(models.Model):
@@ -302,6 +476,8 @@ class SolicitudCliente(models.Model):
 
     ciudad = models.CharField(max_length=120)
     comuna = models.CharField(max_length=120)
+    # ciudad normalizada (minúsculas, sin tildes) para cruzar con propiedades
+    ciudad_clave = models.CharField(max_length=120, blank=True, default="", editable=False)
 
     presupuesto_min = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, validators=[MinValueValidator(0)])
     presupuesto_max = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, validators=[MinValueValidator(0)])
@@ -311,14 +487,48 @@ class SolicitudCliente(models.Model):
     estado = models.CharField(max_length=20, choices=ESTADO_SOLICITUD, default="nueva", db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    ESTADOS_ABIERTOS = ("nueva", "en_proceso")
+
     class Meta:
         ordering = ["-created_at"]
-        indexes = [models.Index(fields=["estado", "created_at"])]
+        indexes = [
+            models.Index(fields=["estado", "created_at"]),
+            # búsqueda de solicitudes que calzan con una propiedad (ver coincidencias.py)
+            models.Index(fields=["tipo_propiedad", "ciudad_clave", "estado", "presupuesto_min"]),
+        ]
+
+    def save(self, *args, **kwargs):
+        from inmobiliaria.search import normalizar_texto
+
+        self.ciudad_clave = normalizar_texto(self.ciudad or "").strip()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "ciudad" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "ciudad_clave"}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Solicitud de {self.interesado.nombre_completo} ({self.tipo_operacion} {self.tipo_propiedad})"
 
 
+class SolicitudCoincidencia(models.Model):
+    """
+    Propiedad aprobada que calzó con una solicitud; evita notificar dos
+    veces el mismo par.
+    """
+    solicitud = models.ForeignKey(SolicitudCliente, on_delete=models.CASCADE, related_name="coincidencias")
+    propiedad = models.ForeignKey(Propiedad, on_delete=models.CASCADE, related_name="coincidencias_solicitudes")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        constraints = [
+            models.UniqueConstraint(fields=["solicitud", "propiedad"], name="uniq_coincidencia_solicitud_propiedad")
+        ]
+
+    def __str__(self):
+        return f"Solicitud {self.solicitud_id} ↔ Propiedad {self.propiedad_id}"
+
+
 class SolicitudNotaAdmin(models.Model):
     solicitud = models.ForeignKey(SolicitudCliente, on_delete=models.CASCADE, related_name="notas_admin")
     texto = models.TextField()
@@ -341,6 +551,7 @@ class Visita(models.Model):
     hora       = models.TimeField()
     estado      = models.CharField(max_length=100, default='agendada')  # agendada, confirmada, realizada, cancelada
     comentarios = models.TextField(blank=True)
+    updated_at  = models.DateTimeField(auto_now=True, null=True)
 
     class Meta:
         unique_together = ('propiedad', 'interesado', 'fecha', 'hora')
@@ -384,6 +595,22 @@ class Visita(models.Model):
         if visitas_dia.count() >= MAX_VISITAS_POR_DIA:
             raise ValidationError(f"El interesado ya alcanzó el máximo de {MAX_VISITAS_POR_DIA} visitas para ese día.")
 
+# Horarios ocupados de una propiedad en un día como máscara de bits
+# (bit i = INTERVALO_PERMITIDOS[i]); sin fila = día libre. Se mantiene con
+# las señales de Visita (ver disponibilidad.py)
+class DisponibilidadVisita(models.Model):
+    propiedad = models.ForeignKey(Propiedad, on_delete=models.CASCADE, related_name="disponibilidad_visitas")
+    fecha = models.DateField()
+    ocupados = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["fecha", "propiedad"], name="uniq_disponibilidad_fecha_propiedad")
+        ]
+
+    def __str__(self):
+        return f"{self.propiedad_id} {self.fecha}: {self.ocupados:0{len(INTERVALO_PERMITIDOS)}b}"
+
 # Tabla dias feriados
 class Feriado(models.Model):
     fecha = models.DateField(unique=True)
@@ -397,6 +624,30 @@ class Feriado(models.Model):
 
 
 # Tabla Reservas
+class ReservaQuerySet(models.QuerySet):
+    def con_propiedad_estado(self):
+        """
+        Carga la propiedad de cada reserva en una sola consulta extra, ya anotada
+        con su estado calculado (para MiniPropiedadSerializer).
+        """
+        return self.prefetch_related(
+            models.Prefetch("propiedad", queryset=Propiedad.objects.con_estado_calculado())
+        )
+
+    def expirar(self) -> int:
+        """
+        Desactiva las reservas del queryset; las pendientes/confirmadas
+        quedan como "expirada" (canceladas se mantienen).
+        """
+        return self.update(
+            activa=False,
+            estado=models.Case(
+                models.When(estado__in=["pendiente", "confirmada"], then=models.Value("expirada")),
+                default=models.F("estado"),
+            ),
+        )
+
+
 class Reserva(models.Model):
     ESTADO_RESERVA = [
     ("pendiente", "Pendiente"),
@@ -415,6 +666,16 @@ class Reserva(models.Model):
     monto_reserva = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     notas = models.TextField(blank=True)
     activa = models.BooleanField(default=True, db_index=True)
+    # propiedad_id mientras está activa y NULL si no: el índice único sobre
+    # esta columna deja una sola reserva activa por propiedad (MySQL no
+    # soporta UniqueConstraint con condition)
+    propiedad_activa = models.GeneratedField(
+        expression=models.Case(models.When(activa=True, then=models.F("propiedad")), default=None),
+        output_field=models.BigIntegerField(null=True),
+        db_persist=True,
+    )
+
+    objects = ReservaQuerySet.as_manager()
 
     class Meta:
         ordering = ['-fecha'] 
@@ -422,6 +683,9 @@ class Reserva(models.Model):
             models.Index(fields=["propiedad", "activa"]),
             models.Index(fields=["expires_at"]),
         ]
+        constraints = [
+            models.UniqueConstraint(fields=["propiedad_activa"], name="reserva_unica_activa_por_propiedad"),
+        ]
 
     def clean(self):
         if not self.propiedad_id:
@@ -441,18 +705,7 @@ class Reserva(models.Model):
         if self.estado in ("cancelada", "expirada"):
             self.activa = False
 
-        if self.activa:
-            existe_otra = (
-                Reserva.objects.filter(
-                    propiedad_id=self.propiedad_id,
-                    activa=True,
-                    expires_at__gt=now,
-                )
-                .exclude(pk=self.pk)
-                .exists()
-            )
-            if existe_otra:
-                raise ValidationError("La propiedad ya tiene una reserva activa.")
+        # "una sola activa por propiedad" lo garantiza el índice único (ver save)
 
         from .models import Contrato
 
@@ -467,81 +720,42 @@ class Reserva(models.Model):
 
 
 
-    @classmethod
-    def sync_estado_propiedad(cls, propiedad_id: int, now=None) -> None:
-        from inmobiliaria.models import Propiedad, Contrato
-        now = now or timezone.now()
-
-        p = Propiedad.objects.only("id", "estado").filter(id=propiedad_id).first()
-        if not p:
-            return
-
-        # no tocar estados finales
-        if p.estado in ("arrendada", "vendida"):
-            return
-
-        if Contrato.objects.filter(propiedad_id=propiedad_id, vigente=True).exists():
-            return
-
-        hay_activa_vigente = cls.objects.filter(
-            propiedad_id=propiedad_id,
-            activa=True,
-            expires_at__gt=now,
-        ).exists()
-
-        if hay_activa_vigente:
-            if p.estado != "reservada":
-                Propiedad.objects.filter(id=propiedad_id).update(estado="reservada")
-        else:
-            if p.estado == "reservada":
-                Propiedad.objects.filter(id=propiedad_id).update(estado="disponible")
-
-
-    from django.utils import timezone
-
-    @classmethod
-    def expirar_reservas_y_sync_estado(cls) -> int:
-        from inmobiliaria.models import Propiedad
-        now = timezone.now()
-
-        qs_exp = cls.objects.filter(
-            activa=True,
-            expires_at__isnull=False,
-            expires_at__lte=now,
-            estado__in=["pendiente", "confirmada"],  # opcional pero recomendado
-        )
-
-        prop_ids_exp = list(qs_exp.values_list("propiedad_id", flat=True).distinct())
-
-        expiradas = qs_exp.update(activa=False, estado="expirada")
-        pegadas_ids = list(
-            Propiedad.objects.filter(estado="reservada")
-            .exclude(reservas__activa=True, reservas__expires_at__gt=now)
-            .values_list("id", flat=True)
-        )
-
-        ids = set(prop_ids_exp) | set(pegadas_ids)
-
-        if ids:
-            Propiedad.objects.filter(id__in=ids, estado="reservada") \
-                .exclude(reservas__activa=True, reservas__expires_at__gt=now) \
-                .update(estado="disponible")
-
-        return expiradas
-
-
-
     def save(self, *args, **kwargs):
         self.clean()
-        with transaction.atomic():
-            super().save(*args, **kwargs)
-
-            if self.propiedad_id:
-                Reserva.sync_estado_propiedad(self.propiedad_id)
+        try:
+            with transaction.atomic():
+                if self.activa:
+                    # una vencida que el expirador aún no barrió no bloquea la nueva
+                    Reserva.objects.filter(
+                        propiedad_id=self.propiedad_id, activa=True, expires_at__lte=timezone.now(),
+                    ).exclude(pk=self.pk).expirar()
+
+                super().save(*args, **kwargs)
+
+                # clean() ya descartó contrato vigente y el índice garantiza
+                # que es la única activa: basta la transición directa
+                if self.activa:
+                    estados.aplicar("reservar", [self.propiedad_id])
+                else:
+                    estados.sincronizar([self.propiedad_id])
+        except IntegrityError as e:
+            # otra reserva activa entró primero (check-then-insert sin carrera)
+            if "reserva_unica_activa_por_propiedad" in str(e) or "propiedad_activa" in str(e):
+                raise ValidationError("La propiedad ya tiene una reserva activa.")
+            raise
 
     def __str__(self):
         return f"{self.propiedad} - {self.interesado}"
 
+class ContratoQuerySet(models.QuerySet):
+    def con_libro(self):
+        """
+        Trae las cuotas a las que apunta el libro (próxima y última pagada)
+        en la misma consulta: el listado no toca pagos ni cuotas.
+        """
+        return self.select_related("proxima_cuota", "ultima_cuota_pagada")
+
+
 class Contrato(models.Model):
     TIPO = (("venta","Venta"),("arriendo","Arriendo"))
     propiedad = models.ForeignKey(Propiedad, on_delete=models.PROTECT, related_name="contratos")
@@ -557,44 +771,46 @@ class Contrato(models.Model):
     on_delete=models.SET_NULL,
     related_name="contratos_subidos"
 )
+    # libro (ver libro.py): lo mantienen las escrituras de Pago y CuotaContrato
+    total_pagado = models.DecimalField(max_digits=14, decimal_places=2, default=0, editable=False)
+    monto_pendiente = models.DecimalField(max_digits=14, decimal_places=2, default=0, editable=False)
+    cuotas_pendientes = models.PositiveIntegerField(default=0, editable=False)
+    proximo_vencimiento = models.DateField(null=True, blank=True, editable=False)
+    proxima_cuota = models.ForeignKey(
+        "CuotaContrato", null=True, blank=True, on_delete=models.SET_NULL, related_name="+", editable=False
+    )
+    ultima_cuota_pagada = models.ForeignKey(
+        "CuotaContrato", null=True, blank=True, on_delete=models.SET_NULL, related_name="+", editable=False
+    )
+
+    objects = ContratoQuerySet.as_manager()
+
     class Meta:
         ordering = ['-fecha_firma'] 
-        indexes = [models.Index(fields=["tipo","vigente"])]
+        indexes = [
+            models.Index(fields=["tipo","vigente"]),
+            models.Index(fields=["vigente", "proximo_vencimiento"]),
+        ]
+
+    def save(self, *args, **kwargs):
+        # un save() completo no debe pisar el libro con valores leídos antes
+        # de un pago concurrente
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in libro.CAMPOS
+            ]
+        super().save(*args, **kwargs)
 
     def dia_vencimiento(self) -> int:
         return 5
 
     def asegurar_cuotas_hasta(self, hasta: date) -> int:
-        if self.tipo != "arriendo" or not self.vigente:
-            return 0
-
-        # Arrancamos desde el mes siguiente a la firma
-        start = (self.fecha_firma.replace(day=1) + relativedelta(months=1))
-        end = hasta.replace(day=1)
-
-        created = 0
-        cursor = start
-        while cursor <= end:
-            dia = self.dia_vencimiento()
-
-            # calcular último día del mes para “clamp”
-            next_month = cursor + relativedelta(months=1)
-            last_day = (next_month - relativedelta(days=1)).day
-            dia_real = min(dia, last_day)
-
-            venc = date(cursor.year, cursor.month, dia_real)
-
-            _, was_created = CuotaContrato.objects.get_or_create(
-                contrato=self,
-                vencimiento=venc,
-                defaults={"monto": self.precio_pactado, "pagada": False},
-            )
-            if was_created:
-                created += 1
-
-            cursor = cursor + relativedelta(months=1)
-
-        return created
+        # las que faltan hasta el mes de `hasta`, en un solo bulk_create
+        creadas = cuotas.generar([self], hasta)
+        if creadas:
+            self.refresh_from_db(fields=libro.CAMPOS)
+        return creadas
 
     def __str__(self):
         return f"{self.tipo.title()} {self.propiedad.titulo} - {self.comprador_arrendatario.nombre_completo}"
@@ -617,10 +833,11 @@ class Pago(models.Model):
     fecha = models.DateField()
     monto = models.DecimalField(max_digits=12, decimal_places=2, validators=[MinValueValidator(0)])
     medio = models.CharField(max_length=30, choices=MEDIOS_PAGO, default="transferencia")
-    comprobante = models.FileField(upload_to="pagos/", blank=True, null=True, verbose_name='Comprobante / boleta')
+    comprobante = models.FileField(upload_to="pagos/", storage=almacenamiento_privado, blank=True, null=True, verbose_name='Comprobante / boleta')
     notas = models.TextField(blank=True)
     class Meta:
         ordering = ['-fecha']
+        indexes = [models.Index(fields=["fecha", "id"])]
     
     def __str__(self):
         return f"Pago {self.monto} - {self.contrato}"
@@ -630,13 +847,30 @@ class Pago(models.Model):
 from django.db import transaction
 class PropiedadFoto(models.Model):
     propiedad = models.ForeignKey('Propiedad', on_delete=models.CASCADE, related_name='fotos')
-    foto = models.ImageField(upload_to='propiedades/fotos/', validators=[validar_imagen])
+    foto = models.ImageField(upload_to='propiedades/fotos/', storage=almacenamiento_publico, validators=[validar_imagen])
     orden = models.PositiveIntegerField(default=0, db_index=True)
     principal = models.BooleanField(default=False, db_index=True)
+    # miniaturas generadas al subir (ver imagenes.py):
+    # {"origen": nombre del original, "tamanos": {"small": {"jpeg", "webp", "ancho", "alto"}, ...}}
+    derivados = models.JSONField(default=dict, blank=True, editable=False)
 
     class Meta:
         ordering = ['propiedad', 'orden']
 
+    def url_derivado(self, tamano, formato="jpeg"):
+        """
+        URL del derivado; si aún no se genera (o es de un archivo anterior),
+        la del original (solo para JPEG).
+        """
+        derivados = self.derivados or {}
+        if self.foto and derivados.get("origen") == self.foto.name:
+            nombre = derivados.get("tamanos", {}).get(tamano, {}).get(formato)
+            if nombre:
+                return default_storage.url(nombre)
+        if formato == "jpeg" and self.foto:
+            return self.foto.url
+        return None
+
     def save(self, *args, **kwargs):
         with transaction.atomic():
             super().save(*args, **kwargs)
@@ -663,7 +897,7 @@ class PropiedadDocumento(models.Model):
     propiedad = models.ForeignKey(Propiedad, on_delete=models.CASCADE, related_name="documentos")
     tipo = models.CharField(max_length=30, choices=TIPOS, default="otro")
     nombre = models.CharField(max_length=120, blank=True)
-    archivo = models.FileField(upload_to="propiedades/documentos/")
+    archivo = models.FileField(upload_to="propiedades/documentos/", storage=almacenamiento_privado)
     created_at = models.DateTimeField(auto_now_add=True)
     subido_por = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL)
 
@@ -684,13 +918,90 @@ class ContratoDocumento(models.Model):
     contrato = models.ForeignKey(Contrato, on_delete=models.CASCADE, related_name="documentos")
     tipo = models.CharField(max_length=30, choices=TIPOS, default="otro")
     nombre = models.CharField(max_length=120, blank=True)
-    archivo = models.FileField(upload_to="contratos/documentos/")
+    archivo = models.FileField(upload_to="contratos/documentos/", storage=almacenamiento_privado)
     created_at = models.DateTimeField(auto_now_add=True)
     subido_por = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL)
 
     class Meta:
         ordering = ["-created_at"]
 
+
+# Archivo guardado una sola vez por contenido (ver storage.py); los FileField
+# que lo usan comparten el mismo nombre y 'referencias' cuenta cuántos son
+class Blob(models.Model):
+    nombre = models.CharField(max_length=255, unique=True)
+    digest = models.CharField(max_length=64, db_index=True)
+    tamano = models.PositiveBigIntegerField()
+    referencias = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.nombre} ({self.referencias} refs)"
+
+
+def generar_token_calendario():
+    return secrets.token_urlsafe(32)
+
+
+# Token secreto de los feeds .ics del usuario (ver ical.py): el calendario
+# del teléfono no manda JWT, así que la URL misma autoriza
+class TokenCalendario(models.Model):
+    usuario = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="token_calendario")
+    token = models.CharField(max_length=64, unique=True, default=generar_token_calendario)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Calendario de {self.usuario}"
+
+
+# Marca de agua de los procesos en segundo plano (ver expirador.py): cuándo
+# corrió por última vez cada barrido y cuánto procesó
+class MarcaBarrido(models.Model):
+    nombre = models.CharField(max_length=50, unique=True)
+    ultimo_barrido = models.DateTimeField(null=True, blank=True)
+    procesadas = models.PositiveIntegerField(default=0)
+    total_procesadas = models.PositiveBigIntegerField(default=0)
+    duracion_ms = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.nombre} @ {self.ultimo_barrido}"
+
+
+# Subida por partes de un documento (ver subidas.py): el archivo se arma en
+# SUBIDAS_DIR y al finalizar se adjunta a un ContratoDocumento / PropiedadDocumento
+class SubidaFragmentada(models.Model):
+    DESTINOS = [
+        ("contrato_documento", "Documento de contrato"),
+        ("propiedad_documento", "Documento de propiedad"),
+    ]
+    ESTADOS = [
+        ("en_curso", "En curso"),
+        ("completa", "Completa"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="subidas")
+    destino = models.CharField(max_length=30, choices=DESTINOS)
+    # id del contrato o de la propiedad, según destino
+    objeto_id = models.PositiveIntegerField()
+    tipo = models.CharField(max_length=30, default="otro")
+    nombre = models.CharField(max_length=120, blank=True)
+    nombre_archivo = models.CharField(max_length=255)
+    tamano_total = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    estado = models.CharField(max_length=12, choices=ESTADOS, default="en_curso")
+    documento_id = models.PositiveIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        # limpieza de subidas abandonadas
+        indexes = [models.Index(fields=["estado", "updated_at"])]
+
+    def __str__(self):
+        return f"{self.nombre_archivo} ({self.offset}/{self.tamano_total})"
+
 #Tabla historial de cambios
 class Historial(models.Model):
 
@@ -751,9 +1062,11 @@ class CuotaContrato(models.Model):
     pago = models.ForeignKey("Pago", null=True, blank=True, on_delete=models.SET_NULL)
     comprobante = models.FileField(
         upload_to=upload_comprobante_cuota,
+        storage=almacenamiento_privado,
         null=True,
         blank=True
     )
+    updated_at = models.DateTimeField(auto_now=True, null=True)
     class Meta:
         constraints = [
             models.UniqueConstraint(fields=["contrato", "vencimiento"], name="uniq_cuota_contrato_vencimiento")
@@ -780,18 +1093,20 @@ class CuotaContrato(models.Model):
         elif not str(notas).upper().startswith("CUOTA:"):
             notas = f"CUOTA: {notas}"
 
-        pago = Pago.objects.create(
-            contrato=self.contrato,
-            fecha=fecha,
-            monto=monto,
-            medio=medio,
-            notas=notas,
-            comprobante=comprobante,
-        )
+        # pago, cuota y libro del contrato van juntos
+        with transaction.atomic():
+            pago = Pago.objects.create(
+                contrato=self.contrato,
+                fecha=fecha,
+                monto=monto,
+                medio=medio,
+                notas=notas,
+                comprobante=comprobante,
+            )
 
-        self.pagada = True
-        self.pago = pago
-        self.save(update_fields=["pagada", "pago"])
+            self.pagada = True
+            self.pago = pago
+            self.save(update_fields=["pagada", "pago", "updated_at"])
 
         return pago
 
@@ -816,7 +1131,10 @@ class Notificacion(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
-        indexes = [models.Index(fields=["tipo", "leida", "created_at"])]
+        indexes = [
+            models.Index(fields=["tipo", "leida", "created_at"]),
+            models.Index(fields=["usuario", "created_at", "id"]),
+        ]
         verbose_name = "Notificacion"
         verbose_name_plural = "Notificaciones"
 
@@ -0,0 +1,176 @@
+import base64
+import json
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginación por cursor (keyset) sobre una ordenación compuesta que termina
+    en una columna única, p.ej. (-fecha_registro, -id).
+
+    En vez de OFFSET n + COUNT(*), cada página filtra con
+    "(campo, id) después del último visto", por lo que la página 500 cuesta
+    lo mismo que la primera. Solo avanza (scroll infinito): la respuesta
+    trae 'next' y 'results', sin 'count'.
+
+    'ordenes' mapea el valor de ?ordering al orden real; si no se envía se
+    usa el primero.
+    """
+    cursor_query_param = "cursor"
+    ordering_param = "ordering"
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordenes = {}
+
+    invalid_cursor_message = "Cursor inválido."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.clave, campos = self.get_ordering(request)
+        self.campos = campos
+        tamano = self.get_page_size(request)
+
+        queryset = queryset.order_by(*campos)
+
+        valores = self.decode_cursor(request)
+        if valores is not None:
+            queryset = queryset.filter(self._despues_de(campos, valores))
+
+        filas = list(queryset[: tamano + 1])
+        self.has_next = len(filas) > tamano
+        self.page = filas[:tamano]
+        return self.page
+
+    def get_ordering(self, request):
+        claves = list(self.ordenes)
+        clave = (request.query_params.get(self.ordering_param) or "").strip() or claves[0]
+        if clave not in self.ordenes:
+            raise ValidationError({
+                self.ordering_param: f"Con paginación por cursor solo se admite: {', '.join(claves)}."
+            })
+        return clave, self.ordenes[clave]
+
+    def get_page_size(self, request):
+        try:
+            tamano = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(tamano, self.max_page_size))
+
+    def _despues_de(self, campos, valores):
+        # (a, b, c) > (x, y, z)  ==  a > x  OR  (a = x AND b > y)  OR  ...
+        condicion = Q()
+        iguales = Q()
+        for campo, valor in zip(campos, valores):
+            nombre = campo.lstrip("-")
+            op = "lt" if campo.startswith("-") else "gt"
+            condicion |= iguales & Q(**{f"{nombre}__{op}": valor})
+            iguales &= Q(**{nombre: valor})
+        return condicion
+
+    # ---- cursor ----
+    def decode_cursor(self, request):
+        crudo = request.query_params.get(self.cursor_query_param)
+        if not crudo:
+            return None
+        try:
+            datos = json.loads(base64.urlsafe_b64decode(crudo.encode("ascii")).decode("utf-8"))
+            clave, valores = datos["o"], datos["v"]
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if clave != self.clave or not isinstance(valores, list) or len(valores) != len(self.campos):
+            raise NotFound(self.invalid_cursor_message)
+        return valores
+
+    def encode_cursor(self, obj):
+        valores = [self._serializar(self._valor(obj, c.lstrip("-"))) for c in self.campos]
+        datos = json.dumps({"o": self.clave, "v": valores}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(datos.encode("utf-8")).decode("ascii")
+
+    def _valor(self, obj, campo):
+        for parte in campo.split("__"):
+            obj = getattr(obj, parte)
+        return obj
+
+    def _serializar(self, valor):
+        if isinstance(valor, (datetime, date)):
+            return valor.isoformat()
+        if isinstance(valor, Decimal):
+            return str(valor)
+        return valor
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        url = replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+        return remove_query_param(url, "page")
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ("next", self.get_next_link()),
+            ("results", data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+
+class CatalogoCursorPagination(KeysetPagination):
+    # 'pk' y no 'id': el catálogo se lee de PropiedadCatalogo (pk = propiedad)
+    ordenes = {
+        "-fecha_registro": ("-fecha_registro", "-pk"),
+        "precio": ("precio", "pk"),
+        "-precio": ("-precio", "-pk"),
+    }
+
+
+class NotificacionCursorPagination(KeysetPagination):
+    ordenes = {"-created_at": ("-created_at", "-id")}
+
+
+class ReservaCursorPagination(KeysetPagination):
+    ordenes = {"-fecha": ("-fecha", "-id")}
+
+
+class PagoCursorPagination(KeysetPagination):
+    ordenes = {"-fecha": ("-fecha", "-id")}
+
+
+class CursorOpcionalMixin:
+    """
+    Mantiene la paginación por páginas por defecto y cambia a cursor cuando
+    el request trae ?cursor=... o ?paginacion=cursor.
+    """
+    cursor_pagination_class = None
+
+    def usa_cursor(self):
+        params = self.request.query_params
+        return bool(params.get("cursor")) or params.get("paginacion") == "cursor"
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator"):
+            if self.cursor_pagination_class is not None and self.usa_cursor():
+                self._paginator = self.cursor_pagination_class()
+            elif self.pagination_class is None:
+                self._paginator = None
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
@@ -0,0 +1,147 @@
+import re
+import unicodedata
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Q, Sum, IntegerField, OuterRef, Subquery
+
+# Largo máximo de un término (coincide con PropiedadTermino.termino)
+MAX_LARGO_TERMINO = 64
+
+# Peso de cada campo en la relevancia
+PESOS_CAMPOS = {
+    "titulo": 3,
+    "ciudad": 2,
+    "descripcion": 1,
+}
+
+STOPWORDS = {
+    "a", "al", "con", "de", "del", "el", "en", "la", "las", "lo", "los",
+    "o", "para", "por", "se", "sin", "su", "sus", "un", "una", "y",
+}
+
+TOKEN_REGEX = re.compile(r"[a-z0-9]+")
+
+def normalizar_texto(texto: str) -> str:
+    # minúsculas y sin tildes: "Curicó" -> "curico", "Ñuñoa" -> "nunoa"
+    texto = unicodedata.normalize("NFKD", texto or "").lower()
+    return "".join(c for c in texto if not unicodedata.combining(c))
+
+
+def tokenizar(texto: str) -> list[str]:
+    return [
+        t[:MAX_LARGO_TERMINO]
+        for t in TOKEN_REGEX.findall(normalizar_texto(texto))
+        if len(t) > 1 and t not in STOPWORDS
+    ]
+
+
+def terminos_de(titulo="", descripcion="", ciudad="") -> dict[str, int]:
+    """
+    Retorna {termino: peso} sumando el peso del campo por cada aparición.
+    """
+    pesos = Counter()
+    for campo, texto in (("titulo", titulo), ("ciudad", ciudad), ("descripcion", descripcion)):
+        for t in tokenizar(texto):
+            pesos[t] += PESOS_CAMPOS[campo]
+    return dict(pesos)
+
+
+def _filas_indice(propiedad):
+    from .models import PropiedadTermino
+
+    terminos = terminos_de(propiedad.titulo, propiedad.descripcion, propiedad.ciudad)
+    return [
+        PropiedadTermino(propiedad_id=propiedad.pk, termino=t, peso=p)
+        for t, p in terminos.items()
+    ]
+
+
+def indexar_propiedad(propiedad) -> None:
+    from .models import PropiedadTermino
+
+    with transaction.atomic():
+        PropiedadTermino.objects.filter(propiedad_id=propiedad.pk).delete()
+        PropiedadTermino.objects.bulk_create(_filas_indice(propiedad))
+
+
+def reindexar(queryset, batch_size=1000) -> int:
+    """
+    Reconstruye el índice para un queryset de Propiedad por lotes.
+    """
+    total = 0
+    qs = queryset.only("id", "titulo", "descripcion", "ciudad").order_by("pk")
+    lote = []
+    for p in qs.iterator(chunk_size=batch_size):
+        lote.append(p)
+        if len(lote) >= batch_size:
+            total += _reindexar_lote(lote)
+            lote = []
+    if lote:
+        total += _reindexar_lote(lote)
+    return total
+
+
+def _reindexar_lote(propiedades) -> int:
+    from .models import PropiedadTermino
+
+    with transaction.atomic():
+        PropiedadTermino.objects.filter(propiedad_id__in=[p.pk for p in propiedades]).delete()
+        filas = [f for p in propiedades for f in _filas_indice(p)]
+        PropiedadTermino.objects.bulk_create(filas, batch_size=1000)
+    return len(propiedades)
+
+
+def _prefijo(t: str) -> Q:
+    # LIKE 't%' (MySQL lo resuelve con el índice de termino). No un rango
+    # [t, t + "{"): depende del orden de la collation y en utf8mb4_0900_ai_ci
+    # "{" va antes que las letras. Términos y tokens ya vienen en minúsculas
+    # y [a-z0-9], así que istartswith (LIKE sin BINARY, que sí usa el índice
+    # con la collation de la columna) equivale a startswith.
+    return Q(termino__istartswith=t)
+
+
+def consulta_busqueda(texto: str):
+    """
+    Arma la búsqueda sobre el índice invertido. Retorna None si el texto no
+    deja términos útiles; si no, (coincidencias, relevancia):
+      - coincidencias: condición (Q) sobre Propiedad que exige contener
+        todos los términos buscados (como prefijo)
+      - relevancia: expresión correlacionada con la suma de pesos
+    """
+    from .models import PropiedadTermino
+
+    tokens = list(dict.fromkeys(tokenizar(texto)))
+    if not tokens:
+        return None
+
+    cualquiera = Q()
+    for t in tokens:
+        cualquiera |= _prefijo(t)
+
+    # cada token es un rango sobre el índice (termino, propiedad); se exigen todos
+    coincidencias = Q()
+    for t in tokens:
+        coincidencias &= Q(pk__in=PropiedadTermino.objects.filter(_prefijo(t)).values("propiedad_id"))
+
+    puntaje = (
+        PropiedadTermino.objects
+        .filter(cualquiera, propiedad_id=OuterRef("pk"))
+        .values("propiedad_id")
+        .annotate(total=Sum("peso"))
+        .values("total")
+    )
+
+    return coincidencias, Subquery(puntaje, output_field=IntegerField())
+
+
+def buscar(queryset, texto: str):
+    """
+    Filtra un queryset de Propiedad con consulta_busqueda y anota 'relevancia'.
+    """
+    consulta = consulta_busqueda(texto)
+    if consulta is None:
+        return queryset.none()
+
+    coincidencias, relevancia = consulta
+    return queryset.filter(coincidencias).annotate(relevancia=relevancia)
@@ -4,9 +4,13 @@ from .validators import *
 from .config import *
 from django.utils import timezone
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
 from datetime import timedelta
+import os
+from django.conf import settings
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from .campos import CamposDinamicosMixin, seleccionar
+from . import calendario, estados
+from .descargas import url_descarga
 class RegionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Region
@@ -56,27 +60,11 @@ class PropietarioSerializer(serializers.ModelSerializer):
 
 # --- Helper para calcular el estado de la propiedad --- #
 def calcular_estado_propiedad(obj: Propiedad) -> str:
-    if obj.estado in ("arrendada", "vendida"):
-        return obj.estado
-
-    now = timezone.now()
-
-    contrato = (
-        Contrato.objects
-        .filter(propiedad=obj, vigente=True)
-        .order_by("-fecha_firma", "-id")
-        .first()
-    )
-    if contrato:
-        return "vendida" if contrato.tipo == "venta" else "arrendada"
-
-    tiene_reserva_vigente = Reserva.objects.filter(
-        propiedad=obj,
-        activa=True,
-        expires_at__gt=now,
-    ).exists()
-
-    return "reservada" if tiene_reserva_vigente else "disponible"
+    # Si el queryset viene de con_estado_calculado() no hay que consultar nada
+    anotado = getattr(obj, "estado_calculado", None)
+    if anotado is not None:
+        return anotado
+    return estados.estado_actual(obj)
 
 # PROPIEDAD SERIALIZERS
 class MiniPropiedadSerializer(serializers.ModelSerializer):
@@ -89,9 +77,11 @@ class MiniPropiedadSerializer(serializers.ModelSerializer):
     def get_estado(self, obj):
         return calcular_estado_propiedad(obj)
     
-class PropiedadSerializer(serializers.ModelSerializer):
+class PropiedadSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     estado = serializers.SerializerMethodField()
 
+    campos_dependencias = {"estado": ("estado",)}
+
     class Meta:
         model = Propiedad
         fields = "__all__"
@@ -108,10 +98,15 @@ class PropiedadSerializer(serializers.ModelSerializer):
 
         return attrs
         
-class PropiedadConFotosSerializer(serializers.ModelSerializer):
+class PropiedadConFotosSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     fotos = serializers.SerializerMethodField()
+    foto_principal = serializers.SerializerMethodField()
     estado = serializers.SerializerMethodField() 
 
+    # para ?fields= / ?omit= (ver campos.py)
+    campos_dependencias = {"estado": ("estado",), "fotos": (), "foto_principal": ()}
+    campos_prefetch = ("fotos", "foto_principal")
+
     class Meta:
         model = Propiedad
         fields = "__all__"
@@ -119,34 +114,111 @@ class PropiedadConFotosSerializer(serializers.ModelSerializer):
     def get_estado(self, obj):
         return calcular_estado_propiedad(obj)
 
+    def _tamano_foto(self):
+        # tarjetas (listado / catálogo) en medium; la vista de detalle pide large
+        return self.context.get("tamano_foto", "medium")
+
     def get_fotos(self, obj):
+        # .all() sin order_by para aprovechar con_fotos(); el orden lo da la precarga
+        tamano = self._tamano_foto()
         return [
             {
                 "id": f.id,
-                "url": f.foto.url if f.foto else None,
+                "url": f.url_derivado(tamano),
+                "webp": f.url_derivado(tamano, "webp"),
+                "miniatura": f.url_derivado("small"),
+                "original": f.foto.url if f.foto else None,
                 "orden": f.orden,
                 "principal": f.principal,
             }
-            for f in obj.fotos.all().order_by("orden")
+            for f in obj.fotos.all()
         ]
 
+    def get_foto_principal(self, obj):
+        fp = obj.registro_foto_principal
+        return fp.url_derivado(self._tamano_foto()) if fp else None
+
+
+class PropiedadCatalogoSerializer(serializers.BaseSerializer):
+    """
+    Misma salida que PropiedadConFotosSerializer, leída de PropiedadCatalogo
+    (la tarjeta ya viene serializada en 'datos').
+
+    Respeta ?fields= / ?omit=; si todo lo pedido son columnas de la tabla
+    (tarjeta mínima) se arma desde ellas y 'datos' no se lee.
+    """
+    COLUMNAS = {
+        "id": serializers.IntegerField(source="propiedad_id"),
+        "titulo": serializers.CharField(),
+        "ciudad": serializers.CharField(),
+        "tipo": serializers.CharField(),
+        "dormitorios": serializers.IntegerField(),
+        "baos": serializers.IntegerField(),
+        "metros2": serializers.DecimalField(max_digits=8, decimal_places=2),
+        "precio": serializers.DecimalField(max_digits=12, decimal_places=2),
+        "fecha_registro": serializers.DateTimeField(),
+        "aprobada": serializers.BooleanField(),
+        "foto_principal": serializers.CharField(),
+    }
+
+    @classmethod
+    def solo_columnas(cls, incluir):
+        return incluir is not None and incluir <= set(cls.COLUMNAS) | {"estado"}
+
+    def _columna(self, obj, nombre):
+        if nombre == "foto_principal":
+            return obj.foto_principal or None
+        campo = self.COLUMNAS[nombre]
+        return campo.to_representation(getattr(obj, campo.source or nombre))
+
+    def to_representation(self, obj):
+        incluir, omitir = self.context.get("campos") or (None, set())
+        estado = getattr(obj, "estado_actual", obj.estado)
+
+        if self.solo_columnas(incluir):
+            return {
+                n: estado if n == "estado" else self._columna(obj, n)
+                for n in seleccionar([*self.COLUMNAS, "estado"], incluir, omitir)
+            }
+
+        data = {**obj.datos, "estado": estado}
+        if incluir is None and not omitir:
+            return data
+        return {n: data[n] for n in seleccionar(data, incluir, omitir)}
+
 
 class PropiedadFotoSerializer(serializers.ModelSerializer):
     url = serializers.SerializerMethodField()
+    derivados = serializers.SerializerMethodField()
 
     class Meta:
         model = PropiedadFoto
-        fields = ("id", "propiedad", "foto", "url", "orden", "principal")
-        read_only_fields = ("id", "url")
+        fields = ("id", "propiedad", "foto", "url", "derivados", "orden", "principal")
+        read_only_fields = ("id", "url", "derivados")
 
     def get_url(self, obj):
         return obj.foto.url if obj.foto else None
 
+    def get_derivados(self, obj):
+        # vacío mientras el pool no los genera
+        if not obj.foto or (obj.derivados or {}).get("origen") != obj.foto.name:
+            return {}
+        return {
+            tamano: {formato: obj.url_derivado(tamano, formato) for formato in ("jpeg", "webp")}
+            for tamano in TAMANOS_FOTO
+        }
+
 
 class PropiedadDocumentoSerializer(serializers.ModelSerializer):
+    archivo_url = serializers.SerializerMethodField(read_only=True)
+
     class Meta:
         model = PropiedadDocumento
         fields = "__all__"
+        extra_kwargs = {"archivo": {"write_only": True}}
+
+    def get_archivo_url(self, obj):
+        return url_descarga(self.context.get("request"), "propiedad-documento", obj)
 
 class InteresadoSerializer(serializers.ModelSerializer):
     nombre_completo = serializers.CharField(read_only=True)
@@ -215,7 +287,7 @@ class VisitaSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(f"La fecha debe estar entre hoy y {VENTANA_FUTURA_MAX_DIAS} días en el futuro.")
         if fecha.weekday() > 4:
             raise serializers.ValidationError("Las visitas solo se pueden agendar de lunes a viernes.")
-        if Feriado.objects.filter(fecha=fecha).exists():
+        if calendario.es_feriado(fecha):
             raise serializers.ValidationError("No se puede agendar en días feriados.")
         if hora not in INTERVALO_PERMITIDOS:
             raise serializers.ValidationError("La hora debe ser un slot válido: 09–13 o 16–18 (en punto).")
@@ -267,11 +339,7 @@ class PagoSerializer(serializers.ModelSerializer):
         ]
 
     def get_comprobante_url(self, obj):
-        request = self.context.get('request')
-        if obj.comprobante:
-            url = obj.comprobante.url
-            return request.build_absolute_uri(url) if request else url
-        return None
+        return url_descarga(self.context.get("request"), "pago", obj, "comprobante")
 
     def get_propiedad(self, obj):
         p = obj.contrato.propiedad
@@ -306,13 +374,10 @@ class CuotaContratoSerializer(serializers.ModelSerializer):
             "comprobante_url",  
         ]
         read_only_fields = ["id", "pagada", "pago", "contrato_id", "comprobante_url"]
+        extra_kwargs = {"comprobante": {"write_only": True}}
 
     def get_comprobante_url(self, obj):
-        if obj.comprobante:
-            request = self.context.get("request")
-            url = obj.comprobante.url
-            return request.build_absolute_uri(url) if request else url
-        return None
+        return url_descarga(self.context.get("request"), "cuota", obj, "comprobante")
     
     
 class PagarCuotaSerializer(serializers.Serializer):
@@ -408,7 +473,7 @@ class SolicitudClienteSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = SolicitudCliente
-        fields = "__all__"
+        exclude = ("ciudad_clave",)
         read_only_fields = ("id", "created_at", "interesado")
 
 
@@ -457,17 +522,14 @@ class ContratoSerializer(serializers.ModelSerializer):
             "ultima_cuota_pagada",
             "cuotas_pendientes_count",
         ]
+        extra_kwargs = {"archivo_pdf": {"write_only": True}}
 
     # ---------------- getters ----------------
     def get_tipo_display(self, obj):
         return obj.get_tipo_display() if obj.tipo else ""
 
     def get_archivo_pdf_url(self, obj):
-        request = self.context.get("request")
-        if obj.archivo_pdf:
-            url = obj.archivo_pdf.url
-            return request.build_absolute_uri(url) if request else url
-        return None
+        return url_descarga(self.context.get("request"), "contrato", obj, "archivo_pdf")
 
     def get_propiedad(self, obj):
         p = getattr(obj, "propiedad", None)
@@ -494,27 +556,25 @@ class ContratoSerializer(serializers.ModelSerializer):
         }
 
    
+    # Todo sale del libro del contrato (ver libro.py); con con_libro() el
+    # listado no hace consultas por contrato
     def get_total_pagos(self, obj):
-        return obj.pagos.aggregate(total=Sum("monto"))["total"] or 0
+        return obj.total_pagado
 
     def get_saldo(self, obj):
         if obj.tipo == "venta":
-            total_pagos = obj.pagos.aggregate(total=Sum("monto"))["total"] or 0
-            return max(obj.precio_pactado - total_pagos, 0)
+            return max(obj.precio_pactado - obj.total_pagado, 0)
 
         # arriendo: suma de cuotas pendientes
-        total_pendiente = obj.cuotas.filter(pagada=False).aggregate(total=Sum("monto"))["total"] or 0
-        return total_pendiente
-
-
+        return obj.monto_pendiente
 
     def get_cuotas_pendientes_count(self, obj):
-        return obj.cuotas.filter(pagada=False).count()
+        return obj.cuotas_pendientes
 
     def get_proxima_cuota(self, obj):
         if obj.tipo != "arriendo":
             return None
-        cuota = obj.cuotas.filter(pagada=False).order_by("vencimiento").first()
+        cuota = obj.proxima_cuota
         if not cuota:
             return None
         return {
@@ -527,7 +587,7 @@ class ContratoSerializer(serializers.ModelSerializer):
     def get_ultima_cuota_pagada(self, obj):
         if obj.tipo != "arriendo":
             return None
-        cuota = obj.cuotas.filter(pagada=True).order_by("-vencimiento").first()
+        cuota = obj.ultima_cuota_pagada
         if not cuota:
             return None
         return {
@@ -577,6 +637,7 @@ class ContratoWriteSerializer(serializers.ModelSerializer):
             "vigente",
             "archivo_pdf",
         )
+        extra_kwargs = {"archivo_pdf": {"write_only": True}}
 
     def validate(self, attrs):
         # propiedad puede venir o no en PATCH
@@ -601,6 +662,43 @@ class ContratoWriteSerializer(serializers.ModelSerializer):
         return attrs
 
 # ----------------- DOCUMENTOS DE CONTRATO -----------------
+class SubidaFragmentadaSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SubidaFragmentada
+        fields = (
+            "id",
+            "destino",
+            "objeto_id",
+            "tipo",
+            "nombre",
+            "nombre_archivo",
+            "tamano_total",
+            "offset",
+            "estado",
+            "documento_id",
+            "created_at",
+        )
+        read_only_fields = ("id", "offset", "estado", "documento_id", "created_at")
+
+    def validate_nombre_archivo(self, value):
+        nombre = os.path.basename(value.replace("\\", "/")).strip()
+        if not nombre:
+            raise serializers.ValidationError("Nombre de archivo inválido.")
+        return nombre
+
+    def validate_tamano_total(self, value):
+        maximo = settings.SUBIDA_TAMANO_MAX_MB
+        if value <= 0 or value > maximo * 1024 * 1024:
+            raise serializers.ValidationError(f"El archivo debe pesar entre 1 byte y {maximo} MB.")
+        return value
+
+    def validate(self, attrs):
+        modelo = ContratoDocumento if attrs["destino"] == "contrato_documento" else PropiedadDocumento
+        if attrs.get("tipo", "otro") not in {t for t, _ in modelo.TIPOS}:
+            raise serializers.ValidationError({"tipo": "Tipo de documento inválido."})
+        return attrs
+
+
 class ContratoDocumentoSerializer(serializers.ModelSerializer):
     archivo_url = serializers.SerializerMethodField(read_only=True)
     subido_por_username = serializers.SerializerMethodField(read_only=True)
@@ -619,18 +717,10 @@ class ContratoDocumentoSerializer(serializers.ModelSerializer):
             "subido_por_username",
         ]
         read_only_fields = ["id", "created_at", "subido_por", "subido_por_username"]
+        extra_kwargs = {"archivo": {"write_only": True}}
 
     def get_archivo_url(self, obj):
-        if not obj.archivo:
-            return None
-
-        request = self.context.get("request")
-        url = obj.archivo.url 
-
-        if request:
-            return request.build_absolute_uri(url) 
-
-        return f"http://127.0.0.1:8000{url}"
+        return url_descarga(self.context.get("request"), "contratos-documentos", obj)
 
     def get_subido_por_username(self, obj):
         return getattr(obj.subido_por, "username", None)
@@ -1,4 +1,5 @@
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_save, pre_save, post_delete, post_migrate
+from django.db import DatabaseError
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 from django.utils import timezone
@@ -7,8 +8,16 @@ from decimal import Decimal, InvalidOperation
 
 
 from .models import (
-    Propiedad, Reserva, Contrato, Pago, Notificacion, Interesado
+    Propiedad, PropiedadFoto, PropiedadCatalogo, Reserva, Contrato, Pago, Notificacion, Interesado,
+    PropiedadDocumento, ContratoDocumento, CuotaContrato, Feriado, Visita,
 )
+from .search import indexar_propiedad
+from .catalogo import refrescar_catalogo, reconstruir_catalogo
+from .similares import actualizar_propiedad, quitar_propiedad
+from .imagenes import borrar_derivados, encolar_derivados
+from . import estados
+from .calendario import invalidar_feriados
+from . import disponibilidad, libro
 
 User = get_user_model()
 
@@ -68,6 +77,15 @@ def notificar_propiedad_creada(sender, instance: Propiedad, created, **kwargs):
             tipo="SISTEMA",
         )
 
+@receiver(post_save, sender=Propiedad)
+def indexar_busqueda_propiedad(sender, instance: Propiedad, created, update_fields=None, **kwargs):
+    """
+    Mantiene el índice de búsqueda (PropiedadTermino) al guardar la propiedad.
+    """
+    if update_fields is not None and not {"titulo", "descripcion", "ciudad"} & set(update_fields):
+        return
+    indexar_propiedad(instance)
+
 # --------- RESERVA ---------
 @receiver(post_save, sender=Reserva)
 def notificar_reserva_creada(sender, instance: Reserva, created, **kwargs):
@@ -97,11 +115,10 @@ def contrato_post_save(sender, instance: Contrato, created, **kwargs):
         return
 
     # 1) Cambiar estado final de la propiedad
-    nuevo_estado = "vendida" if instance.tipo == "venta" else "arrendada"
-    Propiedad.objects.filter(id=instance.propiedad_id).update(estado=nuevo_estado)
+    now = timezone.now()
+    estados.aplicar("vender" if instance.tipo == "venta" else "arrendar", [instance.propiedad_id], now=now)
 
     # 2) Desactivar reservas activas vigentes
-    now = timezone.now()
     Reserva.objects.filter(
         propiedad_id=instance.propiedad_id,
         activa=True,
@@ -148,4 +165,171 @@ def notificar_pago_creado(sender, instance: Pago, created, **kwargs):
     msg_p = f"Se registró un pago de ${monto_txt} en el contrato de '{prop.titulo}'."
 
     _notificar(cliente_user, titulo, msg_c, tipo="PAGO")
-    _notificar(propietario_user, titulo, msg_p, tipo="PAGO")
\ No newline at end of file
+    _notificar(propietario_user, titulo, msg_p, tipo="PAGO")
+
+
+# --------- LIBRO DE CONTRATOS ---------
+# post_save / post_delete también corren en borrados por queryset (admin,
+# "eliminar seleccionados") y en cascada; .update() y bulk_create no:
+# quien los use recalcula a mano (ver cuotas.generar) o conciliar_libro.
+@receiver(pre_save, sender=Pago)
+@receiver(pre_save, sender=CuotaContrato)
+def recordar_contrato_libro(sender, instance, update_fields=None, **kwargs):
+    instance._contrato_anterior = None
+    if instance.pk and (update_fields is None or "contrato" in update_fields):
+        instance._contrato_anterior = (
+            sender.objects.filter(pk=instance.pk).values_list("contrato_id", flat=True).first()
+        )
+
+
+@receiver([post_save, post_delete], sender=Pago)
+@receiver([post_save, post_delete], sender=CuotaContrato)
+def actualizar_libro_contrato(sender, instance, **kwargs):
+    libro.recalcular([instance.contrato_id, getattr(instance, "_contrato_anterior", None)])
+
+
+# --------- VISITAS (índice de disponibilidad) ---------
+@receiver(pre_save, sender=Visita)
+def recordar_slot_visita(sender, instance: Visita, **kwargs):
+    instance._slot_anterior = None
+    if instance.pk:
+        instance._slot_anterior = (
+            Visita.objects.filter(pk=instance.pk).values_list("propiedad_id", "fecha").first()
+        )
+
+
+@receiver(post_save, sender=Visita)
+def actualizar_disponibilidad_visita(sender, instance: Visita, **kwargs):
+    pares = [(instance.propiedad_id, instance.fecha)]
+    if getattr(instance, "_slot_anterior", None):
+        pares.append(instance._slot_anterior)
+    disponibilidad.recalcular(pares)
+
+
+@receiver(post_delete, sender=Visita)
+def liberar_disponibilidad_visita(sender, instance: Visita, **kwargs):
+    disponibilidad.recalcular([(instance.propiedad_id, instance.fecha)])
+
+
+# --------- FERIADOS (calendario en memoria) ---------
+@receiver([post_save, post_delete], sender=Feriado)
+def invalidar_calendario(sender, instance: Feriado, **kwargs):
+    # el índice de disponibilidad no guarda feriados: los bloquea al
+    # consultar con este mismo calendario
+    invalidar_feriados()
+
+
+# --------- PROPIEDAD.updated_at ---------
+@receiver([post_save, post_delete], sender=PropiedadFoto)
+@receiver([post_save, post_delete], sender=Reserva)
+@receiver([post_save, post_delete], sender=Contrato)
+def tocar_propiedad(sender, instance, **kwargs):
+    """
+    Fotos, reservas y contratos cambian lo que se muestra de la propiedad:
+    se actualiza su updated_at (validador de ETag / Last-Modified).
+    """
+    Propiedad.objects.filter(pk=instance.propiedad_id).tocar()
+
+
+# --------- FOTOS (derivados) ---------
+@receiver(post_save, sender=PropiedadFoto)
+def generar_derivados_foto(sender, instance: PropiedadFoto, **kwargs):
+    # solo si cambió el archivo (cambiar orden / principal no los regenera)
+    if instance.foto and (instance.derivados or {}).get("origen") != instance.foto.name:
+        encolar_derivados(instance.pk)
+
+
+@receiver(post_delete, sender=PropiedadFoto)
+def borrar_derivados_foto(sender, instance: PropiedadFoto, **kwargs):
+    derivados = instance.derivados
+    transaction.on_commit(lambda: borrar_derivados(derivados))
+
+
+# --------- ARCHIVOS DEDUPLICADOS (ver storage.py) ---------
+ARCHIVOS_DEDUPLICADOS = {
+    PropiedadFoto: ("foto",),
+    PropiedadDocumento: ("archivo",),
+    ContratoDocumento: ("archivo",),
+    Pago: ("comprobante",),
+    CuotaContrato: ("comprobante",),
+}
+
+
+def _liberar(campo, nombre):
+    # al confirmar: si la transacción se revierte la referencia sigue en uso
+    storage = campo.storage
+    transaction.on_commit(lambda: storage.delete(nombre))
+
+
+def _recordar_archivos(sender, instance, **kwargs):
+    campos = ARCHIVOS_DEDUPLICADOS[sender]
+    instance._archivos_anteriores = {}
+    if instance.pk:
+        anteriores = sender.objects.filter(pk=instance.pk).values(*campos).first() or {}
+        instance._archivos_anteriores = anteriores
+
+
+def _liberar_reemplazados(sender, instance, **kwargs):
+    for nombre_campo, anterior in getattr(instance, "_archivos_anteriores", {}).items():
+        actual = getattr(instance, nombre_campo)
+        if anterior and anterior != actual.name:
+            _liberar(actual.field, anterior)
+
+
+def _liberar_al_borrar(sender, instance, **kwargs):
+    for nombre_campo in ARCHIVOS_DEDUPLICADOS[sender]:
+        archivo = getattr(instance, nombre_campo)
+        if archivo:
+            _liberar(archivo.field, archivo.name)
+
+
+for _modelo in ARCHIVOS_DEDUPLICADOS:
+    pre_save.connect(_recordar_archivos, sender=_modelo, dispatch_uid=f"recordar_archivos_{_modelo.__name__}")
+    post_save.connect(_liberar_reemplazados, sender=_modelo, dispatch_uid=f"liberar_reemplazados_{_modelo.__name__}")
+    post_delete.connect(_liberar_al_borrar, sender=_modelo, dispatch_uid=f"liberar_al_borrar_{_modelo.__name__}")
+
+
+# --------- CATÁLOGO (modelo de lectura + cache) ---------
+@receiver([post_save, post_delete], sender=Propiedad)
+def refrescar_catalogo_propiedad(sender, instance: Propiedad, **kwargs):
+    refrescar_catalogo([instance.pk])
+
+
+@receiver(post_save, sender=Propiedad)
+def actualizar_similares(sender, instance: Propiedad, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: actualizar_propiedad(pk))
+
+
+@receiver(post_delete, sender=Propiedad)
+def quitar_de_similares(sender, instance: Propiedad, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: quitar_propiedad(pk))
+
+
+@receiver([post_save, post_delete], sender=PropiedadFoto)
+@receiver([post_save, post_delete], sender=Reserva)
+@receiver([post_save, post_delete], sender=Contrato)
+def refrescar_catalogo_relacionado(sender, instance, **kwargs):
+    """
+    Fotos, reservas y contratos cambian la tarjeta (foto principal / estado)
+    de su propiedad.
+    """
+    refrescar_catalogo([instance.propiedad_id])
+
+
+@receiver(post_migrate)
+def poblar_catalogo_inicial(sender, app_config=None, **kwargs):
+    """
+    Primer migrate con PropiedadCatalogo: llena el modelo de lectura con las
+    propiedades existentes (después se mantiene solo; ver reconstruir_catalogo).
+    """
+    if app_config is None or app_config.label != "inmobiliaria":
+        return
+    try:
+        if PropiedadCatalogo.objects.exists() or not Propiedad.objects.exists():
+            return
+    except DatabaseError:
+        # migrate hacia atrás: la tabla aún no existe
+        return
+    reconstruir_catalogo()
@@ -0,0 +1,235 @@
+import math
+import threading
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+
+from .search import normalizar_texto
+
+# Columnas numéricas del vector (estandarizadas): log precio, log m2, dormitorios, baños
+PESOS = np.array([3.0, 2.0, 1.0, 1.0])
+_RAIZ_PESOS = np.sqrt(PESOS)
+# Penalización por distinto tipo / ciudad (equivale a un one-hot con peso)
+PESO_TIPO = 4.0
+PESO_CIUDAD = 2.0
+
+CAMPOS = ("id", "precio", "metros2", "dormitorios", "baos", "tipo", "ciudad")
+
+# Traslape al buscar cambios por updated_at: cubre transacciones que
+# confirmaron después de la última revisión con un updated_at anterior.
+MARGEN_REFRESCO = timedelta(seconds=60)
+
+
+def _crudo(fila):
+    return (
+        math.log1p(float(fila["precio"] or 0)),
+        math.log1p(float(fila["metros2"] or 0)),
+        float(fila["dormitorios"] or 0),
+        float(fila["baos"] or 0),
+    )
+
+
+class IndiceSimilares:
+    """
+    Matriz NumPy con el vector de cada propiedad aprobada. Las consultas
+    top-k son una pasada vectorizada + argpartition; altas, cambios y bajas
+    se aplican fila a fila sin reconstruir.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.n = 0
+        self.ids = np.empty(0, dtype=np.int64)
+        self.X = np.empty((0, len(PESOS)))
+        self.tipo = np.empty(0, dtype=np.int32)
+        self.ciudad = np.empty(0, dtype=np.int32)
+        self.pos = {}
+        self.codigos_tipo = {}
+        self.codigos_ciudad = {}
+        self.media = np.zeros(len(PESOS))
+        self.escala = np.ones(len(PESOS))
+        self.marca = None      # mayor updated_at aplicado
+        self.revisado = 0.0    # time.monotonic() de la última revisión
+
+    # ---- construcción ----
+    def cargar(self, filas):
+        filas = list(filas)
+        with self._lock:
+            crudo = np.array([_crudo(f) for f in filas], dtype=float).reshape(-1, len(PESOS))
+            if len(filas):
+                self.media = crudo.mean(axis=0)
+                escala = crudo.std(axis=0)
+                self.escala = np.where(escala > 0, escala, 1.0)
+            self.n = len(filas)
+            self.ids = np.array([f["id"] for f in filas], dtype=np.int64)
+            self.X = (crudo - self.media) / self.escala * _RAIZ_PESOS
+            self.tipo = np.array([self._codigo(self.codigos_tipo, f["tipo"]) for f in filas], dtype=np.int32)
+            self.ciudad = np.array([self._codigo(self.codigos_ciudad, f["ciudad"]) for f in filas], dtype=np.int32)
+            self.pos = {int(i): p for p, i in enumerate(self.ids)}
+
+    def _codigo(self, codigos, valor, crear=True):
+        clave = normalizar_texto((valor or "").strip())
+        if clave not in codigos:
+            if not crear:
+                return -1
+            codigos[clave] = len(codigos)
+        return codigos[clave]
+
+    def _vector(self, fila):
+        # los pesos van dentro del vector: la distancia queda en una resta y una suma
+        return (np.array(_crudo(fila)) - self.media) / self.escala * _RAIZ_PESOS
+
+    # ---- cambios incrementales ----
+    def _crecer(self):
+        capacidad = max(16, len(self.ids) * 2)
+        self.ids = np.resize(self.ids, capacidad)
+        self.X = np.resize(self.X, (capacidad, len(PESOS)))
+        self.tipo = np.resize(self.tipo, capacidad)
+        self.ciudad = np.resize(self.ciudad, capacidad)
+
+    def poner(self, fila):
+        with self._lock:
+            p = self.pos.get(fila["id"])
+            if p is None:
+                if self.n == len(self.ids):
+                    self._crecer()
+                p = self.n
+                self.n += 1
+                self.pos[fila["id"]] = p
+            self.ids[p] = fila["id"]
+            self.X[p] = self._vector(fila)
+            self.tipo[p] = self._codigo(self.codigos_tipo, fila["tipo"])
+            self.ciudad[p] = self._codigo(self.codigos_ciudad, fila["ciudad"])
+
+    def quitar(self, propiedad_id):
+        # se mueve la última fila al hueco
+        with self._lock:
+            p = self.pos.pop(propiedad_id, None)
+            if p is None:
+                return
+            ultima = self.n - 1
+            if p != ultima:
+                self.ids[p] = self.ids[ultima]
+                self.X[p] = self.X[ultima]
+                self.tipo[p] = self.tipo[ultima]
+                self.ciudad[p] = self.ciudad[ultima]
+                self.pos[int(self.ids[p])] = p
+            self.n = ultima
+
+    def aplicar(self, filas):
+        marca = self.marca
+        for f in filas:
+            if f["aprobada"]:
+                self.poner(f)
+            else:
+                self.quitar(f["id"])
+            if marca is None or f["updated_at"] > marca:
+                marca = f["updated_at"]
+        self.marca = marca
+
+    # ---- consultas ----
+    def vecinos(self, fila, k=6, excluir=None):
+        """
+        Retorna [(id, distancia)] de las k propiedades más parecidas a 'fila'.
+        """
+        with self._lock:
+            n = self.n
+            if n == 0:
+                return []
+            x = self._vector(fila)
+            t = self._codigo(self.codigos_tipo, fila["tipo"], crear=False)
+            c = self._codigo(self.codigos_ciudad, fila["ciudad"], crear=False)
+
+            dif = self.X[:n] - x
+            d = np.einsum("ij,ij->i", dif, dif)
+            d += PESO_TIPO * (self.tipo[:n] != t)
+            d += PESO_CIUDAD * (self.ciudad[:n] != c)
+
+            if excluir is not None and excluir in self.pos:
+                d[self.pos[excluir]] = np.inf
+
+            k = min(k, n)
+            mejores = np.argpartition(d, k - 1)[:k]
+            mejores = mejores[np.argsort(d[mejores])]
+            return [(int(self.ids[i]), float(d[i])) for i in mejores if np.isfinite(d[i])]
+
+
+_indice = None
+_lock_indice = threading.Lock()
+
+
+def _filas_desde(qs):
+    return qs.values(*CAMPOS, "aprobada", "updated_at")
+
+
+def obtener_indice():
+    """
+    Índice del proceso; se construye completo la primera vez y luego solo
+    incorpora los cambios (por updated_at) cada SIMILARES_REFRESCO_SEG, para
+    recoger lo escrito por otros workers.
+    """
+    from .models import Propiedad
+
+    global _indice
+    with _lock_indice:
+        if _indice is None:
+            indice = IndiceSimilares()
+            filas = list(_filas_desde(Propiedad.objects.filter(aprobada=True)))
+            indice.cargar(filas)
+            indice.marca = max((f["updated_at"] for f in filas), default=None)
+            indice.revisado = time.monotonic()
+            _indice = indice
+            return _indice
+
+        intervalo = getattr(settings, "SIMILARES_REFRESCO_SEG", 5)
+        if time.monotonic() - _indice.revisado >= intervalo:
+            _indice.revisado = time.monotonic()
+            qs = Propiedad.objects.all()
+            if _indice.marca is not None:
+                qs = qs.filter(updated_at__gt=_indice.marca - MARGEN_REFRESCO)
+            _indice.aplicar(_filas_desde(qs).order_by("updated_at"))
+        return _indice
+
+
+def actualizar_propiedad(propiedad_id):
+    # solo si el índice ya existe en este proceso; si no, se carga completo al usarlo
+    from .models import Propiedad
+
+    if _indice is None:
+        return
+    fila = _filas_desde(Propiedad.objects.filter(pk=propiedad_id)).first()
+    if fila is None:
+        _indice.quitar(propiedad_id)
+    else:
+        _indice.aplicar([fila])
+
+
+def quitar_propiedad(propiedad_id):
+    if _indice is not None:
+        _indice.quitar(propiedad_id)
+
+
+def buscar_similares(propiedad, k=6):
+    """
+    Ids de las k propiedades aprobadas más parecidas (sin incluirla).
+
+    El refresco por updated_at no ve las filas borradas, y una baja hecha en
+    otro worker tarda hasta SIMILARES_REFRESCO_SEG en llegar: los candidatos
+    se contrastan con la base y los que ya no están aprobados salen del índice.
+    """
+    from .models import Propiedad
+
+    fila = {campo: getattr(propiedad, campo) for campo in CAMPOS}
+    indice = obtener_indice()
+    while True:
+        ids = [i for i, _ in indice.vecinos(fila, k=k, excluir=propiedad.pk)]
+        vigentes = set(
+            Propiedad.objects.filter(pk__in=ids, aprobada=True).values_list("pk", flat=True)
+        )
+        if len(vigentes) == len(ids):
+            return ids
+        for i in ids:
+            if i not in vigentes:
+                indice.quitar(i)
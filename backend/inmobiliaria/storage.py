@@ -0,0 +1,186 @@
+import errno
+import hashlib
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils._os import safe_join
+from django.utils.deconstruct import deconstructible
+from django.utils.functional import cached_property
+
+CARPETA_BLOBS = "blobs"
+
+# Rutas bajo MEDIA_ROOT que solo se entregan por descargas.py: los archivos
+# privados anteriores a blobs/ (comprobantes, documentos y contratos). Los
+# blobs privados ya no están en MEDIA_ROOT (ver PRIVADO_ROOT). El servidor
+# web no debe publicarlas en MEDIA_URL.
+PREFIJOS_PRIVADOS = ("contratos/", "pagos/", "propiedades/documentos/", f"{CARPETA_BLOBS}/privado/")
+
+
+def _mover(origen, destino) -> None:
+    try:
+        # mismo sistema de archivos: el reemplazo es atómico
+        os.replace(origen, destino)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        # BLOBS_TEMP_DIR en otro disco: copia completa junto al destino y
+        # reemplazo atómico desde ahí
+        parcial = f"{destino}.{os.getpid()}.parcial"
+        shutil.copyfile(origen, parcial)
+        os.replace(parcial, destino)
+        os.remove(origen)
+
+
+def nombre_blob(prefijo, digest, ext) -> str:
+    return f"{CARPETA_BLOBS}/{prefijo}/{digest[:2]}/{digest[2:4]}/{digest}{ext.lower()}"
+
+
+def sumar_referencia(nombre, digest, tamano) -> None:
+    """
+    +1 al Blob (lo crea si no existe). Deja la fila bloqueada hasta el fin
+    de la transacción: un delete() del mismo contenido espera.
+    """
+    from .models import Blob
+
+    if Blob.objects.filter(nombre=nombre).update(referencias=F("referencias") + 1):
+        return
+    try:
+        with transaction.atomic():
+            Blob.objects.create(nombre=nombre, digest=digest, tamano=tamano, referencias=1)
+    except IntegrityError:
+        # otra subida del mismo contenido creó la fila entremedio
+        Blob.objects.filter(nombre=nombre).update(referencias=F("referencias") + 1)
+
+
+@deconstructible
+class AlmacenamientoDeduplicado(FileSystemStorage):
+    """
+    Guarda cada archivo una sola vez, con nombre = sha256 del contenido
+    (calculado mientras se escribe). Subir el mismo PDF o foto en varias
+    propiedades / contratos agrega una referencia al Blob en vez de otra copia.
+
+    delete() resta una referencia y solo borra el archivo al llegar a 0.
+    Los archivos anteriores (fuera de blobs/) se siguen leyendo y borrando
+    como siempre.
+
+    Los blobs privados van en PRIVADO_ROOT, fuera de MEDIA_ROOT: el servidor
+    web no puede publicarlos; solo salen por descargas.py.
+    """
+
+    def __init__(self, prefijo="privado", **kwargs):
+        self.prefijo = prefijo
+        super().__init__(**kwargs)
+
+    @cached_property
+    def base_location(self):
+        if self.prefijo == "privado":
+            return self._value_or_setting(self._location, settings.PRIVADO_ROOT)
+        return super().base_location
+
+    def path(self, name):
+        if self.prefijo == "privado" and not self.es_blob(name):
+            # archivos anteriores a blobs/: siguen en MEDIA_ROOT
+            return safe_join(settings.MEDIA_ROOT, name)
+        return super().path(name)
+
+    def es_blob(self, name) -> bool:
+        return (name or "").replace("\\", "/").startswith(f"{CARPETA_BLOBS}/")
+
+    def _save(self, name, content):
+        # el contenido se escribe primero en BLOBS_TEMP_DIR, fuera de lo que
+        # sirve el servidor web: un archivo a medias no tiene URL
+        temporales = settings.BLOBS_TEMP_DIR
+        os.makedirs(temporales, exist_ok=True)
+
+        digest = hashlib.sha256()
+        tamano = 0
+        if hasattr(content, "seek"):
+            content.seek(0)
+        with tempfile.NamedTemporaryFile(dir=temporales, delete=False) as tmp:
+            try:
+                for bloque in content.chunks():
+                    digest.update(bloque)
+                    tmp.write(bloque)
+                    tamano += len(bloque)
+            except BaseException:
+                tmp.close()
+                os.remove(tmp.name)
+                raise
+        digest = digest.hexdigest()
+
+        nombre = nombre_blob(self.prefijo, digest, os.path.splitext(name)[1])
+        destino = self.path(nombre)
+        try:
+            with transaction.atomic():
+                # primero la referencia (con la fila bloqueada) y después el
+                # archivo: un borrado en curso del mismo blob termina antes
+                sumar_referencia(nombre, digest, tamano)
+                if not os.path.exists(destino):
+                    os.makedirs(os.path.dirname(destino), exist_ok=True)
+                    _mover(tmp.name, destino)
+                    if self.file_permissions_mode is not None:
+                        os.chmod(destino, self.file_permissions_mode)
+        finally:
+            # ya existía, o falló la referencia / el movimiento
+            if os.path.exists(tmp.name):
+                os.remove(tmp.name)
+        return nombre
+
+    def get_available_name(self, name, max_length=None):
+        # el nombre final lo decide _save() según el contenido
+        return name
+
+    def delete(self, name):
+        if not self.es_blob(name):
+            return super().delete(name)
+
+        from .models import Blob
+
+        with transaction.atomic():
+            blob = Blob.objects.select_for_update().filter(nombre=name).first()
+            if blob is None:
+                return
+            if blob.referencias > 0:
+                blob.referencias -= 1
+                Blob.objects.filter(pk=blob.pk).update(referencias=F("referencias") - 1)
+            if blob.referencias == 0:
+                # el archivo se borra recién confirmado el 0 (un rollback
+                # devuelve la referencia)
+                transaction.on_commit(lambda: self._borrar_sin_referencias(name))
+
+    def _borrar_sin_referencias(self, name):
+        from .models import Blob
+
+        with transaction.atomic():
+            borrados, _ = Blob.objects.select_for_update().filter(nombre=name, referencias=0).delete()
+            if borrados:
+                # con la fila bloqueada: una subida del mismo contenido espera
+                # y vuelve a crear fila y archivo
+                super().delete(name)
+
+
+_publico = AlmacenamientoDeduplicado(prefijo="publico")
+_privado = AlmacenamientoDeduplicado(prefijo="privado")
+
+
+# Callables para storage= en los modelos (las migraciones guardan la ruta,
+# no la instancia). Fotos: públicas; documentos y comprobantes: privados
+# (se entregan por descargas.py).
+def almacenamiento_publico():
+    return _publico
+
+
+def almacenamiento_privado():
+    return _privado
+
+
+def almacenamiento_de(nombre):
+    # storage al que pertenece un blob según su carpeta
+    if nombre.startswith(f"{CARPETA_BLOBS}/{_publico.prefijo}/"):
+        return _publico
+    return _privado
@@ -0,0 +1,192 @@
+import os
+from datetime import timedelta
+
+try:
+    import fcntl
+except ImportError:  # Windows (desarrollo): solo queda el UPDATE condicional
+    fcntl = None
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.http import UnreadablePostError
+from django.utils import timezone
+
+# Lectura del cuerpo del PATCH: se copia al disco en bloques, sin cargarlo
+# entero en memoria
+TAMANO_BLOQUE = 64 * 1024
+
+
+class OffsetInvalido(Exception):
+    def __init__(self, esperado):
+        super().__init__(f"Offset esperado: {esperado}")
+        self.esperado = esperado
+
+
+class FragmentoDemasiadoGrande(Exception):
+    pass
+
+
+def ruta_parcial(subida) -> str:
+    return os.path.join(settings.SUBIDAS_DIR, f"{subida.pk}.part")
+
+
+def crear_parcial(subida) -> None:
+    os.makedirs(settings.SUBIDAS_DIR, exist_ok=True)
+    open(ruta_parcial(subida), "wb").close()
+
+
+def _bloquear(f) -> bool:
+    """
+    Lock exclusivo no bloqueante sobre el parcial: un solo PATCH escribe en
+    cada subida; el otro recibe OffsetInvalido y retoma con HEAD.
+    """
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return False
+    return True
+
+
+def _offset_actual(subida_id) -> int:
+    from .models import SubidaFragmentada
+
+    return SubidaFragmentada.objects.values_list("offset", flat=True).get(pk=subida_id)
+
+
+def escribir_fragmento(subida_id, stream, offset, largo):
+    """
+    Escribe 'largo' bytes de 'stream' desde 'offset'. El offset del cliente
+    debe coincidir con el del servidor (si no, OffsetInvalido con el actual).
+    Si la conexión se corta a mitad, se guarda lo recibido y el cliente
+    retoma desde el nuevo offset. Retorna la subida actualizada.
+
+    El cuerpo (hasta SUBIDA_TAMANO_MAX_MB de un cliente lento) se lee sin
+    transacción ni lock de fila: los PATCH de una misma subida se excluyen
+    con un lock sobre el parcial, y el offset nuevo se guarda con un UPDATE
+    condicionado al offset leído.
+    """
+    from .models import SubidaFragmentada
+
+    subida = SubidaFragmentada.objects.get(pk=subida_id)
+    if subida.estado != "en_curso" or offset != subida.offset:
+        raise OffsetInvalido(subida.offset)
+    if largo > subida.tamano_total - subida.offset:
+        raise FragmentoDemasiadoGrande()
+
+    with open(ruta_parcial(subida), "r+b") as f:
+        # otro PATCH en curso, o uno que terminó entre la lectura y el lock
+        if not _bloquear(f) or _offset_actual(subida_id) != offset:
+            raise OffsetInvalido(_offset_actual(subida_id))
+
+        escritos = 0
+        f.seek(offset)
+        try:
+            while escritos < largo:
+                bloque = stream.read(min(TAMANO_BLOQUE, largo - escritos))
+                if not bloque:
+                    break
+                f.write(bloque)
+                escritos += len(bloque)
+        except (OSError, UnreadablePostError):
+            # conexión cortada: se conserva lo recibido hasta acá
+            pass
+        f.truncate(offset + escritos)
+        f.flush()
+
+        actualizadas = (
+            SubidaFragmentada.objects
+            .filter(pk=subida_id, estado="en_curso", offset=offset)
+            .update(offset=offset + escritos, updated_at=timezone.now())
+        )
+    if not actualizadas:
+        raise OffsetInvalido(_offset_actual(subida_id))
+
+    subida.offset = offset + escritos
+    return subida
+
+
+def finalizar_subida(subida):
+    """
+    Adjunta el archivo completo a su documento y borra el parcial. Es
+    idempotente: si ya se finalizó retorna el mismo documento.
+    """
+    from .models import ContratoDocumento, PropiedadDocumento, SubidaFragmentada
+
+    modelos = {
+        "contrato_documento": (ContratoDocumento, "contrato_id"),
+        "propiedad_documento": (PropiedadDocumento, "propiedad_id"),
+    }
+    modelo, campo_objeto = modelos[subida.destino]
+
+    with transaction.atomic():
+        subida = SubidaFragmentada.objects.select_for_update().get(pk=subida.pk)
+        if subida.estado == "completa":
+            return modelo.objects.get(pk=subida.documento_id)
+        if subida.offset != subida.tamano_total:
+            raise OffsetInvalido(subida.offset)
+
+        documento = modelo(
+            **{campo_objeto: subida.objeto_id},
+            tipo=subida.tipo,
+            nombre=subida.nombre,
+            subido_por=subida.usuario,
+        )
+        with open(ruta_parcial(subida), "rb") as f:
+            documento.archivo.save(subida.nombre_archivo, File(f), save=False)
+        documento.save()
+
+        subida.estado = "completa"
+        subida.documento_id = documento.pk
+        subida.save(update_fields=["estado", "documento_id", "updated_at"])
+
+        ruta = ruta_parcial(subida)
+        transaction.on_commit(lambda: _borrar(ruta))
+    return documento
+
+
+def _borrar(ruta) -> bool:
+    try:
+        os.remove(ruta)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def cancelar_subida(subida) -> None:
+    _borrar(ruta_parcial(subida))
+    subida.delete()
+
+
+def limpiar_subidas(horas=None, ahora=None) -> tuple[int, int]:
+    """
+    Borra las subidas en curso sin actividad hace más de 'horas' (y sus
+    parciales), las completas antiguas y los .part sin registro.
+    Retorna (registros borrados, archivos borrados).
+    """
+    from .models import SubidaFragmentada
+
+    horas = settings.SUBIDA_EXPIRA_HORAS if horas is None else horas
+    ahora = ahora or timezone.now()
+    limite = ahora - timedelta(hours=horas)
+
+    vencidas = SubidaFragmentada.objects.filter(updated_at__lt=limite)
+    archivos = sum(
+        _borrar(ruta_parcial(s))
+        for s in vencidas.filter(estado="en_curso").only("pk")
+    )
+    registros, _ = vencidas.delete()
+
+    # parciales huérfanos (p.ej. la fila se borró a mano)
+    if os.path.isdir(settings.SUBIDAS_DIR):
+        vigentes = {f"{pk}.part" for pk in SubidaFragmentada.objects.values_list("pk", flat=True)}
+        for nombre in os.listdir(settings.SUBIDAS_DIR):
+            ruta = os.path.join(settings.SUBIDAS_DIR, nombre)
+            if (
+                nombre.endswith(".part") and nombre not in vigentes
+                and os.path.getmtime(ruta) < limite.timestamp()
+            ):
+                archivos += _borrar(ruta)
+    return registros, archivos
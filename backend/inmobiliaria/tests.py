@@ -1,11 +1,83 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import date, datetime, time as hora, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipIf
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import OperationalError, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken
 
 from inmobiliaria.models import (
-    Usuario, Propietario, Propiedad, Contrato, Reserva, Pago, Interesado
+    Usuario, Propietario, Propiedad, Contrato, Reserva, Pago, Interesado,
+    Blob, PropiedadDocumento, CuotaContrato, SubidaFragmentada, Notificacion,
+    DisponibilidadVisita, Feriado, Visita, SolicitudCliente, SolicitudCoincidencia,
 )
+from inmobiliaria.api.resumen.views import build_deudores
+from inmobiliaria.storage import almacenamiento_publico
+from inmobiliaria import coincidencias, cuotas, descargas, disponibilidad, estados, expirador, search, similares, subidas
+
+
+def crear_propietario(sufijo="1"):
+    usuario = Usuario.objects.create_user(
+        username=f"propietario{sufijo}@test.com", email=f"propietario{sufijo}@test.com",
+        password="x", rol="PROPIETARIO",
+    )
+    return Propietario.objects.create(
+        usuario=usuario, primer_nombre="Ana", primer_apellido="Pérez",
+        rut=f"1111111{sufijo}-1", telefono=f"+5691111111{sufijo}", email=usuario.email,
+    )
+
+
+def crear_propiedad(propietario, **campos):
+    datos = dict(
+        titulo="Casa en el centro", descripcion="Casa amplia", direccion="Calle 1",
+        ciudad="Talca", tipo="casa", dormitorios=3, baos=2, metros2=120,
+        precio=100000000, estado_aprobacion="aprobada",
+    )
+    datos.update(campos)
+    return Propiedad.objects.create(propietario=propietario, propietario_user=propietario.usuario, **datos)
+
+
+def crear_contrato(propiedad, **campos):
+    usuario = Usuario.objects.create_user(
+        username=f"arrendatario{propiedad.pk}@test.com", email=f"arrendatario{propiedad.pk}@test.com",
+        password="x", rol="CLIENTE",
+    )
+    interesado = Interesado.objects.create(
+        usuario=usuario, primer_nombre="Juan", primer_apellido="Soto",
+        telefono=f"+569333{propiedad.pk:05d}", email=usuario.email,
+    )
+    datos = dict(tipo="arriendo", fecha_firma=date(2025, 11, 20), precio_pactado=Decimal("450000"))
+    datos.update(campos)
+    return Contrato.objects.create(propiedad=propiedad, comprador_arrendatario=interesado, **datos)
+
+
+def usar_directorios_temporales(test):
+    """MEDIA_ROOT, PRIVADO_ROOT, SUBIDAS_DIR y BLOBS_TEMP_DIR en un directorio temporal del test."""
+    raiz = tempfile.mkdtemp()
+    test.addCleanup(shutil.rmtree, raiz, ignore_errors=True)
+    ajustes = override_settings(
+        MEDIA_ROOT=os.path.join(raiz, "media"),
+        PRIVADO_ROOT=os.path.join(raiz, "privado"),
+        SUBIDAS_DIR=os.path.join(raiz, "subidas"),
+        BLOBS_TEMP_DIR=os.path.join(raiz, "blobs_tmp"),
+    )
+    ajustes.enable()
+    test.addCleanup(ajustes.disable)
+    return raiz
 
 
 class PropietarioAPITestCase(APITestCase):
@@ -308,3 +380,990 @@ class PropietarioSinDatosTestCase(APITestCase):
                 status.HTTP_200_OK,
                 f"Endpoint {endpoint} debería retornar 200 OK"
             )
+
+
+class ReservaConcurrenteTestCase(TransactionTestCase):
+    """
+    Muchos clientes reservando la misma propiedad a la vez: el índice único
+    deja pasar una sola reserva activa y el resto recibe el error de validación.
+    """
+
+    HILOS = 12
+    REINTENTOS = 50
+
+    def setUp(self):
+        dueno = Usuario.objects.create_user(
+            username="dueno@test.com", email="dueno@test.com", password="x", rol="PROPIETARIO"
+        )
+        propietario = Propietario.objects.create(
+            usuario=dueno, primer_nombre="Ana", primer_apellido="Pérez",
+            rut="11111111-1", telefono="+56911111111", email=dueno.email,
+        )
+        self.propiedad = Propiedad.objects.create(
+            propietario=propietario, propietario_user=dueno, titulo="Casa en el centro",
+            descripcion="Casa amplia", direccion="Calle 1", ciudad="Talca", tipo="casa",
+            dormitorios=3, baos=2, metros2=120, precio=100000000, estado_aprobacion="aprobada",
+        )
+        self.interesados = []
+        for i in range(self.HILOS):
+            usuario = Usuario.objects.create_user(
+                username=f"cliente{i}@test.com", email=f"cliente{i}@test.com", password="x", rol="CLIENTE"
+            )
+            self.interesados.append(Interesado.objects.create(
+                usuario=usuario, primer_nombre="Cliente", primer_apellido=str(i),
+                telefono=f"+5692222{i:04d}", email=usuario.email,
+            ))
+
+    def test_una_sola_reserva_activa_por_propiedad(self):
+        barrera = threading.Barrier(self.HILOS)
+        resultados = []
+
+        def reservar(interesado):
+            barrera.wait()
+            try:
+                # SQLite serializa las escrituras ("database is locked"): se
+                # reintenta; solo el ValidationError del índice cuenta como rechazo.
+                # El bloqueo puede llegar en un on_commit, con la reserva ya
+                # guardada: antes de reintentar se revisa si quedó creada.
+                for intento in range(self.REINTENTOS):
+                    try:
+                        if intento and Reserva.objects.filter(interesado=interesado, activa=True).exists():
+                            resultados.append("ok")
+                            return
+                        Reserva.objects.create(
+                            propiedad_id=self.propiedad.pk, interesado=interesado,
+                            expires_at=timezone.now() + timedelta(days=3),
+                        )
+                        resultados.append("ok")
+                        return
+                    except ValidationError:
+                        resultados.append("rechazada")
+                        return
+                    except OperationalError:
+                        time.sleep(0.01 * (intento + 1))
+                resultados.append("bloqueada")
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=reservar, args=(i,)) for i in self.interesados]
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+
+        self.assertNotIn("bloqueada", resultados)
+        self.assertEqual(resultados.count("ok"), 1)
+        self.assertEqual(resultados.count("rechazada"), self.HILOS - 1)
+        self.assertEqual(Reserva.objects.filter(propiedad=self.propiedad, activa=True).count(), 1)
+        self.propiedad.refresh_from_db()
+        self.assertEqual(self.propiedad.estado, "reservada")
+
+
+class PaginacionCursorTestCase(APITestCase):
+    """
+    ?paginacion=cursor del catálogo: recorrer las páginas siguiendo 'next'
+    entrega cada propiedad una sola vez y en orden, aunque haya empates en
+    la columna de orden (el pk desempata).
+    """
+
+    URL = "/api/catalogo/propiedades/"
+
+    def setUp(self):
+        cache.clear()
+        propietario = crear_propietario()
+        precios = [300, 100, 100, 200, 100, 100, 200, 100]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.propiedades = [crear_propiedad(propietario, precio=p) for p in precios]
+
+    def recorrer(self, url):
+        ids, paginas = [], 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn("count", response.data)
+            ids += [p["id"] for p in response.data["results"]]
+            url = response.data["next"]
+            paginas += 1
+        return ids, paginas
+
+    def test_recorre_empates_sin_repetir_ni_saltar(self):
+        ids, paginas = self.recorrer(f"{self.URL}?paginacion=cursor&ordering=precio&page_size=3")
+        esperados = [p.pk for p in sorted(self.propiedades, key=lambda p: (p.precio, p.pk))]
+        self.assertEqual(ids, esperados)
+        self.assertEqual(paginas, 3)
+
+    def test_orden_descendente(self):
+        ids, _ = self.recorrer(f"{self.URL}?paginacion=cursor&ordering=-precio&page_size=2")
+        esperados = [p.pk for p in sorted(self.propiedades, key=lambda p: (-p.precio, -p.pk))]
+        self.assertEqual(ids, esperados)
+
+    def test_orden_no_admitido(self):
+        response = self.client.get(f"{self.URL}?paginacion=cursor&ordering=metros2")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cursor_invalido(self):
+        response = self.client.get(f"{self.URL}?cursor=no-es-un-cursor")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_sin_cursor_mantiene_paginas(self):
+        response = self.client.get(self.URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], len(self.propiedades))
+
+
+class CacheCatalogoTestCase(APITestCase):
+    """
+    Cache de respuestas del catálogo público: la segunda lectura es HIT y
+    cualquier cambio en una propiedad invalida (al confirmar) las respuestas
+    guardadas.
+    """
+
+    URL = "/api/catalogo/propiedades/"
+
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.propiedad = crear_propiedad(crear_propietario(), precio=100)
+
+    def test_segunda_lectura_es_hit(self):
+        self.assertEqual(self.client.get(self.URL)["X-Cache"], "MISS")
+        self.assertEqual(self.client.get(self.URL)["X-Cache"], "HIT")
+
+    def test_orden_de_parametros_no_cambia_la_clave(self):
+        self.client.get(f"{self.URL}?ciudad=Talca&tipo=casa")
+        self.assertEqual(self.client.get(f"{self.URL}?tipo=casa&ciudad=Talca&precio_min=")["X-Cache"], "HIT")
+
+    def test_guardar_propiedad_invalida(self):
+        self.client.get(self.URL)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.propiedad.precio = 250
+            self.propiedad.save()
+
+        response = self.client.get(self.URL)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(float(response.data["results"][0]["precio"]), 250)
+
+    def test_sin_commit_no_invalida(self):
+        self.client.get(self.URL)
+        with self.captureOnCommitCallbacks(execute=False):
+            self.propiedad.precio = 250
+            self.propiedad.save()
+        self.assertEqual(self.client.get(self.URL)["X-Cache"], "HIT")
+
+    def test_reserva_invalida(self):
+        self.client.get(self.URL)
+        usuario = Usuario.objects.create_user(
+            username="cliente@test.com", email="cliente@test.com", password="x", rol="CLIENTE"
+        )
+        interesado = Interesado.objects.create(
+            usuario=usuario, primer_nombre="Cliente", primer_apellido="Uno",
+            telefono="+56922220000", email=usuario.email,
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            Reserva.objects.create(
+                propiedad=self.propiedad, interesado=interesado,
+                expires_at=timezone.now() + timedelta(days=3),
+            )
+
+        response = self.client.get(self.URL)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["results"][0]["estado"], "reservada")
+
+
+class SubidaFragmentadaTestCase(APITestCase):
+    """
+    Subida reanudable: cada PATCH escribe desde el Upload-Offset del servidor;
+    un offset distinto responde 409 con el actual para retomar, y finalizar
+    adjunta el archivo completo al documento.
+    """
+
+    CONTENIDO = b"0123456789abcdef"
+
+    def setUp(self):
+        usar_directorios_temporales(self)
+        propietario = crear_propietario()
+        self.propiedad = crear_propiedad(propietario)
+        self.client.force_authenticate(propietario.usuario)
+        response = self.client.post("/api/subidas/", {
+            "destino": "propiedad_documento",
+            "objeto_id": self.propiedad.pk,
+            "tipo": "plano",
+            "nombre": "Plano",
+            "nombre_archivo": "plano.pdf",
+            "tamano_total": len(self.CONTENIDO),
+        }, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response["Upload-Offset"], "0")
+        self.url = f"/api/subidas/{response.data['id']}/"
+
+    def enviar(self, offset, datos):
+        return self.client.generic(
+            "PATCH", self.url, datos,
+            content_type="application/offset+octet-stream", HTTP_UPLOAD_OFFSET=str(offset),
+        )
+
+    def test_retoma_desde_el_offset_del_servidor(self):
+        response = self.enviar(0, self.CONTENIDO[:6])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Upload-Offset"], "6")
+
+        # el cliente perdió la respuesta y reenvía desde 0
+        response = self.enviar(0, self.CONTENIDO[:6])
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response["Upload-Offset"], "6")
+
+        # HEAD para saber desde dónde seguir
+        offset = int(self.client.head(self.url)["Upload-Offset"])
+        response = self.enviar(offset, self.CONTENIDO[offset:])
+        self.assertEqual(response["Upload-Offset"], str(len(self.CONTENIDO)))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f"{self.url}finalizar/")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        documento = self.propiedad.documentos.get()
+        self.assertTrue(documento.archivo.path.startswith(settings.PRIVADO_ROOT))
+        with documento.archivo.open("rb") as f:
+            self.assertEqual(f.read(), self.CONTENIDO)
+        self.assertEqual(os.listdir(settings.SUBIDAS_DIR), [])
+
+        # finalizar de nuevo no crea otro documento
+        self.assertEqual(self.client.post(f"{self.url}finalizar/").data["id"], documento.pk)
+        self.assertEqual(self.propiedad.documentos.count(), 1)
+
+    def test_finalizar_incompleta(self):
+        self.enviar(0, self.CONTENIDO[:4])
+        response = self.client.post(f"{self.url}finalizar/")
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response["Upload-Offset"], "4")
+        self.assertFalse(self.propiedad.documentos.exists())
+
+    def test_fragmento_mayor_al_declarado(self):
+        response = self.enviar(0, self.CONTENIDO + b"extra")
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        self.assertEqual(self.client.head(self.url)["Upload-Offset"], "0")
+
+    @skipIf(subidas.fcntl is None, "sin fcntl no hay lock sobre el parcial")
+    def test_patch_concurrente_recibe_409(self):
+        subida = SubidaFragmentada.objects.get()
+        with open(subidas.ruta_parcial(subida), "r+b") as f:
+            # otro PATCH de la misma subida escribiendo
+            subidas.fcntl.flock(f.fileno(), subidas.fcntl.LOCK_EX)
+            response = self.enviar(0, self.CONTENIDO[:4])
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response["Upload-Offset"], "0")
+        self.assertEqual(os.path.getsize(subidas.ruta_parcial(subida)), 0)
+
+    def test_offset_avanzado_durante_la_lectura(self):
+        # otro escritor confirmó un fragmento mientras este leía el cuerpo:
+        # el UPDATE condicional no guarda este offset
+        subida = SubidaFragmentada.objects.get()
+
+        class Cuerpo:
+            def read(self, n):
+                SubidaFragmentada.objects.filter(pk=subida.pk).update(offset=6)
+                return b"x" * n
+
+        with self.assertRaises(subidas.OffsetInvalido) as ctx:
+            subidas.escribir_fragmento(subida.pk, Cuerpo(), 0, 4)
+        self.assertEqual(ctx.exception.esperado, 6)
+        subida.refresh_from_db()
+        self.assertEqual(subida.offset, 6)
+
+
+class BlobReferenciasTestCase(TestCase):
+    """
+    Almacenamiento deduplicado: el mismo contenido se guarda una vez con un
+    contador de referencias, y el archivo se borra recién cuando la última
+    referencia se libera (al confirmar la transacción).
+    """
+
+    def setUp(self):
+        usar_directorios_temporales(self)
+        self.propiedad = crear_propiedad(crear_propietario())
+
+    def documento(self, contenido, nombre="escritura.pdf"):
+        with self.captureOnCommitCallbacks(execute=True):
+            doc = PropiedadDocumento(propiedad=self.propiedad, nombre=nombre)
+            doc.archivo.save(nombre, ContentFile(contenido), save=True)
+        return doc
+
+    def borrar(self, doc):
+        with self.captureOnCommitCallbacks(execute=True):
+            doc.delete()
+
+    def test_mismo_contenido_un_solo_archivo(self):
+        a = self.documento(b"mismo pdf", "a.pdf")
+        b = self.documento(b"mismo pdf", "b.pdf")
+
+        self.assertEqual(a.archivo.name, b.archivo.name)
+        self.assertTrue(a.archivo.name.startswith("blobs/privado/"))
+        blob = Blob.objects.get()
+        self.assertEqual(blob.referencias, 2)
+        self.assertEqual(blob.tamano, len(b"mismo pdf"))
+
+        ruta = a.archivo.path
+        self.borrar(a)
+        self.assertEqual(Blob.objects.get().referencias, 1)
+        self.assertTrue(os.path.exists(ruta))
+
+        self.borrar(b)
+        self.assertFalse(Blob.objects.exists())
+        self.assertFalse(os.path.exists(ruta))
+
+    def test_reemplazar_archivo_libera_el_anterior(self):
+        doc = self.documento(b"version 1")
+        anterior = doc.archivo.path
+
+        with self.captureOnCommitCallbacks(execute=True):
+            doc.archivo.save("escritura.pdf", ContentFile(b"version 2"), save=True)
+
+        self.assertEqual(list(Blob.objects.values_list("referencias", flat=True)), [1])
+        self.assertFalse(os.path.exists(anterior))
+        self.assertTrue(os.path.exists(doc.archivo.path))
+
+    def test_temporales_fuera_de_media(self):
+        with mock.patch("inmobiliaria.storage.sumar_referencia", side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.documento(b"falla al registrar")
+        self.assertEqual(os.listdir(settings.BLOBS_TEMP_DIR), [])
+
+        nombre = almacenamiento_publico().save("foto.jpg", ContentFile(b"foto"))
+        self.assertTrue(nombre.startswith("blobs/publico/"))
+        self.assertTrue(os.path.exists(os.path.join(settings.MEDIA_ROOT, nombre)))
+        self.assertFalse(os.path.exists(os.path.join(settings.MEDIA_ROOT, "blobs", "tmp")))
+        self.assertEqual(os.listdir(settings.BLOBS_TEMP_DIR), [])
+
+    def test_rollback_no_libera(self):
+        doc = self.documento(b"contrato firmado")
+        try:
+            with transaction.atomic():
+                PropiedadDocumento.objects.get(pk=doc.pk).delete()
+                raise RuntimeError
+        except RuntimeError:
+            pass
+
+        self.assertEqual(Blob.objects.get().referencias, 1)
+        self.assertTrue(os.path.exists(doc.archivo.path))
+
+
+class CuotasTestCase(TestCase):
+    """
+    Cuotas de arriendo: una por mes desde el mes siguiente a la firma, con el
+    día de vencimiento recortado en meses cortos; generar() solo crea las
+    que faltan.
+    """
+
+    def setUp(self):
+        self.contrato = crear_contrato(crear_propiedad(crear_propietario()))
+
+    def test_vencimientos_cruzan_el_anio(self):
+        self.assertEqual(cuotas.vencimientos(self.contrato, date(2026, 2, 10)), [
+            date(2025, 12, 5), date(2026, 1, 5), date(2026, 2, 5),
+        ])
+
+    def test_vencimientos_en_meses_cortos(self):
+        self.contrato.fecha_firma = date(2023, 12, 31)
+        with mock.patch.object(Contrato, "dia_vencimiento", return_value=31):
+            fechas = cuotas.vencimientos(self.contrato, date(2024, 4, 1))
+        self.assertEqual(fechas, [
+            date(2024, 1, 31), date(2024, 2, 29), date(2024, 3, 31), date(2024, 4, 30),
+        ])
+
+    def test_sin_meses_completos(self):
+        self.assertEqual(cuotas.vencimientos(self.contrato, date(2025, 11, 30)), [])
+
+    def test_generar_solo_crea_las_que_faltan(self):
+        self.assertEqual(cuotas.generar([self.contrato], date(2026, 1, 1)), 2)
+        self.assertEqual(cuotas.generar([self.contrato], date(2026, 1, 1)), 0)
+        self.assertEqual(cuotas.generar([self.contrato], date(2026, 3, 1)), 2)
+
+        cuotas_contrato = CuotaContrato.objects.filter(contrato=self.contrato).order_by("vencimiento")
+        self.assertEqual(
+            list(cuotas_contrato.values_list("vencimiento", flat=True)),
+            [date(2025, 12, 5), date(2026, 1, 5), date(2026, 2, 5), date(2026, 3, 5)],
+        )
+        self.assertTrue(all(c.monto == self.contrato.precio_pactado for c in cuotas_contrato))
+
+        self.contrato.refresh_from_db()
+        self.assertEqual(self.contrato.cuotas_pendientes, 4)
+        self.assertEqual(self.contrato.proximo_vencimiento, date(2025, 12, 5))
+
+    def test_cuenta_solo_las_insertadas(self):
+        # otro proceso inserta una de las cuotas entre la consulta y el bulk_create
+        bulk_create = CuotaContrato.objects.bulk_create
+
+        def con_carrera(nuevas, **kwargs):
+            CuotaContrato.objects.create(
+                contrato=self.contrato, vencimiento=nuevas[0].vencimiento, monto=self.contrato.precio_pactado,
+            )
+            return bulk_create(nuevas, **kwargs)
+
+        with mock.patch.object(CuotaContrato.objects, "bulk_create", side_effect=con_carrera):
+            self.assertEqual(cuotas.generar([self.contrato], date(2026, 1, 1)), 1)
+        self.assertEqual(CuotaContrato.objects.filter(contrato=self.contrato).count(), 2)
+
+    def test_venta_y_no_vigente_no_generan(self):
+        venta = crear_contrato(crear_propiedad(self.contrato.propiedad.propietario), tipo="venta")
+        self.contrato.vigente = False
+        self.assertEqual(cuotas.generar([self.contrato, venta], date(2026, 6, 1)), 0)
+        self.assertFalse(CuotaContrato.objects.exists())
+
+
+class LibroContratoTestCase(TestCase):
+    """
+    Libro del contrato (total pagado, pendiente, próxima y última cuota): lo
+    recalculan las señales de Pago y CuotaContrato, y conciliar_libro detecta
+    y repara los contratos que no cuadran.
+    """
+
+    def setUp(self):
+        propietario = crear_propietario()
+        self.contrato = crear_contrato(crear_propiedad(propietario))
+        self.otro = crear_contrato(crear_propiedad(propietario))
+        cuotas.generar([self.contrato], date(2026, 2, 1))
+        self.primera, self.segunda, self.tercera = self.contrato.cuotas.order_by("vencimiento")
+
+    def libro(self, contrato=None):
+        contrato = contrato or self.contrato
+        contrato.refresh_from_db()
+        return contrato
+
+    def test_pagar_cuota_actualiza_el_libro(self):
+        self.primera.registrar_pago(monto=self.primera.monto)
+
+        c = self.libro()
+        self.assertEqual(c.total_pagado, Decimal("450000"))
+        self.assertEqual(c.monto_pendiente, Decimal("900000"))
+        self.assertEqual(c.cuotas_pendientes, 2)
+        self.assertEqual(c.proxima_cuota_id, self.segunda.pk)
+        self.assertEqual(c.proximo_vencimiento, self.segunda.vencimiento)
+        self.assertEqual(c.ultima_cuota_pagada_id, self.primera.pk)
+
+    def test_borrar_pagos_por_queryset(self):
+        self.primera.registrar_pago(monto=self.primera.monto)
+        Pago.objects.create(contrato=self.contrato, fecha=date(2026, 1, 10), monto=Decimal("1000"))
+        self.assertEqual(self.libro().total_pagado, Decimal("451000"))
+
+        Pago.objects.filter(contrato=self.contrato).delete()
+
+        c = self.libro()
+        self.assertEqual(c.total_pagado, 0)
+        # la cuota sigue marcada pagada: el pago se borró, no la cuota
+        self.assertEqual(c.cuotas_pendientes, 2)
+
+    def test_mover_pago_recalcula_ambos_contratos(self):
+        pago = Pago.objects.create(contrato=self.contrato, fecha=date(2026, 1, 10), monto=Decimal("5000"))
+        pago.contrato = self.otro
+        pago.save()
+
+        self.assertEqual(self.libro().total_pagado, 0)
+        self.assertEqual(self.libro(self.otro).total_pagado, Decimal("5000"))
+
+    def test_borrar_cuotas(self):
+        self.tercera.delete()
+        c = self.libro()
+        self.assertEqual(c.cuotas_pendientes, 2)
+        self.assertEqual(c.monto_pendiente, Decimal("900000"))
+
+        CuotaContrato.objects.filter(contrato=self.contrato).delete()
+        c = self.libro()
+        self.assertEqual(c.cuotas_pendientes, 0)
+        self.assertIsNone(c.proxima_cuota_id)
+        self.assertIsNone(c.proximo_vencimiento)
+
+    def test_save_completo_no_pisa_el_libro(self):
+        desactualizado = Contrato.objects.get(pk=self.contrato.pk)
+        self.primera.registrar_pago(monto=self.primera.monto)
+
+        desactualizado.precio_pactado = Decimal("460000")
+        desactualizado.save()
+
+        self.assertEqual(self.libro().total_pagado, Decimal("450000"))
+
+    def test_conciliar_libro(self):
+        self.primera.registrar_pago(monto=self.primera.monto)
+        Contrato.objects.filter(pk=self.contrato.pk).update(total_pagado=0, cuotas_pendientes=9)
+
+        salida = StringIO()
+        call_command("conciliar_libro", "--detalle", stdout=salida)
+        self.assertIn(f"contrato {self.contrato.pk}:", salida.getvalue())
+        self.assertIn("1 contratos descuadrados", salida.getvalue())
+        self.assertEqual(self.libro().total_pagado, 0)
+
+        call_command("conciliar_libro", "--reparar", stdout=StringIO())
+        c = self.libro()
+        self.assertEqual(c.total_pagado, Decimal("450000"))
+        self.assertEqual(c.cuotas_pendientes, 2)
+
+        salida = StringIO()
+        call_command("conciliar_libro", stdout=salida)
+        self.assertIn("El libro cuadra", salida.getvalue())
+
+
+class DescargaArchivoTestCase(APITestCase):
+    """
+    {id}/descargar/ de archivos privados: sin firma aplica el filtro por rol
+    de la vista (cliente del contrato, propietario y admin sí; otro usuario
+    no); el link firmado que entrega el serializer abre sin JWT, solo para
+    ese archivo y mientras no venza.
+    """
+
+    CONTENIDO = b"%PDF-1.4 comprobante"
+
+    def setUp(self):
+        usar_directorios_temporales(self)
+        propietario = crear_propietario()
+        self.dueno = propietario.usuario
+        self.contrato = crear_contrato(crear_propiedad(propietario))
+        self.cliente = self.contrato.comprador_arrendatario.usuario
+        self.otro = Usuario.objects.create_user(
+            username="otro@test.com", email="otro@test.com", password="x", rol="CLIENTE"
+        )
+        self.admin = Usuario.objects.create_user(
+            username="admin@test.com", email="admin@test.com", password="x", rol="ADMIN", is_staff=True
+        )
+        self.pago = Pago(contrato=self.contrato, fecha=date(2026, 1, 5), monto=Decimal("450000"))
+        self.pago.comprobante.save("comprobante.pdf", ContentFile(self.CONTENIDO), save=True)
+        self.url = f"/api/pagos/{self.pago.pk}/descargar/"
+
+    def leer(self, response):
+        return b"".join(response.streaming_content)
+
+    def test_permisos_por_rol(self):
+        for usuario, esperado in [
+            (self.cliente, status.HTTP_200_OK),
+            (self.dueno, status.HTTP_200_OK),
+            (self.admin, status.HTTP_200_OK),
+            (self.otro, status.HTTP_404_NOT_FOUND),
+        ]:
+            self.client.force_authenticate(usuario)
+            response = self.client.get(self.url)
+            self.assertEqual(response.status_code, esperado, usuario.email)
+            if esperado == status.HTTP_200_OK:
+                self.assertEqual(self.leer(response), self.CONTENIDO)
+
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_link_firmado_sin_jwt(self):
+        self.client.force_authenticate(self.cliente)
+        datos = self.client.get(f"/api/pagos/{self.pago.pk}/").data
+        self.assertNotIn("comprobante", datos)
+        link = datos["comprobante_url"]
+        self.assertIn("firma=", link)
+
+        self.client.force_authenticate(None)
+        response = self.client.get(link)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.leer(response), self.CONTENIDO)
+
+    def test_firma_de_otro_archivo_o_alterada(self):
+        otro_pago = Pago(contrato=self.contrato, fecha=date(2026, 2, 5), monto=Decimal("1000"))
+        otro_pago.comprobante.save("otro.pdf", ContentFile(b"otro"), save=True)
+        firma = descargas.firmar("pago", otro_pago.pk, "comprobante")
+
+        self.assertEqual(self.client.get(f"{self.url}?firma={firma}").status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.client.get(f"{self.url}?firma={firma}x").status_code, status.HTTP_403_FORBIDDEN)
+        # la firma de un pago no abre la cuota con el mismo pk
+        self.assertEqual(
+            self.client.get(f"/api/cuotas/{otro_pago.pk}/descargar/?firma={firma}").status_code,
+            status.HTTP_403_FORBIDDEN,
+        )
+
+    @override_settings(DESCARGAS_FIRMA_SEG=-1)
+    def test_firma_vencida(self):
+        firma = descargas.firmar("pago", self.pago.pk, "comprobante")
+        self.assertEqual(self.client.get(f"{self.url}?firma={firma}").status_code, status.HTTP_403_FORBIDDEN)
+
+
+class BusquedaPrefijoTestCase(APITestCase):
+    """
+    Búsqueda por el índice invertido: cada palabra buscada es un prefijo de
+    algún término (sin tildes ni mayúsculas) y se exigen todas.
+    """
+
+    def setUp(self):
+        cache.clear()
+        propietario = crear_propietario()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.casona = crear_propiedad(
+                propietario, titulo="Casona colonial", ciudad="Curicó", descripcion="Patio interior",
+            )
+            self.casa = crear_propiedad(propietario, titulo="Casa moderna", ciudad="Talca", descripcion="Patio")
+            self.depto = crear_propiedad(
+                propietario, titulo="Departamento céntrico", ciudad="Talca", descripcion="Cerca de la casa de la cultura",
+            )
+
+    def encontrar(self, texto):
+        return set(search.buscar(Propiedad.objects.all(), texto).values_list("pk", flat=True))
+
+    def test_prefijo(self):
+        self.assertEqual(self.encontrar("cas"), {self.casona.pk, self.casa.pk, self.depto.pk})
+        self.assertEqual(self.encontrar("caso"), {self.casona.pk})
+        self.assertEqual(self.encontrar("depa"), {self.depto.pk})
+
+    def test_sin_tildes_ni_mayusculas(self):
+        self.assertEqual(self.encontrar("CURI"), {self.casona.pk})
+        self.assertEqual(self.encontrar("centri"), {self.depto.pk})
+
+    def test_exige_todas_las_palabras(self):
+        self.assertEqual(self.encontrar("cas tal"), {self.casa.pk, self.depto.pk})
+        self.assertEqual(self.encontrar("casa curi"), set())
+
+    def test_catalogo_ordena_por_relevancia(self):
+        response = self.client.get("/api/catalogo/propiedades/?search=casa")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        ids = [p["id"] for p in response.data["results"]]
+        # "casa" en el título pesa más que en la descripción
+        self.assertEqual(ids, [self.casa.pk, self.depto.pk])
+
+
+class ExpiradorReservasTestCase(TestCase):
+    """
+    expirar_vencidas(): desactiva las reservas vencidas, libera sus
+    propiedades y notifica a propietario y cliente; con dry_run solo cuenta.
+    """
+
+    def setUp(self):
+        propietario = crear_propietario()
+        self.vencida = self.reservar(crear_propiedad(propietario), "1")
+        self.vigente = self.reservar(crear_propiedad(propietario), "2")
+        Reserva.objects.filter(pk=self.vencida.pk).update(expires_at=timezone.now() - timedelta(minutes=1))
+        Notificacion.objects.all().delete()
+
+    def reservar(self, propiedad, sufijo):
+        usuario = Usuario.objects.create_user(
+            username=f"cliente{sufijo}@test.com", email=f"cliente{sufijo}@test.com", password="x", rol="CLIENTE"
+        )
+        interesado = Interesado.objects.create(
+            usuario=usuario, primer_nombre="Cliente", primer_apellido=sufijo,
+            telefono=f"+5692222000{sufijo}", email=usuario.email,
+        )
+        return Reserva.objects.create(
+            propiedad=propiedad, interesado=interesado, expires_at=timezone.now() + timedelta(days=3),
+        )
+
+    def test_expira_libera_y_notifica(self):
+        stats = expirador.expirar_vencidas()
+
+        self.assertEqual((stats["reservas"], stats["propiedades"], stats["notificaciones"]), (1, 1, 2))
+        self.vencida.refresh_from_db()
+        self.assertFalse(self.vencida.activa)
+        self.assertEqual(self.vencida.estado, "expirada")
+        self.assertEqual(Propiedad.objects.get(pk=self.vencida.propiedad_id).estado, "disponible")
+        self.assertEqual(
+            set(Notificacion.objects.values_list("usuario_id", flat=True)),
+            {self.vencida.propiedad.propietario_user_id, self.vencida.interesado.usuario_id},
+        )
+
+        self.vigente.refresh_from_db()
+        self.assertTrue(self.vigente.activa)
+        self.assertEqual(Propiedad.objects.get(pk=self.vigente.propiedad_id).estado, "reservada")
+
+        # una segunda pasada no encuentra nada
+        self.assertEqual(expirador.expirar_vencidas()["reservas"], 0)
+
+    def test_dry_run_no_escribe(self):
+        salida = StringIO()
+        call_command("liberar_reservas_vencidas", "--dry-run", stdout=salida)
+
+        self.assertIn("[dry-run] 1 reservas vencidas", salida.getvalue())
+        self.assertIn("2 notificaciones, 1 propiedades", salida.getvalue())
+        self.vencida.refresh_from_db()
+        self.assertTrue(self.vencida.activa)
+        self.assertEqual(Propiedad.objects.get(pk=self.vencida.propiedad_id).estado, "reservada")
+        self.assertFalse(Notificacion.objects.exists())
+
+    def test_barrido_registra_la_marca(self):
+        self.assertTrue(expirador.estado_expirador(30)["atrasado"])
+        self.assertEqual(expirador.barrer_reservas(), 1)
+
+        marca = expirador.estado_expirador(30)
+        self.assertFalse(marca["atrasado"])
+        self.assertEqual((marca["procesadas"], marca["total_procesadas"]), (1, 1))
+
+
+class DisponibilidadVisitasTestCase(APITestCase):
+    """
+    Índice de horarios de visita (una máscara de bits por propiedad y día) y
+    /visitas/disponibilidad/: solo propiedades aprobadas y visitables, días
+    hábiles dentro de la ventana, y sin los slots ya tomados o pasados.
+    """
+
+    URL = "/api/visitas/disponibilidad/"
+
+    def setUp(self):
+        cache.clear()
+        propietario = crear_propietario()
+        self.libre = crear_propiedad(propietario)
+        self.con_visitas = crear_propiedad(propietario)
+        self.pendiente = crear_propiedad(propietario, estado_aprobacion="pendiente")
+        self.vendida = crear_propiedad(propietario)
+        Propiedad.objects.filter(pk=self.vendida.pk).update(estado="vendida")
+
+        usuario = Usuario.objects.create_user(
+            username="visitante@test.com", email="visitante@test.com", password="x", rol="CLIENTE"
+        )
+        self.interesado = Interesado.objects.create(
+            usuario=usuario, primer_nombre="Visita", primer_apellido="Uno",
+            telefono="+56944440000", email=usuario.email,
+        )
+        # próximo día hábil desde pasado mañana
+        self.fecha = timezone.localdate() + timedelta(days=2)
+        while self.fecha.weekday() > 4:
+            self.fecha += timedelta(days=1)
+
+    def visita(self, propiedad, h, fecha=None):
+        return Visita.objects.create(
+            propiedad=propiedad, interesado=self.interesado, fecha=fecha or self.fecha, hora=hora(h),
+        )
+
+    def ocupados(self, propiedad, fecha=None):
+        fila = DisponibilidadVisita.objects.filter(propiedad=propiedad, fecha=fecha or self.fecha).first()
+        return fila.ocupados if fila else 0
+
+    def test_indice_sigue_a_las_visitas(self):
+        v = self.visita(self.con_visitas, 9)
+        self.visita(self.con_visitas, 16)
+        self.assertEqual(self.ocupados(self.con_visitas), disponibilidad.mascara([hora(9), hora(16)]))
+
+        # mover de hora y luego de día libera el slot anterior
+        v.hora = hora(11)
+        v.save()
+        self.assertEqual(self.ocupados(self.con_visitas), disponibilidad.mascara([hora(11), hora(16)]))
+        otro_dia = self.fecha + timedelta(days=7)
+        v.fecha = otro_dia
+        v.save()
+        self.assertEqual(self.ocupados(self.con_visitas), disponibilidad.mascara([hora(16)]))
+        self.assertEqual(self.ocupados(self.con_visitas, otro_dia), disponibilidad.mascara([hora(11)]))
+
+        Visita.objects.filter(propiedad=self.con_visitas).delete()
+        self.assertFalse(DisponibilidadVisita.objects.exists())
+
+    def test_libres_por_propiedad(self):
+        self.visita(self.con_visitas, 9)
+        self.visita(self.con_visitas, 10)
+        ids = [self.libre.pk, self.con_visitas.pk, self.pendiente.pk, self.vendida.pk, 999999]
+
+        libres = disponibilidad.libres_por_propiedad(ids, self.fecha, disponibilidad.FRANJAS["manana"])
+        self.assertEqual(libres, {
+            self.libre.pk: disponibilidad.FRANJAS["manana"],
+            self.con_visitas.pk: disponibilidad.mascara([hora(11), hora(12), hora(13)]),
+        })
+
+    def test_propiedad_sin_slots_libres_no_aparece(self):
+        for h in (16, 17, 18):
+            self.visita(self.con_visitas, h)
+        libres = disponibilidad.libres_por_propiedad(
+            [self.libre.pk, self.con_visitas.pk], self.fecha, disponibilidad.FRANJAS["tarde"],
+        )
+        self.assertEqual(list(libres), [self.libre.pk])
+
+    def test_dias_bloqueados(self):
+        ids = [self.libre.pk]
+        sabado = self.fecha + timedelta(days=5 - self.fecha.weekday())
+        lejos = timezone.localdate() + timedelta(days=40)
+        while lejos.weekday() > 4:
+            lejos += timedelta(days=1)
+        self.assertEqual(disponibilidad.libres_por_propiedad(ids, sabado), {})
+        self.assertEqual(disponibilidad.libres_por_propiedad(ids, lejos), {})
+        self.assertEqual(disponibilidad.libres_por_propiedad(ids, timezone.localdate() - timedelta(days=1)), {})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Feriado.objects.create(fecha=self.fecha, nombre="Feriado")
+        self.assertEqual(disponibilidad.libres_por_propiedad(ids, self.fecha), {})
+
+    def test_hoy_sin_los_slots_pasados(self):
+        ahora = timezone.make_aware(datetime.combine(self.fecha, hora(12, 30)))
+        libres = disponibilidad.libres_por_propiedad([self.libre.pk], self.fecha, ahora=ahora)
+        self.assertEqual(disponibilidad.horas(libres[self.libre.pk]), [hora(13), hora(16), hora(17), hora(18)])
+
+    def test_endpoint(self):
+        self.visita(self.con_visitas, 17)
+        ids = ",".join(str(p.pk) for p in (self.libre, self.con_visitas, self.pendiente, self.vendida))
+        response = self.client.get(f"{self.URL}?propiedades={ids}&fecha={self.fecha}&franja=tarde")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [
+            {"propiedad": self.libre.pk, "slots": ["16:00", "17:00", "18:00"]},
+            {"propiedad": self.con_visitas.pk, "slots": ["16:00", "18:00"]},
+        ])
+
+    def test_endpoint_parametros_invalidos(self):
+        for query in (
+            f"propiedades=&fecha={self.fecha}",
+            f"propiedades=1,x&fecha={self.fecha}",
+            "propiedades=1&fecha=mañana",
+            f"propiedades=1&fecha={self.fecha}&franja=noche",
+        ):
+            self.assertEqual(self.client.get(f"{self.URL}?{query}").status_code, status.HTTP_400_BAD_REQUEST, query)
+
+
+class SimilaresTestCase(TestCase):
+    """
+    Las bajas hechas en otro worker (borrado, rechazo) no llegan al índice
+    del proceso por el refresco de updated_at: buscar_similares no debe
+    devolverlas.
+    """
+
+    def setUp(self):
+        similares._indice = None
+        self.addCleanup(setattr, similares, "_indice", None)
+        propietario = crear_propietario()
+        self.base = crear_propiedad(propietario)
+        self.otras = [crear_propiedad(propietario, precio=100000000 + i * 1000000) for i in range(6)]
+
+    def test_descarta_bajas_de_otro_worker(self):
+        self.assertEqual(set(similares.buscar_similares(self.base, 6)), {p.pk for p in self.otras})
+
+        # otro worker: sin señales ni on_commit en este proceso
+        borradas = {self.otras[0].pk, self.otras[1].pk}
+        with mock.patch("inmobiliaria.signals.quitar_propiedad"):
+            with self.captureOnCommitCallbacks(execute=True):
+                Propiedad.objects.filter(pk__in=borradas).delete()
+        rechazada = self.otras[2].pk
+        Propiedad.objects.filter(pk=rechazada).update(aprobada=False, estado_aprobacion="rechazada")
+
+        ids = similares.buscar_similares(self.base, 3)
+        self.assertEqual(len(ids), 3)
+        self.assertEqual(set(ids), {p.pk for p in self.otras[3:]})
+        for pk in borradas | {rechazada}:
+            self.assertNotIn(pk, similares._indice.pos)
+
+
+class CoincidenciasTestCase(TestCase):
+    """
+    emparejar_propiedades notifica cada par (solicitud, propiedad) una sola
+    vez, también si otro proceso lo registró entre la consulta y el insert.
+    """
+
+    def setUp(self):
+        propietario = crear_propietario()
+        self.propiedades = [crear_propiedad(propietario), crear_propiedad(propietario)]
+        self.interesados = []
+        for i in range(2):
+            usuario = Usuario.objects.create_user(
+                username=f"busca{i}@test.com", email=f"busca{i}@test.com", password="x", rol="CLIENTE"
+            )
+            interesado = Interesado.objects.create(
+                usuario=usuario, primer_nombre="Busca", primer_apellido=str(i),
+                telefono=f"+56955500{i:03d}", email=usuario.email,
+            )
+            SolicitudCliente.objects.create(
+                interesado=interesado, tipo_operacion="COMPRA", tipo_propiedad="casa",
+                ciudad="Talca", comuna="Talca", presupuesto_max=Decimal("150000000"), mensaje="Busco casa",
+            )
+            self.interesados.append(interesado)
+
+    def notificaciones(self):
+        return Notificacion.objects.filter(titulo=coincidencias.TITULO_NOTIFICACION)
+
+    def test_no_renotifica_pares_existentes(self):
+        self.assertEqual(coincidencias.emparejar_propiedades(self.propiedades), 4)
+        self.assertEqual(self.notificaciones().count(), 4)
+        self.assertEqual(coincidencias.emparejar_propiedades(self.propiedades), 0)
+        self.assertEqual(self.notificaciones().count(), 4)
+
+    def test_solo_notifica_los_pares_insertados(self):
+        # otro proceso registra (y notifica) un par entre la consulta y el bulk_create
+        bulk_create = SolicitudCoincidencia.objects.bulk_create
+
+        def con_carrera(nuevas, **kwargs):
+            SolicitudCoincidencia.objects.create(
+                solicitud_id=nuevas[0].solicitud_id, propiedad_id=nuevas[0].propiedad_id,
+            )
+            return bulk_create(nuevas, **kwargs)
+
+        with mock.patch.object(SolicitudCoincidencia.objects, "bulk_create", side_effect=con_carrera):
+            self.assertEqual(coincidencias.emparejar_propiedades(self.propiedades), 3)
+        self.assertEqual(SolicitudCoincidencia.objects.count(), 4)
+        self.assertEqual(self.notificaciones().count(), 3)
+
+
+class DeudoresTestCase(TestCase):
+    """
+    El reporte de deudores se arma desde las cuotas impagas vencidas, no
+    desde el resumen del contrato (proximo_vencimiento).
+    """
+
+    def setUp(self):
+        self.contrato = crear_contrato(crear_propiedad(crear_propietario()))
+        cuotas.generar([self.contrato], date(2026, 1, 1))
+
+    def test_libro_atrasado_no_oculta_la_deuda(self):
+        Contrato.objects.filter(pk=self.contrato.pk).update(proximo_vencimiento=None)
+        deudores = build_deudores(hasta=timezone.localdate())
+        self.assertEqual([d["contrato_id"] for d in deudores], [self.contrato.pk])
+        self.assertEqual(deudores[0]["cuotas_vencidas"], 2)
+
+    def test_cuotas_pagadas_no_cuentan(self):
+        CuotaContrato.objects.filter(contrato=self.contrato).update(pagada=True)
+        self.assertEqual(build_deudores(hasta=timezone.localdate()), [])
+
+
+class EstadosPropiedadTestCase(TestCase):
+    """
+    Transiciones de estado de Propiedad (estados.py): directas con aplicar(),
+    recalculadas con sincronizar(), y los estados finales que solo cambian
+    al firmar otro contrato.
+    """
+
+    def setUp(self):
+        self.propietario = crear_propietario()
+        self.propiedad = crear_propiedad(self.propietario)
+
+    def estado(self, propiedad=None):
+        return Propiedad.objects.values_list("estado", flat=True).get(pk=(propiedad or self.propiedad).pk)
+
+    def poner(self, estado, propiedad=None):
+        Propiedad.objects.filter(pk=(propiedad or self.propiedad).pk).update(estado=estado)
+
+    def test_reservar_solo_desde_disponible(self):
+        self.assertEqual(estados.aplicar("reservar", [self.propiedad.pk]), 1)
+        self.assertEqual(self.estado(), "reservada")
+        for estado in ("arrendada", "vendida"):
+            self.poner(estado)
+            self.assertEqual(estados.aplicar("reservar", [self.propiedad.pk]), 0)
+            self.assertEqual(self.estado(), estado)
+
+    def test_contrato_manda_sobre_estado_final(self):
+        # se vende una propiedad arrendada, y se arrienda una que figuraba vendida
+        self.poner("arrendada")
+        self.assertEqual(estados.aplicar("vender", [self.propiedad.pk]), 1)
+        self.assertEqual(self.estado(), "vendida")
+        self.assertEqual(estados.aplicar("arrendar", [self.propiedad.pk]), 1)
+        self.assertEqual(self.estado(), "arrendada")
+        # repetir el evento no es un cambio
+        self.assertEqual(estados.aplicar("arrendar", [self.propiedad.pk]), 0)
+
+    def test_firmar_contrato_sobre_vendida(self):
+        self.poner("vendida")
+        crear_contrato(self.propiedad, tipo="arriendo")
+        self.assertEqual(self.estado(), "arrendada")
+
+    def test_sincronizar(self):
+        reservada = crear_propiedad(self.propietario)
+        self.poner("reservada", reservada)
+        con_contrato = crear_propiedad(self.propietario)
+        crear_contrato(con_contrato)
+        self.poner("disponible", con_contrato)
+        final = crear_propiedad(self.propietario)
+        self.poner("vendida", final)
+
+        ids = [self.propiedad.pk, reservada.pk, con_contrato.pk, final.pk]
+        self.assertEqual(estados.pendientes(ids), {reservada.pk: "disponible", con_contrato.pk: "arrendada"})
+        self.assertEqual(estados.sincronizar(ids), {reservada.pk: "disponible", con_contrato.pk: "arrendada"})
+        self.assertEqual(self.estado(reservada), "disponible")
+        self.assertEqual(self.estado(con_contrato), "arrendada")
+        # sin contrato vigente, un estado final no se vuelve a abrir solo
+        self.assertEqual(self.estado(final), "vendida")
+        self.assertEqual(estados.sincronizar(ids), {})
+
+    def test_estado_actual(self):
+        self.poner("reservada")
+        self.propiedad.refresh_from_db()
+        self.assertEqual(estados.estado_actual(self.propiedad), "disponible")
+        self.poner("arrendada")
+        self.propiedad.refresh_from_db()
+        self.assertEqual(estados.estado_actual(self.propiedad), "arrendada")
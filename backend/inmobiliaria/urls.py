@@ -1,7 +1,5 @@
 from django.urls import path, include
 from rest_framework import routers
-from django.conf import settings
-from django.conf.urls.static import static
 
 from .views import (
     index, about, hello, propietario, propiedad,
@@ -9,7 +7,8 @@ from .views import (
     RegionViewSet, ComunaViewSet, PropietarioViewSet, PropietarioDireccionViewSet,
     InteresadoViewSet, PropiedadViewSet, VisitaViewSet, ReservaViewSet,
     ContratoViewSet, PagoViewSet, PropiedadFotoViewSet, PropiedadDocumentoViewSet,
-    CuotaContratoViewSet, NotificacionViewSet, SolicitudClienteViewSet, ContratoDocumentoViewSet
+    CuotaContratoViewSet, NotificacionViewSet, SolicitudClienteViewSet, ContratoDocumentoViewSet,
+    SubidaFragmentadaViewSet,
 )
 
 
@@ -35,6 +34,7 @@ router.register(r'cuotas', CuotaContratoViewSet, basename='cuota')
 router.register(r'notificaciones', NotificacionViewSet, basename="notificaciones")
 router.register(r'solicitudes-cliente', SolicitudClienteViewSet, basename="solicitud-cliente")
 router.register(r'contratos-documentos', ContratoDocumentoViewSet, basename='contratos-documentos')
+router.register(r'subidas', SubidaFragmentadaViewSet, basename='subida')
 
 
 urlpatterns = [
@@ -66,6 +66,4 @@ urlpatterns = [
 
 ]
 
-
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+# /media/ en desarrollo lo sirve core/urls.py (sin los archivos privados)
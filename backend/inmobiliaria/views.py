@@ -4,18 +4,20 @@ from datetime import datetime, date, timedelta
 from django.utils import timezone
 from dateutil.relativedelta import relativedelta
 
-from django.db.models import Sum, Count, Q, Exists, OuterRef
+from django.db.models import Sum, Count, Max, Q, Exists, OuterRef
 from django.utils.dateparse import parse_date
 
-from rest_framework import viewsets, status, filters, permissions
+from rest_framework import viewsets, status, filters, permissions, mixins
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from rest_framework.filters import OrderingFilter, SearchFilter
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import PermissionDenied, NotFound
 from rest_framework.exceptions import ValidationError
+from rest_framework.exceptions import ValidationError as DRFValidationError
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
@@ -41,10 +43,13 @@ from .serializers import (
     SolicitudClienteSerializer,
     ContratoWriteSerializer,
     ContratoDocumentoSerializer,
-    PagarCuotaSerializer
+    PagarCuotaSerializer,
+    PropiedadCatalogoSerializer,
+    SubidaFragmentadaSerializer,
 )
 
 from .notifications import notificar_usuario
+from . import cuotas, disponibilidad
 
 from .config import *
 from .utils import *
@@ -52,7 +57,26 @@ from .permissions import ReadOnlyOrAdminAsesor
 
 from .permisssions_roles import PropiedadPermission, IsAdmin, NotificacionPermission
 
-from .filters import PropiedadFilter
+from .filters import PropiedadFilter, BusquedaTextoFilter
+from .condicional import etag_fuerte, poner_validadores, respuesta_no_modificada, ultima_modificacion
+from .campos import CamposDinamicosViewMixin, PARAM_CAMPOS, PARAM_OMITIR
+from .similares import buscar_similares
+from .coincidencias import emparejar_propiedades
+from .descargas import DescargaArchivoMixin
+from .subidas import (
+    FragmentoDemasiadoGrande,
+    OffsetInvalido,
+    cancelar_subida,
+    crear_parcial,
+    escribir_fragmento,
+    finalizar_subida,
+)
+from .pagination import (
+    CursorOpcionalMixin,
+    NotificacionCursorPagination,
+    PagoCursorPagination,
+    ReservaCursorPagination,
+)
 
 # Create your views here.
 
@@ -119,7 +143,25 @@ def _filtro_propietario_user(qs, user, propiedad_prefix="propiedad"):
 # =========================
 # DOCUMENTOS DE PROPIEDAD
 # =========================
-class PropiedadDocumentoViewSet(viewsets.ModelViewSet):
+def _check_write_perm_documentos_propiedad(user, propiedad):
+    rol = getattr(user, "rol", "")
+
+    if rol == "ADMIN":
+        return
+
+    if rol == "PROPIETARIO":
+        # solo puede tocar docs de sus propiedades
+        ok = (
+            getattr(propiedad, "propietario_user_id", None) == getattr(user, "id", None)
+            or getattr(getattr(propiedad, "propietario", None), "usuario_id", None) == getattr(user, "id", None)
+        )
+        if ok:
+            return
+
+    raise PermissionDenied("No tienes permisos para modificar documentos de esta propiedad.")
+
+
+class PropiedadDocumentoViewSet(DescargaArchivoMixin, viewsets.ModelViewSet):
     serializer_class = PropiedadDocumentoSerializer
     permission_classes = [IsAuthenticated]
 
@@ -151,22 +193,7 @@ class PropiedadDocumentoViewSet(viewsets.ModelViewSet):
         return qs.none()
 
     def _check_write_perm(self, propiedad):
-        user = self.request.user
-        rol = getattr(user, "rol", "")
-
-        if rol == "ADMIN":
-            return
-
-        if rol == "PROPIETARIO":
-            # solo puede tocar docs de sus propiedades
-            ok = (
-                getattr(propiedad, "propietario_user_id", None) == getattr(user, "id", None)
-                or getattr(getattr(propiedad, "propietario", None), "usuario_id", None) == getattr(user, "id", None)
-            )
-            if ok:
-                return
-
-        raise PermissionDenied("No tienes permisos para modificar documentos de esta propiedad.")
+        _check_write_perm_documentos_propiedad(self.request.user, propiedad)
 
     def perform_create(self, serializer):
         user = self.request.user
@@ -238,11 +265,42 @@ class VisitaViewSet(viewsets.ModelViewSet):
         data = generar_agenda_disponible(int(prop_id), start_date=start, days=days)
         return Response(data, status=200)
 
+    @action(detail=False, methods=["GET"], url_path="disponibilidad")
+    def disponibilidad(self, request):
+        """
+        ?propiedades=1,2,3&fecha=YYYY-MM-DD&franja=manana|tarde|todo
+        Propiedades con al menos un slot libre en la franja, con sus slots.
+        """
+        fecha_str = request.query_params.get("fecha")
+        franja = request.query_params.get("franja") or "todo"
+        try:
+            ids = [int(x) for x in (request.query_params.get("propiedades") or "").split(",") if x.strip()]
+        except ValueError:
+            return Response({"detail": "propiedades debe ser una lista de ids separados por coma"}, status=400)
+        if not ids or not fecha_str:
+            return Response({"detail": "Falta propiedades o fecha"}, status=400)
+        if len(ids) > MAX_PROPIEDADES_DISPONIBILIDAD:
+            return Response({"detail": f"Máximo {MAX_PROPIEDADES_DISPONIBILIDAD} propiedades por consulta"}, status=400)
+        if franja not in disponibilidad.FRANJAS:
+            return Response({"detail": "franja debe ser manana, tarde o todo"}, status=400)
+        try:
+            fecha = datetime.strptime(fecha_str, "%Y-%m-%d").date()
+        except ValueError:
+            return Response({"detail": "Formato de fecha inválido (YYYY-MM-DD)"}, status=400)
+
+        libres = disponibilidad.libres_por_propiedad(ids, fecha, disponibilidad.FRANJAS[franja])
+        data = [
+            {"propiedad": pk, "slots": [h.strftime("%H:%M") for h in disponibilidad.horas(m)]}
+            for pk, m in libres.items()
+        ]
+        return Response(data, status=200)
+
 
 
-class ReservaViewSet(viewsets.ModelViewSet):
+class ReservaViewSet(CursorOpcionalMixin, viewsets.ModelViewSet):
     queryset = Reserva.objects.all()
     serializer_class = ReservaSerializer
+    cursor_pagination_class = ReservaCursorPagination
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
@@ -251,8 +309,8 @@ class ReservaViewSet(viewsets.ModelViewSet):
 
         qs = (
             Reserva.objects
-            .select_related("interesado", "propiedad")
-            .all()
+            .select_related("interesado")
+            .con_propiedad_estado()
             .order_by("-fecha")
         )
 
@@ -278,7 +336,8 @@ class ReservaViewSet(viewsets.ModelViewSet):
         # (A) FILTRO estado "UI" coherente con tu serializer 
         if estado:
             if estado == "expirada":
-                qs = qs.filter(Q(estado="expirada") | Q(expires_at__lte=now))
+                # el expirador (expirar_reservas) marca las vencidas cada pocos segundos
+                qs = qs.filter(estado="expirada")
             elif estado == "pendiente":
                 qs = qs.filter(estado="pendiente", expires_at__gt=now)
             elif estado == "confirmada":
@@ -355,10 +414,9 @@ class ReservaViewSet(viewsets.ModelViewSet):
         # ---- Cancelar ----
         reserva.activa = False
         reserva.estado = "cancelada"
+        # save() libera la propiedad si corresponde
         reserva.save(update_fields=["activa", "estado"])
 
-        Reserva.sync_estado_propiedad(reserva.propiedad_id)
-
         # ---- Notificaciones ----
         interesado = reserva.interesado
 
@@ -402,12 +460,16 @@ class ReservaViewSet(viewsets.ModelViewSet):
 
         expires_at = timezone.now() + timedelta(days=3)
 
-        reserva = serializer.save(
-            creada_por=user,
-            interesado=interesado,
-            expires_at=expires_at,
-        )
-        Reserva.sync_estado_propiedad(reserva.propiedad_id)
+        # Reserva.save() corre en una transacción corta; si otra reserva
+        # activa ganó la carrera, el índice único lo rechaza -> 400
+        try:
+            reserva = serializer.save(
+                creada_por=user,
+                interesado=interesado,
+                expires_at=expires_at,
+            )
+        except DjangoValidationError as e:
+            raise DRFValidationError({"detail": e.messages})
         prop = reserva.propiedad
 
         # Notificaciones
@@ -435,8 +497,9 @@ class ReservaViewSet(viewsets.ModelViewSet):
 
     
     
-class ContratoViewSet(viewsets.ModelViewSet):
+class ContratoViewSet(DescargaArchivoMixin, viewsets.ModelViewSet):
     serializer_class = ContratoSerializer
+    campo_archivo = "archivo_pdf"
     permission_classes = [IsAuthenticated]
 
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
@@ -451,6 +514,7 @@ class ContratoViewSet(viewsets.ModelViewSet):
         qs = (
             Contrato.objects
             .select_related("comprador_arrendatario", "propiedad")
+            .con_libro()
             .order_by("-fecha_firma", "-id")
         )
 
@@ -465,15 +529,6 @@ class ContratoViewSet(viewsets.ModelViewSet):
 
         return qs.none()
 
-    def retrieve(self, request, *args, **kwargs):
-        contrato = self.get_object()
-
-        if contrato.tipo == "arriendo" and contrato.vigente:
-            contrato.asegurar_cuotas_hasta(date.today() + relativedelta(months=3))
-
-        serializer = self.get_serializer(contrato)
-        return Response(serializer.data)
-    
     def get_serializer_class(self):
         if self.action in ["create", "update", "partial_update"]:
             return ContratoWriteSerializer
@@ -489,18 +544,18 @@ class ContratoViewSet(viewsets.ModelViewSet):
         contrato = serializer.save(subido_por=self.request.user)
 
         if contrato.tipo == "arriendo" and contrato.vigente:
-            contrato.asegurar_cuotas_hasta(date.today() + relativedelta(months=6))
+            contrato.asegurar_cuotas_hasta(date.today() + relativedelta(months=cuotas.HORIZONTE_MESES))
     
     def perform_update(self, serializer):
         contrato = serializer.save()
 
         if contrato.tipo == "arriendo" and contrato.vigente:
-            contrato.asegurar_cuotas_hasta(date.today() + relativedelta(months=6))
+            contrato.asegurar_cuotas_hasta(date.today() + relativedelta(months=cuotas.HORIZONTE_MESES))
 
     parser_classes = [MultiPartParser, FormParser, JSONParser]
     
 
-class ContratoDocumentoViewSet(viewsets.ModelViewSet):
+class ContratoDocumentoViewSet(DescargaArchivoMixin, viewsets.ModelViewSet):
     serializer_class = ContratoDocumentoSerializer
     permission_classes = [IsAuthenticated]
 
@@ -540,8 +595,108 @@ class ContratoDocumentoViewSet(viewsets.ModelViewSet):
         serializer.save(subido_por=self.request.user)
 
 
-class PagoViewSet(viewsets.ModelViewSet):
+# =========================
+# SUBIDAS POR PARTES
+# =========================
+class SubidaFragmentadaViewSet(
+    mixins.CreateModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.DestroyModelMixin,
+    viewsets.GenericViewSet,
+):
+    """
+    Subida reanudable de documentos (contrato / propiedad):
+      POST   /subidas/                  -> crea la subida (tamano_total, destino, ...)
+      HEAD   /subidas/{id}/             -> Upload-Offset actual (para retomar)
+      PATCH  /subidas/{id}/             -> bytes crudos desde el offset del header Upload-Offset
+      POST   /subidas/{id}/finalizar/   -> adjunta el archivo al documento
+      DELETE /subidas/{id}/             -> cancela
+    Cada PATCH es corto, así que un cliente lento no ocupa un worker toda la
+    subida; si falla se retoma desde el último offset.
+    """
+    serializer_class = SubidaFragmentadaSerializer
+    permission_classes = [IsAuthenticated]
+    parser_classes = [JSONParser, FormParser]
+
+    def get_queryset(self):
+        return SubidaFragmentada.objects.filter(usuario=self.request.user)
+
+    def _con_offset(self, response, subida):
+        response["Upload-Offset"] = str(subida.offset)
+        response["Upload-Length"] = str(subida.tamano_total)
+        response["Cache-Control"] = "no-store"
+        return response
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        destino = serializer.validated_data["destino"]
+        objeto_id = serializer.validated_data["objeto_id"]
+
+        if destino == "contrato_documento":
+            # igual que ContratoDocumentoViewSet: solo ADMIN
+            if getattr(request.user, "rol", "") != "ADMIN":
+                raise PermissionDenied("Solo ADMIN puede subir documentos de contrato.")
+            if not Contrato.objects.filter(pk=objeto_id).exists():
+                return Response({"objeto_id": "No existe el contrato."}, status=400)
+        else:
+            propiedad = Propiedad.objects.select_related("propietario").filter(pk=objeto_id).first()
+            if propiedad is None:
+                return Response({"objeto_id": "No existe la propiedad."}, status=400)
+            _check_write_perm_documentos_propiedad(request.user, propiedad)
+
+        subida = serializer.save(usuario=request.user)
+        crear_parcial(subida)
+        return self._con_offset(Response(serializer.data, status=status.HTTP_201_CREATED), subida)
+
+    def retrieve(self, request, *args, **kwargs):
+        subida = self.get_object()
+        return self._con_offset(Response(self.get_serializer(subida).data), subida)
+
+    def partial_update(self, request, *args, **kwargs):
+        subida = self.get_object()
+        try:
+            offset = int(request.headers["Upload-Offset"])
+            largo = int(request.headers.get("Content-Length") or 0)
+        except (KeyError, ValueError):
+            return Response({"detail": "Faltan los headers Upload-Offset / Content-Length."}, status=400)
+
+        try:
+            # se lee el cuerpo crudo (request.data nunca se toca)
+            subida = escribir_fragmento(subida.pk, request.stream, offset, largo)
+        except OffsetInvalido as e:
+            subida.offset = e.esperado
+            return self._con_offset(
+                Response({"detail": "El offset no coincide; retome desde Upload-Offset."}, status=409),
+                subida,
+            )
+        except FragmentoDemasiadoGrande:
+            return Response({"detail": "El fragmento excede el tamaño declarado."}, status=413)
+        return self._con_offset(Response(self.get_serializer(subida).data), subida)
+
+    def perform_destroy(self, instance):
+        cancelar_subida(instance)
+
+    @action(detail=True, methods=["post"])
+    def finalizar(self, request, pk=None):
+        subida = self.get_object()
+        try:
+            documento = finalizar_subida(subida)
+        except OffsetInvalido as e:
+            subida.offset = e.esperado
+            return self._con_offset(Response({"detail": "La subida aún no está completa."}, status=409), subida)
+
+        if subida.destino == "contrato_documento":
+            serializer = ContratoDocumentoSerializer(documento, context=self.get_serializer_context())
+        else:
+            serializer = PropiedadDocumentoSerializer(documento, context=self.get_serializer_context())
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class PagoViewSet(DescargaArchivoMixin, CursorOpcionalMixin, viewsets.ModelViewSet):
     serializer_class = PagoSerializer
+    campo_archivo = "comprobante"
+    cursor_pagination_class = PagoCursorPagination
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
@@ -595,12 +750,13 @@ class PagoViewSet(viewsets.ModelViewSet):
             )
             notificar_usuario(cliente_user, titulo, msg_cli, tipo="PAGO")
     
-class PropiedadViewSet(viewsets.ModelViewSet):
+class PropiedadViewSet(CamposDinamicosViewMixin, viewsets.ModelViewSet):
     queryset = Propiedad.objects.all().order_by("-fecha_registro")
     permission_classes = [PropiedadPermission]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, BusquedaTextoFilter]
     filterset_class = PropiedadFilter
-    search_fields = ["titulo", "descripcion", "ciudad", "propietario__primer_nombre", "propietario__rut"]
+    # titulo/descripcion/ciudad van por el índice de búsqueda
+    busqueda_campos_extra = ["propietario__primer_nombre", "propietario__rut"]
     ordering_fields = ["precio", "metros2", "dormitorios", "baos", "fecha_registro"]
     ordering = ["-fecha_registro"]
 
@@ -609,8 +765,15 @@ class PropiedadViewSet(viewsets.ModelViewSet):
             return PropiedadConFotosSerializer
         return PropiedadSerializer
 
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["tamano_foto"] = "large" if self.action == "retrieve" else "medium"
+        return context
+
     def get_queryset(self):
-        qs = super().get_queryset()
+        qs = super().get_queryset().con_estado_calculado()
+        if self.action in ["list", "retrieve"]:
+            qs = qs.con_fotos()
         user = self.request.user
 
         # visitante no autenticado
@@ -639,6 +802,33 @@ class PropiedadViewSet(viewsets.ModelViewSet):
 
         return qs
 
+    def retrieve(self, request, *args, **kwargs):
+        # validadores con una consulta liviana (mismo filtro de visibilidad);
+        # si el cliente ya tiene esta versión, 304 sin cargar fotos ni serializar
+        lookup = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        try:
+            meta = (
+                self.filter_queryset(self.get_queryset())
+                .prefetch_related(None)
+                .con_reserva_vencida()
+                .values("pk", "updated_at", "estado_calculado", "reserva_vencida_en")
+                .get(pk=lookup)
+            )
+        except (Propiedad.DoesNotExist, ValueError, TypeError):
+            raise NotFound()
+
+        etag = etag_fuerte(
+            "propiedad", meta["pk"], meta["updated_at"].isoformat(), meta["estado_calculado"],
+            request.query_params.get(PARAM_CAMPOS, ""), request.query_params.get(PARAM_OMITIR, ""),
+        )
+        last_modified = ultima_modificacion(meta["updated_at"], meta["reserva_vencida_en"])
+        no_modificada = respuesta_no_modificada(request, etag, last_modified)
+        if no_modificada is not None:
+            return no_modificada
+
+        response = super().retrieve(request, *args, **kwargs)
+        return poner_validadores(response, etag, last_modified)
+
     def perform_create(self, serializer):
         user = self.request.user if self.request.user.is_authenticated else None
         if user and getattr(user, "rol", "") == "PROPIETARIO":
@@ -658,6 +848,7 @@ class PropiedadViewSet(viewsets.ModelViewSet):
         propiedad.estado_aprobacion = "aprobada"
         propiedad.observacion_admin = ""
         propiedad.save(update_fields=["aprobada", "estado_aprobacion", "observacion_admin"])
+        emparejar_propiedades([propiedad])
         return Response({"detail": "Propiedad aprobada exitosamente."})
 
     @action(detail=True, methods=["post"], permission_classes=[IsAdmin])
@@ -712,7 +903,38 @@ class PropiedadViewSet(viewsets.ModelViewSet):
     def historial(self, request, pk=None):
         propiedad = self.get_object()
         qs = Historial.objects.filter(propiedad=propiedad).order_by("-fecha")
+
+        resumen = qs.aggregate(total=Count("id"), ultimo=Max("id"), fecha=Max("fecha"))
+        etag = etag_fuerte("historial", propiedad.pk, resumen["total"], resumen["ultimo"])
+        no_modificada = respuesta_no_modificada(request, etag, resumen["fecha"])
+        if no_modificada is not None:
+            return no_modificada
+
         serializer = HistorialSerializer(qs, many=True)
+        return poner_validadores(Response(serializer.data), etag, resumen["fecha"])
+
+    @action(detail=True, methods=["get"], url_path="similares")
+    def similares(self, request, pk=None):
+        """
+        Propiedades aprobadas más parecidas (precio, m2, dormitorios, baños,
+        tipo y ciudad), como tarjetas del catálogo. ?k= cantidad.
+        """
+        propiedad = self.get_object()
+        try:
+            k = int(request.query_params.get("k", SIMILARES_K))
+        except (TypeError, ValueError):
+            return Response({"detail": "k debe ser un número entero."}, status=400)
+        k = max(1, min(k, SIMILARES_K_MAX))
+
+        ids = buscar_similares(propiedad, k)
+        tarjetas = {
+            t.pk: t
+            for t in PropiedadCatalogo.objects.con_estado_actual().filter(pk__in=ids, aprobada=True)
+        }
+        ordenadas = [tarjetas[i] for i in ids if i in tarjetas][:k]
+        serializer = PropiedadCatalogoSerializer(
+            ordenadas, many=True, context=self.get_serializer_context()
+        )
         return Response(serializer.data)
 
 
@@ -771,8 +993,9 @@ class PropiedadFotoViewSet(viewsets.ModelViewSet):
 
 
 
-class CuotaContratoViewSet(viewsets.ModelViewSet):
+class CuotaContratoViewSet(DescargaArchivoMixin, viewsets.ModelViewSet):
     serializer_class = CuotaContratoSerializer
+    campo_archivo = "comprobante"
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
@@ -832,8 +1055,9 @@ class CuotaContratoViewSet(viewsets.ModelViewSet):
             status=status.HTTP_201_CREATED,
         )
     
-class NotificacionViewSet(viewsets.ModelViewSet):
+class NotificacionViewSet(CursorOpcionalMixin, viewsets.ModelViewSet):
     serializer_class = NotificacionSerializer
+    cursor_pagination_class = NotificacionCursorPagination
     permission_classes = [IsAuthenticated, NotificacionPermission]
     filterset_fields = ["tipo", "leida"]
     ordering = ["-created_at"]
@@ -54,7 +54,7 @@ export interface PropiedadDocumento {
   propiedad: number;
   tipo: string;
   nombre: string;
-  archivo: string; // URL
+  archivo: string; // URL firmada de descarga (archivo_url de la API)
   created_at: string;
   subido_por?: number;
 }
@@ -151,7 +151,7 @@ export class AdminPropiedadesService {
       map((resp) => {
         const data = Array.isArray(resp) ? resp : resp.results ?? resp.data ?? [];
         return (data || []).map((d: any) => {
-          let archivoUrl = d.archivo;
+          let archivoUrl = d.archivo_url;
           if (archivoUrl && !archivoUrl.startsWith('http')) {
              const path = archivoUrl.startsWith('/') ? archivoUrl : `/${archivoUrl}`;
              archivoUrl = `${this.backendUrl}${path}`;
@@ -171,7 +171,7 @@ export class AdminPropiedadesService {
 
     return this.http.post<PropiedadDocumento>(`${this.apiDocs}/`, formData).pipe(
       map((d: any) => {
-        let archivoUrl = d.archivo;
+        let archivoUrl = d.archivo_url;
         if (archivoUrl && !archivoUrl.startsWith('http')) {
            const path = archivoUrl.startsWith('/') ? archivoUrl : `/${archivoUrl}`;
            archivoUrl = `${this.backendUrl}${path}`;
@@ -124,7 +124,7 @@ export interface PropiedadDocumento {
   propiedad: number;
   tipo: string;
   nombre: string;
-  archivo: string; // URL
+  archivo: string; // URL firmada de descarga (archivo_url de la API)
   created_at: string;
   subido_por?: number;
 }
@@ -269,7 +269,7 @@ export class MisPropiedadesService {
       map((resp) => {
         const data = Array.isArray(resp) ? resp : resp.results ?? resp.data ?? [];
         return (data || []).map((d: any) => {
-          let archivoUrl = d.archivo;
+          let archivoUrl = d.archivo_url;
           if (archivoUrl && !archivoUrl.startsWith('http')) {
             // Asegurar que empiece con / si no lo tiene
             const path = archivoUrl.startsWith('/') ? archivoUrl : `/${archivoUrl}`;
@@ -90,6 +90,37 @@ export class PropiedadService {
       );
   }
 
+  // --- Catálogo con scroll infinito (paginación por cursor) ---
+  // Primera página: sin `next`. Siguientes: pasar la URL `next` recibida.
+  listarCatalogoPagina(
+    filtros?: {
+      ciudad?: string;
+      tipo?: string;
+      estado?: string;
+      precio_min?: number;
+      precio_max?: number;
+      search?: string;
+      ordering?: '-fecha_registro' | 'precio' | '-precio';
+    },
+    next?: string | null
+  ): Observable<{ results: Propiedad[]; next: string | null }> {
+    const params: any = { paginacion: 'cursor' };
+    Object.entries(filtros || {}).forEach(([k, v]) => {
+      if (v) params[k] = v;
+    });
+
+    const req = next
+      ? this.http.get<any>(next)
+      : this.http.get<any>(`${this.baseUrl}/catalogo/propiedades/`, { params });
+
+    return req.pipe(
+      map((resp) => ({
+        results: (resp.results || []).map((p: any) => this.mapearPropiedad(p)),
+        next: resp.next || null,
+      }))
+    );
+  }
+
   // --- Detalle de una propiedad ---
   detalle(id: number): Observable<Propiedad> {
     return this.http